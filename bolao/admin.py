@@ -7,7 +7,10 @@ from django.shortcuts import redirect, render
 from django.contrib import messages
 from django.http import HttpResponseRedirect, JsonResponse
 from django import forms
-from .models import Time, Participante, Rodada, Jogo, Palpite, Classificacao, AtualizacaoSite, AtualizacaoVista, SessaoVisita, AcaoUsuario, MetricaDiaria, PaginaPopular, NotificationSettings, Notification
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from . import exportacao, recalculo, tarefas, versoes
+from .models import Time, Participante, Rodada, Jogo, Palpite, RegraPontuacao, Classificacao, ClassificacaoRodada, ParticipanteStats, ProbabilidadeTitulo, Liga, LigaParticipante, Tarefa, AtualizacaoSite, AtualizacaoVista, SessaoVisita, AcaoUsuario, MetricaDiaria, PaginaPopular, NotificationSettings, Notification
 import re
 from django.utils import timezone
 import logging
@@ -30,6 +33,13 @@ def debug_send_notification(notification):
         return False
 
 
+def mensagem_notificacoes(count, descricao):
+    """Texto do aviso de envio; count None quer dizer que o envio foi para a fila de tarefas"""
+    if count is None:
+        return f"📱 Notificações de {descricao} enfileiradas para envio."
+    return f"📱 {count} notificação(ões) de {descricao} enviada(s)!"
+
+
 class ResultadosLoteForm(forms.Form):
     """Formulário para inserir resultados em lote"""
     rodada = forms.ModelChoiceField(
@@ -374,9 +384,18 @@ class ParticipanteAdmin(admin.ModelAdmin):
         return '<div style="width: 40px; height: 40px; border-radius: 50%; background-color: #f0f0f0; display: flex; align-items: center; justify-content: center; color: #666;"><i class="fas fa-user"></i></div>'
     foto_preview.short_description = 'Foto'
     
+    def get_queryset(self, request):
+        # Soma os pontos de todos os participantes da lista em uma única consulta
+        return super().get_queryset(request).select_related('user').annotate(
+            pontos_sql=Coalesce(Sum('palpite__pontos'), 0)
+        )
+    
     def pontos_totais(self, obj):
+        if hasattr(obj, 'pontos_sql'):
+            return obj.pontos_sql
         return obj.pontos_totais
     pontos_totais.short_description = 'Pontos Totais'
+    pontos_totais.admin_order_field = 'pontos_sql'
     
     def inserir_palpites_rapido(self, request, queryset):
         if queryset.count() != 1:
@@ -649,10 +668,21 @@ class JogoInline(admin.TabularInline):
 
 @admin.register(Rodada)
 class RodadaAdmin(admin.ModelAdmin):
-    list_display = ('numero', 'nome', 'status_display', 'data_inicio', 'data_fim', 'ativa', 'total_jogos')
+    list_display = ('numero', 'nome', 'status_display', 'data_inicio', 'data_fim', 'ativa', 'multiplicador', 'total_jogos')
     list_filter = ('ativa', 'data_inicio')
     inlines = [JogoInline]
     
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        
+        # Novo multiplicador: repontua os palpites da rodada e reconstrói a classificação
+        if change and 'multiplicador' in form.changed_data:
+            from .pontuacao import recalcular_em_lote
+            total = recalcular_em_lote(obj.jogo_set.all())
+            if total:
+                recalculo.reconstruir_agora()
+            messages.success(request, f"Multiplicador x{obj.multiplicador}: {total} palpite(s) repontuado(s).")
+    
     def status_display(self, obj):
         status = obj.status
         colors = {
@@ -671,28 +701,29 @@ class RodadaAdmin(admin.ModelAdmin):
         return obj.jogo_set.count()
     total_jogos.short_description = 'Total de Jogos'
     
-    actions = ['ativar_rodada', 'desativar_rodada', 'inserir_resultados_rapido']
+    actions = ['ativar_rodada', 'desativar_rodada', 'inserir_resultados_rapido', 'exportar_palpites_csv', 'exportar_classificacao_csv']
     
     def ativar_rodada(self, request, queryset):
         # Desativa todas as outras rodadas primeiro
         Rodada.objects.all().update(ativa=False)
         # Ativa a rodada selecionada
         queryset.update(ativa=True)
+        versoes.incrementar(versoes.RODADAS)
         
         # Enviar notificação de nova rodada
         for rodada in queryset:
-            from .views import send_notification_to_users
             titulo = f"🚀 Rodada {rodada.numero} Liberada!"
             mensagem = f"⚽ A Rodada {rodada.numero} já está aberta para palpites! Não perca o prazo."
             url_acao = "/palpites/"
-            count = send_notification_to_users('nova_rodada', titulo, mensagem, rodada, url_acao)
-            messages.success(request, f"📱 {count} notificação(ões) de nova rodada enviada(s)!")
+            count = tarefas.notificar('nova_rodada', titulo, mensagem, rodada, url_acao, chave=f'notificar:nova_rodada:{rodada.pk}')
+            messages.success(request, mensagem_notificacoes(count, 'nova rodada'))
             
         self.message_user(request, f"{queryset.count()} rodada(s) ativada(s)")
     ativar_rodada.short_description = "Ativar rodada selecionada"
     
     def desativar_rodada(self, request, queryset):
         queryset.update(ativa=False)
+        versoes.incrementar(versoes.RODADAS)
         self.message_user(request, f"{queryset.count()} rodada(s) desativada(s)")
     desativar_rodada.short_description = "Desativar rodada selecionada"
     
@@ -704,6 +735,16 @@ class RodadaAdmin(admin.ModelAdmin):
         rodada = queryset.first()
         return HttpResponseRedirect(f'/admin/bolao/jogo/resultados-lote/?rodada_id={rodada.id}')
     inserir_resultados_rapido.short_description = "🚀 Inserir resultados em lote"
+    
+    def exportar_palpites_csv(self, request, queryset):
+        rodadas_ids = list(queryset.values_list('id', flat=True))
+        return exportacao.resposta_csv('palpites_rodadas.csv', exportacao.linhas_palpites(rodadas_ids))
+    exportar_palpites_csv.short_description = "⬇️ Exportar palpites das rodadas (CSV)"
+    
+    def exportar_classificacao_csv(self, request, queryset):
+        rodadas_ids = list(queryset.values_list('id', flat=True))
+        return exportacao.resposta_csv('classificacao_rodadas.csv', exportacao.linhas_historico_classificacao(rodadas_ids))
+    exportar_classificacao_csv.short_description = "⬇️ Exportar classificação das rodadas (CSV)"
 
 
 @admin.register(Jogo)
@@ -724,53 +765,6 @@ class JogoAdmin(admin.ModelAdmin):
         }),
     )
     
-    def get_urls(self):
-        urls = super().get_urls()
-        custom_urls = [
-            path('resultados-lote/', self.admin_site.admin_view(self.resultados_lote_view), name='bolao_jogo_resultados_lote'),
-        ]
-        return custom_urls + urls
-    
-    def resultados_lote_view(self, request):
-        """View para inserir resultados em lote"""
-        if request.method == 'POST':
-            form = ResultadosLoteForm(request.POST)
-            if form.is_valid():
-                rodada = form.cleaned_data['rodada']
-                resultados = form.cleaned_data['resultados']
-                
-                # Busca jogos da rodada ordenados por data/hora
-                jogos = Jogo.objects.filter(rodada=rodada).order_by('data_hora', 'id')
-                
-                if len(resultados) != jogos.count():
-                    messages.error(request, f'A rodada {rodada} tem {jogos.count()} jogos, mas você forneceu {len(resultados)} resultados.')
-                else:
-                    # Aplica os resultados
-                    jogos_atualizados = 0
-                    for jogo, (gols_casa, gols_visitante) in zip(jogos, resultados):
-                        jogo.gols_casa = gols_casa
-                        jogo.gols_visitante = gols_visitante
-                        jogo.resultado_finalizado = True
-                        jogo.save()
-                        jogos_atualizados += 1
-                    
-                    # Atualiza classificação
-                    Classificacao.atualizar_classificacao()
-                    
-                    messages.success(request, f'✅ {jogos_atualizados} resultados inseridos com sucesso na {rodada}! Classificação atualizada.')
-                    return HttpResponseRedirect('../')
-        else:
-            form = ResultadosLoteForm()
-        
-        context = {
-            'form': form,
-            'title': 'Inserir Resultados em Lote',
-            'opts': self.model._meta,
-            'has_view_permission': self.has_view_permission(request),
-        }
-        
-        return render(request, 'admin/resultados_lote.html', context)
-    
     def resultado_display(self, obj):
         if obj.resultado_finalizado:
             result = obj.resultado
@@ -812,16 +806,17 @@ class JogoAdmin(admin.ModelAdmin):
                     # Aplica os resultados
                     jogos_atualizados = 0
                     for jogo, (gols_casa, gols_visitante) in zip(jogos, resultados):
+                        estado_anterior = jogo.estado_resultado()
                         jogo.gols_casa = gols_casa
                         jogo.gols_visitante = gols_visitante
                         jogo.resultado_finalizado = True
                         jogo.save()
                         jogos_atualizados += 1
+                        
+                        # Classificação, estatísticas e fotografias da rodada são recalculadas em segundo plano
+                        recalculo.agendar_jogo(jogo, estado_anterior)
                     
-                    # Atualiza classificação
-                    Classificacao.atualizar_classificacao()
-                    
-                    messages.success(request, f'✅ {jogos_atualizados} resultados inseridos com sucesso na {rodada}! Classificação atualizada.')
+                    messages.success(request, f'✅ {jogos_atualizados} resultados inseridos com sucesso na {rodada}! A classificação será atualizada em alguns segundos.')
                     return HttpResponseRedirect('../')
         else:
             form = ResultadosLoteForm()
@@ -836,29 +831,34 @@ class JogoAdmin(admin.ModelAdmin):
         return render(request, 'admin/resultados_lote.html', context)
     
     def save_model(self, request, obj, form, change):
+        estado_anterior = Jogo.objects.get(pk=obj.pk).estado_resultado() if change else None
         super().save_model(request, obj, form, change)
-        # Atualiza classificação quando um resultado é finalizado
+        
+        # Agenda o recálculo da classificação (várias edições seguidas viram um só recálculo)
+        if (obj.resultado_finalizado or (estado_anterior and estado_anterior[2])) \
+                and estado_anterior != obj.estado_resultado():
+            recalculo.agendar_jogo(obj, estado_anterior)
+        
         if obj.resultado_finalizado:
-            Classificacao.atualizar_classificacao()
             
             # Se é a primeira vez que este jogo está sendo finalizado, enviar notificação
             if change and form.has_changed() and 'resultado_finalizado' in form.changed_data:
-                from .views import send_notification_to_users
                 titulo = f"⚽ Resultado: {obj.time_casa} {obj.gols_casa} x {obj.gols_visitante} {obj.time_visitante}"
                 mensagem = f"🏆 Resultado atualizado da {obj.rodada}! Classificação foi recalculada."
                 url_acao = "/resultados/"
-                count = send_notification_to_users('resultados', titulo, mensagem, obj.rodada, url_acao)
-                messages.success(request, f"📱 {count} notificação(ões) de resultado enviada(s)!")
+                count = tarefas.notificar('resultados', titulo, mensagem, obj.rodada, url_acao, chave=f'notificar:resultados:{obj.pk}')
+                messages.success(request, mensagem_notificacoes(count, 'resultado'))
             
-            messages.success(request, "Resultado salvo! Classificação atualizada automaticamente.")
+            messages.success(request, "Resultado salvo! A classificação será atualizada em alguns segundos.")
 
 
 @admin.register(Palpite)
 class PalpiteAdmin(admin.ModelAdmin):
-    list_display = ('participante', 'jogo', 'palpite_display', 'pontos_obtidos', 'acertou_display', 'data_palpite')
-    list_filter = ('data_palpite', 'jogo__rodada', 'jogo__resultado_finalizado')
+    list_display = ('participante', 'jogo', 'palpite_display', 'pontos', 'acertou_display', 'data_palpite')
+    list_filter = ('data_palpite', 'jogo__rodada', 'jogo__resultado_finalizado', 'placar_exato')
     search_fields = ('participante__nome_exibicao', 'jogo__time_casa__nome', 'jogo__time_visitante__nome')
-    readonly_fields = ('pontos_obtidos', 'acertou_display', 'data_palpite')
+    readonly_fields = ('pontos', 'acertou_display', 'data_palpite')
+    list_select_related = ('participante', 'jogo__time_casa', 'jogo__time_visitante')
     
     def palpite_display(self, obj):
         return format_html(
@@ -872,7 +872,7 @@ class PalpiteAdmin(admin.ModelAdmin):
         if not obj.jogo.resultado_finalizado:
             return "Jogo não finalizado"
         
-        if obj.acertou_placar_exato:
+        if obj.placar_exato:
             return '<span style="color: gold; font-weight: bold;">⭐ Placar Exato</span>'
         elif obj.acertou:
             return '<span style="color: green; font-weight: bold;">✓ Resultado Correto</span>'
@@ -881,12 +881,43 @@ class PalpiteAdmin(admin.ModelAdmin):
     acertou_display.short_description = 'Resultado'
 
 
+@admin.register(RegraPontuacao)
+class RegraPontuacaoAdmin(admin.ModelAdmin):
+    list_display = ('nome', 'pontos_placar_exato', 'pontos_resultado', 'pontos_saldo_gols', 'pontos_gols_time', 'vigente', 'criada_em')
+    readonly_fields = ('vigente', 'criada_em')
+    actions = ['tornar_vigente']
+    
+    def has_delete_permission(self, request, obj=None):
+        # A regra vigente pontuou os palpites gravados; para trocar, torne outra vigente
+        if obj is not None and obj.vigente:
+            return False
+        return super().has_delete_permission(request, obj)
+    
+    def _repontuado(self, request, total):
+        if total:
+            recalculo.reconstruir_agora()
+        self.message_user(request, f"{total} palpite(s) repontuado(s) com a regra vigente.")
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if obj.vigente and form.changed_data:
+            from .pontuacao import recalcular_em_lote
+            self._repontuado(request, recalcular_em_lote())
+    
+    def tornar_vigente(self, request, queryset):
+        if queryset.count() != 1:
+            messages.error(request, "Selecione apenas UMA regra.")
+            return
+        self._repontuado(request, queryset.first().ativar())
+    tornar_vigente.short_description = "Tornar vigente e repontuar todos os palpites"
+
+
 @admin.register(Classificacao)
 class ClassificacaoAdmin(admin.ModelAdmin):
-    list_display = ('posicao', 'participante', 'pontos_totais', 'acertos_totais', 'ultimo_saldo', 'ultima_atualizacao')
+    list_display = ('posicao', 'participante', 'pontos_totais', 'acertos_totais', 'placares_exatos', 'ultimo_saldo', 'ultima_atualizacao')
     list_filter = ('ultima_atualizacao',)
     search_fields = ('participante__nome_exibicao',)
-    readonly_fields = ('posicao', 'participante', 'pontos_totais', 'acertos_totais', 'ultimo_saldo', 'ultima_atualizacao')
+    readonly_fields = ('posicao', 'participante', 'pontos_totais', 'acertos_totais', 'placares_exatos', 'ultimo_saldo', 'ultima_atualizacao')
     
     def has_add_permission(self, request):
         return False
@@ -896,21 +927,122 @@ class ClassificacaoAdmin(admin.ModelAdmin):
     
     actions = ['atualizar_classificacao_manual']
     
+    def changelist_view(self, request, extra_context=None):
+        situacao = recalculo.status()
+        if situacao['pendente'] or situacao['em_execucao']:
+            self.message_user(request, "⏳ Recálculo da classificação em andamento; os dados abaixo podem estar desatualizados.", messages.WARNING)
+        elif situacao['ultimo_erro']:
+            self.message_user(request, f"Último recálculo da classificação falhou: {situacao['ultimo_erro']}", messages.ERROR)
+        return super().changelist_view(request, extra_context)
+    
     def atualizar_classificacao_manual(self, request, queryset):
-        Classificacao.atualizar_classificacao()
+        if not recalculo.reconstruir_agora():
+            self.message_user(request, "Erro ao atualizar a classificação. Veja o log.", messages.ERROR)
+            return
         
         # Enviar notificação de ranking atualizado
-        from .views import send_notification_to_users
         titulo = "📊 Ranking Atualizado!"
         mensagem = "🏆 O ranking foi recalculado! Confira sua nova posição na classificação."
         url_acao = "/classificacao/"
-        count = send_notification_to_users('ranking', titulo, mensagem, None, url_acao)
+        count = tarefas.notificar('ranking', titulo, mensagem, None, url_acao, chave='notificar:ranking')
         
         self.message_user(request, "Classificação atualizada com sucesso!")
-        self.message_user(request, f"📱 {count} notificação(ões) de ranking enviada(s)!")
+        self.message_user(request, mensagem_notificacoes(count, 'ranking'))
     atualizar_classificacao_manual.short_description = "Atualizar classificação manualmente"
 
 
+@admin.register(ClassificacaoRodada)
+class ClassificacaoRodadaAdmin(admin.ModelAdmin):
+    list_display = ('rodada', 'posicao', 'participante', 'pontos_totais', 'pontos_rodada', 'acertos_rodada', 'registrada_em')
+    list_filter = ('rodada',)
+    search_fields = ('participante__nome_exibicao',)
+    list_select_related = ('rodada', 'participante')
+    readonly_fields = ('rodada', 'participante', 'posicao', 'pontos_totais', 'acertos_totais', 'pontos_rodada', 'acertos_rodada', 'registrada_em')
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ParticipanteStats)
+class ParticipanteStatsAdmin(admin.ModelAdmin):
+    list_display = ('participante', 'pontos', 'acertos', 'placares_exatos', 'total_palpites', 'melhor_rodada', 'sequencia_acertos', 'atualizado_em')
+    search_fields = ('participante__nome_exibicao',)
+    list_select_related = ('participante', 'melhor_rodada')
+    readonly_fields = (
+        'participante', 'total_palpites', 'acertos', 'placares_exatos', 'pontos', 'melhor_rodada', 'pontos_melhor_rodada',
+        'rodada_corrente', 'pontos_rodada_corrente', 'sequencia_acertos', 'maior_sequencia_acertos', 'ultimo_jogo', 'atualizado_em'
+    )
+    actions = ['recalcular_estatisticas']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def recalcular_estatisticas(self, request, queryset):
+        total = ParticipanteStats.recalcular(list(queryset.values_list('participante_id', flat=True)))
+        self.message_user(request, f"Estatísticas de {total} participante(s) recalculadas!")
+    recalcular_estatisticas.short_description = "Recalcular estatísticas selecionadas"
+
+
+@admin.register(ProbabilidadeTitulo)
+class ProbabilidadeTituloAdmin(admin.ModelAdmin):
+    list_display = ('rodada', 'participante', 'prob_titulo', 'prob_top3', 'prob_top10', 'simulacoes', 'calculada_em')
+    list_filter = ('rodada',)
+    search_fields = ('participante__nome_exibicao',)
+    list_select_related = ('rodada', 'participante')
+    readonly_fields = ('rodada', 'participante', 'prob_titulo', 'prob_top3', 'prob_top10', 'simulacoes', 'calculada_em')
+    
+    def has_add_permission(self, request):
+        return False
+
+
+class LigaParticipanteInline(admin.TabularInline):
+    model = LigaParticipante
+    extra = 0
+    autocomplete_fields = ('participante',)
+    readonly_fields = ('entrou_em',)
+
+
+@admin.register(Liga)
+class LigaAdmin(admin.ModelAdmin):
+    list_display = ('nome', 'slug', 'codigo_convite', 'total_membros', 'ativa', 'criada_em')
+    list_filter = ('ativa',)
+    search_fields = ('nome', 'slug', 'codigo_convite')
+    prepopulated_fields = {'slug': ('nome',)}
+    inlines = [LigaParticipanteInline]
+    
+    def get_queryset(self, request):
+        from django.db.models import Count
+        return super().get_queryset(request).annotate(total_membros=Count('membros'))
+    
+    def total_membros(self, obj):
+        return obj.total_membros
+    total_membros.short_description = 'Membros'
+    total_membros.admin_order_field = 'total_membros'
+
+
+@admin.register(Tarefa)
+class TarefaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'status', 'chave', 'tentativas', 'executar_apos', 'trabalhador', 'criada_em', 'concluida_em')
+    list_filter = ('status', 'tipo')
+    search_fields = ('tipo', 'chave', 'ultimo_erro')
+    readonly_fields = (
+        'tipo', 'parametros', 'chave', 'status', 'tentativas', 'max_tentativas', 'executar_apos',
+        'bloqueada_ate', 'trabalhador', 'ultimo_erro', 'criada_em', 'concluida_em'
+    )
+    actions = ['tentar_novamente']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def tentar_novamente(self, request, queryset):
+        total = 0
+        for tarefa in queryset.filter(status='falhou'):
+            Tarefa.enfileirar(tarefa.tipo, tarefa.parametros, chave=tarefa.chave, max_tentativas=tarefa.max_tentativas)
+            total += 1
+        self.message_user(request, f"{total} tarefa(s) com falha enfileirada(s) de novo!")
+    tentar_novamente.short_description = "Enfileirar de novo as tarefas que falharam"
+
+
 @admin.register(AtualizacaoSite)
 class AtualizacaoSiteAdmin(admin.ModelAdmin):
     """Administração das atualizações do site"""
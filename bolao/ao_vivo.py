@@ -0,0 +1,222 @@
+"""
+Classificação ao vivo (provisória) a partir dos placares dos jogos em andamento.
+
+Os placares que atualizar_placares_api recebe da API são tratados como resultados provisórios
+dos Jogos correspondentes. A classificação fica em cache como arrays alinhados com a base da
+simulação (simulacao.dados_base): a cada gol só os palpites do jogo que mudou são pontuados de
+novo, e a diferença (placar novo - placar anterior) é somada aos totais. Nada é gravado no banco.
+"""
+import re
+import threading
+import unicodedata
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import versoes
+from .models import Jogo, Palpite
+from .pontuacao import pontuar, ranquear, ler_inteiros
+from .simulacao import dados_base
+
+CACHE_TIMEOUT = 60 * 60
+# Sem novos placares da API nesse tempo, a classificação ao vivo deixa de ser exibida
+PLACARES_TIMEOUT = 10 * 60
+MAPA_TIMEOUT = 60 * 60
+
+CHAVE_PLACARES = 'ao_vivo:placares'
+CHAVE_MAPA = 'ao_vivo:mapa_jogos'
+
+_lock = threading.Lock()
+
+
+def normalizar_nome(nome):
+    """Nome do time sem acentos, espaços e pontuação, em minúsculas ("São Paulo" -> "saopaulo")"""
+    sem_acento = unicodedata.normalize('NFKD', nome or '').encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]', '', sem_acento.lower())
+
+
+def _mesmo_time(nome_api, nome_time):
+    api, time = normalizar_nome(nome_api), normalizar_nome(nome_time)
+    return bool(api and time) and (api.startswith(time) or time.startswith(api))
+
+
+def mapear_jogos(jogos_api):
+    """
+    Liga os jogos da API (já processados por atualizar_placares_api) aos Jogos ainda sem resultado.
+    Só entram jogos ao vivo ou encerrados na API. Retorna {jogo_id: (gols_casa, gols_visitante)}.
+    """
+    relevantes = [jogo for jogo in jogos_api if jogo.get('ao_vivo') or jogo.get('finalizado')]
+    if not relevantes:
+        return {}
+
+    # O mapeamento id da API -> Jogo fica em cache; só jogos novos consultam o banco
+    mapa = cache.get(CHAVE_MAPA) or {}
+    faltando = [jogo for jogo in relevantes if jogo['id'] not in mapa]
+    if faltando:
+        agora = timezone.now()
+        candidatos = list(Jogo.objects.filter(
+            resultado_finalizado=False,
+            data_hora__range=(agora - timedelta(hours=12), agora + timedelta(hours=1)),
+        ).values_list('id', 'time_casa__nome', 'time_visitante__nome'))
+        for jogo in faltando:
+            mapa[jogo['id']] = next(
+                (
+                    jogo_id for jogo_id, casa, visitante in candidatos
+                    if _mesmo_time(jogo['time_casa'], casa) and _mesmo_time(jogo['time_visitante'], visitante)
+                ),
+                None,
+            )
+        cache.set(CHAVE_MAPA, mapa, MAPA_TIMEOUT)
+
+    return {
+        mapa[jogo['id']]: (int(jogo['gols_casa']), int(jogo['gols_visitante']))
+        for jogo in relevantes
+        if mapa.get(jogo['id'])
+    }
+
+
+def _palpites_jogo(jogo_id, base_ids):
+    """Palpites de um jogo como arrays (idx_participante na base, casa, visitante) e o multiplicador da rodada, em cache"""
+    chave = versoes.chave_versionada(
+        f'ao_vivo:palpites:{jogo_id}', versoes.RESULTADOS, versoes.PALPITES, versoes.PARTICIPANTES,
+        versoes.RODADAS, versoes.REGRA,
+    )
+    dados = cache.get(chave)
+    if dados is not None:
+        return dados
+
+    linhas = ler_inteiros(
+        Palpite.objects.order_by().filter(
+            jogo_id=jogo_id, participante__ativo=True, participante__invisivel=False
+        ).values_list('participante_id', 'gols_casa_palpite', 'gols_visitante_palpite'),
+        3,
+    )
+    idx_participante = np.searchsorted(base_ids, linhas[:, 0])
+    conhecidos = idx_participante < len(base_ids)
+    conhecidos[conhecidos] = base_ids[idx_participante[conhecidos]] == linhas[conhecidos, 0]
+
+    dados = {
+        'multiplicador': Jogo.objects.filter(id=jogo_id).values_list('rodada__multiplicador', flat=True).first() or 1,
+        'idx_participante': idx_participante[conhecidos],
+        'palpite_casa': linhas[conhecidos, 1],
+        'palpite_visitante': linhas[conhecidos, 2],
+    }
+    cache.set(chave, dados, CACHE_TIMEOUT)
+    return dados
+
+
+def _pontuar_placar(palpites, placar):
+    """(pontos, acerto, placar_exato) dos palpites do jogo para um placar (None = sem placar)"""
+    casa, visitante = placar if placar is not None else (-1, -1)
+    gols_casa = np.full(len(palpites['palpite_casa']), casa, dtype=np.int64)
+    gols_visitante = np.full(len(palpites['palpite_casa']), visitante, dtype=np.int64)
+    return pontuar(
+        palpites['palpite_casa'], palpites['palpite_visitante'], gols_casa, gols_visitante, placar is not None,
+        palpites['multiplicador'],
+    )
+
+
+def _aplicar_diferenca(estado, base, jogo_id, placar_anterior, placar_novo):
+    """Soma aos totais do estado a diferença de pontos dos palpites de um único jogo"""
+    palpites = _palpites_jogo(jogo_id, base['ids'])
+    antes = _pontuar_placar(palpites, placar_anterior)
+    depois = _pontuar_placar(palpites, placar_novo)
+    n = len(base['ids'])
+    p = palpites['idx_participante']
+    for campo, valor_antes, valor_depois in zip(('pontos', 'acertos', 'placares_exatos'), antes, depois):
+        diferenca = valor_depois.astype(np.int64) - valor_antes.astype(np.int64)
+        estado[campo] += np.bincount(p, weights=diferenca, minlength=n).astype(np.int64)
+
+
+def _montar_linhas(estado, base):
+    estado['posicoes'] = ranquear(estado['pontos'], estado['acertos'], estado['placares_exatos'])
+    pontos_ao_vivo = estado['pontos'] - base['pontos']
+    ordem = sorted(range(len(base['ids'])), key=lambda i: (estado['posicoes'][i], base['nomes'][i]))
+    estado['linhas'] = [
+        {
+            'participante_id': int(base['ids'][i]),
+            'nome': base['nomes'][i],
+            'posicao': int(estado['posicoes'][i]),
+            'posicao_atual': int(base['posicoes'][i]),
+            'pontos': int(estado['pontos'][i]),
+            'pontos_ao_vivo': int(pontos_ao_vivo[i]),
+        }
+        for i in ordem
+    ]
+    estado['por_participante'] = {linha['participante_id']: linha for linha in estado['linhas']}
+
+
+def _estado(placares):
+    """
+    Estado da classificação ao vivo para os placares informados.
+
+    Parte do estado em cache (mesmas versões de resultados, palpites, participantes, rodadas e regra,
+    que dão o multiplicador e a pontuação) e reaplica só os jogos cujo placar mudou; sem estado em
+    cache, parte da base gravada com nenhum jogo aplicado.
+    """
+    chave = versoes.chave_versionada(
+        'ao_vivo:classificacao', versoes.RESULTADOS, versoes.PALPITES, versoes.PARTICIPANTES,
+        versoes.RODADAS, versoes.REGRA,
+    )
+    estado = cache.get(chave)
+    if estado is not None and estado['placares_api'] == placares:
+        return estado
+
+    base = dados_base()
+    if estado is None:
+        estado = {
+            'placares': {},
+            'abertos': set(),
+            'descartados': set(),
+            'pontos': base['pontos'].copy(),
+            'acertos': base['acertos'].copy(),
+            'placares_exatos': base['placares_exatos'].copy(),
+        }
+
+    # Jogo com resultado já gravado está na base: o placar da API dele não conta de novo
+    novos = set(placares) - estado['abertos'] - estado['descartados']
+    if novos:
+        abertos = set(Jogo.objects.filter(id__in=novos, resultado_finalizado=False).values_list('id', flat=True))
+        estado['abertos'] |= abertos
+        estado['descartados'] |= novos - abertos
+    aplicaveis = {jogo_id: placar for jogo_id, placar in placares.items() if jogo_id in estado['abertos']}
+
+    anteriores = estado['placares']
+    for jogo_id in set(anteriores) | set(aplicaveis):
+        if anteriores.get(jogo_id) != aplicaveis.get(jogo_id):
+            _aplicar_diferenca(estado, base, jogo_id, anteriores.get(jogo_id), aplicaveis.get(jogo_id))
+
+    estado['placares_api'] = dict(placares)
+    estado['placares'] = aplicaveis
+    estado['atualizada_em'] = timezone.now()
+    _montar_linhas(estado, base)
+    cache.set(chave, estado, CACHE_TIMEOUT)
+    return estado
+
+
+def atualizar(jogos_api):
+    """Registra os placares da API e atualiza a classificação ao vivo; retorna os jogos mapeados"""
+    placares = mapear_jogos(jogos_api)
+    with _lock:
+        if placares:
+            cache.set(CHAVE_PLACARES, placares, PLACARES_TIMEOUT)
+            _estado(placares)
+        else:
+            cache.delete(CHAVE_PLACARES)
+    return placares
+
+
+def classificacao_ao_vivo():
+    """
+    Classificação provisória com os últimos placares da API, ou None se não há jogo ao vivo.
+
+    Retorna dict com 'linhas' (participante_id, nome, posicao, posicao_atual, pontos, pontos_ao_vivo),
+    'por_participante', 'placares' ({jogo_id: (casa, visitante)}) e 'atualizada_em'.
+    """
+    placares = cache.get(CHAVE_PLACARES)
+    if not placares:
+        return None
+    with _lock:
+        return _estado(placares)
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class BolaoConfig(AppConfig):
     name = "bolao"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,51 @@
+"""
+Respostas condicionais (ETag / 304 Not Modified) para as páginas públicas.
+
+Cada view declara as versões de dados (bolao.versoes) de que o conteúdo depende. O ETag sai
+dessas versões, do endereço (que já traz o id da rodada ou do participante), do usuário logado e
+do token CSRF da sessão, com uma única consulta (a dos contadores de versão): se o navegador já tem
+a mesma versão, a resposta é 304 e a view nem é executada.
+
+Com mensagens (django.contrib.messages) pendentes a página é sempre gerada inteira e sem ETag:
+um 304 deixaria as mensagens na fila, e a cópia guardada não pode ser reaproveitada depois.
+"""
+import hashlib
+from functools import wraps
+
+from django.contrib.messages import get_messages
+from django.middleware.csrf import get_token
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from . import versoes
+
+
+def etag_versionado(*nomes):
+    """
+    Decorator de view com ETag forte montado a partir das versões dos conjuntos de dados nomes.
+    O usuário logado sempre entra, porque o menu e os destaques da página mudam com ele, e o
+    segredo CSRF também: a página leva o token no <meta name="csrf-token"> e ele muda no login.
+    """
+    def calcular_etag(request, *args, **kwargs):
+        # get_token deixa o segredo (sem máscara, o mesmo a cada chamada) em request.META
+        get_token(request)
+        componentes = [
+            request.get_full_path(), f'usuario{request.user.pk or 0}', f"csrf{request.META.get('CSRF_COOKIE', '')}",
+        ]
+        componentes += [f'{nome}{versoes.versao(nome)}' for nome in nomes]
+        return hashlib.sha1(':'.join(componentes).encode()).hexdigest()
+
+    def decorator(view):
+        view_condicional = condition(etag_func=calcular_etag)(view)
+
+        @wraps(view)
+        def _view(request, *args, **kwargs):
+            if len(get_messages(request)):
+                response = view(request, *args, **kwargs)
+            else:
+                response = view_condicional(request, *args, **kwargs)
+            # O navegador pode guardar a página, mas confere o ETag antes de reaproveitá-la
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return _view
+    return decorator
@@ -0,0 +1,80 @@
+"""
+Confronto direto ("mano a mano") entre dois participantes.
+
+Os palpites dos dois vêm de uma única consulta: cada jogo finalizado é ligado ao palpite de
+cada participante por um FilteredRelation (dois LEFT JOINs de Palpite pelo jogo_id). O resultado
+fica em cache até o próximo resultado lançado ou corrigido.
+"""
+from django.core.cache import cache
+from django.db.models import FilteredRelation, Q
+
+from . import versoes
+from .models import Jogo
+
+CACHE_TIMEOUT = 60 * 60
+
+
+def _palpite(gols_casa, gols_visitante, pontos):
+    if gols_casa is None:
+        return None
+    return {'gols_casa': gols_casa, 'gols_visitante': gols_visitante, 'pontos': pontos}
+
+
+def confronto(participante_a_id, participante_b_id):
+    """
+    Jogos finalizados em que pelo menos um dos dois palpitou, agrupados por rodada.
+
+    Retorna dict com 'rodadas' (lista de {numero, jogos, pontos_a, pontos_b, diferenca}, onde
+    diferenca é o acumulado de pontos_a - pontos_b até a rodada) e os totais do confronto.
+    """
+    chave = versoes.chave_versionada(
+        f'confronto:{participante_a_id}:{participante_b_id}', versoes.RESULTADOS
+    )
+    dados = cache.get(chave)
+    if dados is not None:
+        return dados
+
+    linhas = Jogo.objects.filter(resultado_finalizado=True).annotate(
+        palpite_a=FilteredRelation('palpite', condition=Q(palpite__participante_id=participante_a_id)),
+        palpite_b=FilteredRelation('palpite', condition=Q(palpite__participante_id=participante_b_id)),
+    ).filter(
+        Q(palpite_a__id__isnull=False) | Q(palpite_b__id__isnull=False)
+    ).order_by('rodada__numero', 'data_hora', 'id').values_list(
+        'id', 'rodada__numero', 'time_casa__nome', 'time_visitante__nome', 'gols_casa', 'gols_visitante',
+        'palpite_a__gols_casa_palpite', 'palpite_a__gols_visitante_palpite', 'palpite_a__pontos',
+        'palpite_b__gols_casa_palpite', 'palpite_b__gols_visitante_palpite', 'palpite_b__pontos',
+    )
+
+    rodadas = []
+    totais = {'pontos_a': 0, 'pontos_b': 0, 'vitorias_a': 0, 'vitorias_b': 0, 'empates': 0}
+    for (jogo_id, numero, casa, visitante, gols_casa, gols_visitante,
+         a_casa, a_visitante, a_pontos, b_casa, b_visitante, b_pontos) in linhas:
+        if not rodadas or rodadas[-1]['numero'] != numero:
+            rodadas.append({'numero': numero, 'jogos': [], 'pontos_a': 0, 'pontos_b': 0})
+        rodada = rodadas[-1]
+        rodada['jogos'].append({
+            'jogo_id': jogo_id,
+            'time_casa': casa,
+            'time_visitante': visitante,
+            'gols_casa': gols_casa,
+            'gols_visitante': gols_visitante,
+            'palpite_a': _palpite(a_casa, a_visitante, a_pontos),
+            'palpite_b': _palpite(b_casa, b_visitante, b_pontos),
+        })
+        rodada['pontos_a'] += a_pontos or 0
+        rodada['pontos_b'] += b_pontos or 0
+
+    for rodada in rodadas:
+        totais['pontos_a'] += rodada['pontos_a']
+        totais['pontos_b'] += rodada['pontos_b']
+        rodada['diferenca'] = totais['pontos_a'] - totais['pontos_b']
+        if rodada['pontos_a'] > rodada['pontos_b']:
+            totais['vitorias_a'] += 1
+        elif rodada['pontos_a'] < rodada['pontos_b']:
+            totais['vitorias_b'] += 1
+        else:
+            totais['empates'] += 1
+
+    dados = {'rodadas': rodadas, **totais, 'diferenca': totais['pontos_a'] - totais['pontos_b']}
+    cache.set(chave, dados, CACHE_TIMEOUT)
+    return dados
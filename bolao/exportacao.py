@@ -0,0 +1,121 @@
+"""
+Exportação em CSV de palpites e classificação.
+
+As linhas saem de consultas lidas em blocos (values_list(...).iterator(chunk_size)) e vão direto
+para um StreamingHttpResponse, uma linha por vez: a memória fica constante qualquer que seja o
+tamanho da exportação. O CSV usa ";" e BOM UTF-8, o formato que o Excel em português abre direto.
+"""
+import csv
+from itertools import groupby
+
+from django.db.models import FilteredRelation, Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Palpite, Participante, ClassificacaoRodada
+
+CHUNK_SIZE = 2000
+
+
+class _Eco:
+    """Pseudo-arquivo do csv.writer: devolve a linha formatada em vez de gravá-la"""
+
+    def write(self, valor):
+        return valor
+
+
+def resposta_csv(nome_arquivo, linhas):
+    """StreamingHttpResponse de um CSV gerado linha a linha a partir do iterável linhas"""
+    escritor = csv.writer(_Eco(), delimiter=';')
+
+    def conteudo():
+        yield '\ufeff'
+        for linha in linhas:
+            yield escritor.writerow(linha)
+
+    response = StreamingHttpResponse(conteudo(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{nome_arquivo}"'
+    return response
+
+
+def _data_hora(valor):
+    return timezone.localtime(valor).strftime('%d/%m/%Y %H:%M')
+
+
+def _sim_nao(valor):
+    return 'sim' if valor else 'não'
+
+
+def linhas_palpites(rodadas_ids):
+    """Um palpite por linha (participantes ativos) nas rodadas pedidas, em ordem de rodada e jogo"""
+    yield [
+        'Rodada', 'Data', 'Mandante', 'Visitante', 'Resultado', 'Participante',
+        'Palpite mandante', 'Palpite visitante', 'Pontos', 'Acertou', 'Placar exato',
+    ]
+    palpites = Palpite.objects.filter(
+        jogo__rodada_id__in=rodadas_ids, participante__ativo=True
+    ).order_by(
+        'jogo__rodada__numero', 'jogo__data_hora', 'jogo_id', 'participante__nome_exibicao'
+    ).values_list(
+        'jogo__rodada__numero', 'jogo__data_hora', 'jogo__time_casa__nome', 'jogo__time_visitante__nome',
+        'jogo__gols_casa', 'jogo__gols_visitante', 'jogo__resultado_finalizado', 'participante__nome_exibicao',
+        'gols_casa_palpite', 'gols_visitante_palpite', 'pontos', 'acertou', 'placar_exato',
+    )
+    for (numero, data_hora, casa, visitante, gols_casa, gols_visitante, finalizado, nome,
+         palpite_casa, palpite_visitante, pontos, acertou, placar_exato) in palpites.iterator(chunk_size=CHUNK_SIZE):
+        yield [
+            numero, _data_hora(data_hora), casa, visitante,
+            f'{gols_casa} x {gols_visitante}' if finalizado else '',
+            nome, palpite_casa, palpite_visitante, pontos, _sim_nao(acertou), _sim_nao(placar_exato),
+        ]
+
+
+def linhas_planilha_rodada(rodada):
+    """
+    Planilha da rodada: um participante ativo por linha, um jogo por coluna e o total de pontos.
+
+    Uma consulta só traz os participantes com os palpites da rodada (LEFT JOIN por um
+    FilteredRelation), em ordem de nome e id; as linhas são montadas conforme são lidas e só os
+    palpites de um participante ficam na memória de cada vez.
+    """
+    jogos = list(rodada.jogo_set.select_related('time_casa', 'time_visitante').order_by('data_hora', 'id'))
+    yield ['Participante'] + [f'{jogo.time_casa.sigla} x {jogo.time_visitante.sigla}' for jogo in jogos] + ['Pontos']
+    yield ['Resultado'] + [
+        f'{jogo.gols_casa} x {jogo.gols_visitante}' if jogo.resultado_finalizado else '' for jogo in jogos
+    ] + ['']
+
+    participantes = Participante.objects.filter(ativo=True).order_by('nome_exibicao', 'id')
+    if not jogos:
+        # Rodada sem jogos: o filtro por jogo_id__in=[] esvaziaria a consulta inteira
+        for nome in participantes.values_list('nome_exibicao', flat=True).iterator(chunk_size=CHUNK_SIZE):
+            yield [nome, 0]
+        return
+
+    linhas = participantes.annotate(
+        palpite_rodada=FilteredRelation('palpite', condition=Q(palpite__jogo_id__in=[jogo.id for jogo in jogos])),
+    ).values_list(
+        'id', 'nome_exibicao', 'palpite_rodada__jogo_id', 'palpite_rodada__gols_casa_palpite',
+        'palpite_rodada__gols_visitante_palpite', 'palpite_rodada__pontos',
+    )
+    for (_, nome), grupo in groupby(linhas.iterator(chunk_size=CHUNK_SIZE), key=lambda linha: linha[:2]):
+        # Sem palpite na rodada, o LEFT JOIN traz uma linha com jogo_id None
+        por_jogo = {
+            jogo_id: (casa, visitante, pontos) for _, _, jogo_id, casa, visitante, pontos in grupo if jogo_id is not None
+        }
+        yield [nome] + [
+            f'{por_jogo[jogo.id][0]} x {por_jogo[jogo.id][1]}' if jogo.id in por_jogo else '' for jogo in jogos
+        ] + [sum(pontos for _, _, pontos in por_jogo.values())]
+
+
+def linhas_historico_classificacao(rodadas_ids=None):
+    """Classificação gravada no fechamento de cada rodada (ClassificacaoRodada), em ordem de rodada e posição"""
+    yield ['Rodada', 'Posição', 'Participante', 'Pontos', 'Acertos', 'Pontos na rodada', 'Acertos na rodada']
+    historico = ClassificacaoRodada.objects.all()
+    if rodadas_ids is not None:
+        historico = historico.filter(rodada_id__in=rodadas_ids)
+    historico = historico.order_by('rodada__numero', 'posicao', 'participante__nome_exibicao').values_list(
+        'rodada__numero', 'posicao', 'participante__nome_exibicao',
+        'pontos_totais', 'acertos_totais', 'pontos_rodada', 'acertos_rodada',
+    )
+    for linha in historico.iterator(chunk_size=CHUNK_SIZE):
+        yield list(linha)
@@ -0,0 +1,52 @@
+"""
+Management command para estimar as chances de título de cada participante (Monte Carlo)
+Execute: python manage.py calcular_probabilidades [--simulacoes N] [--processos N] [--semente N]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from bolao.models import ProbabilidadeTitulo
+
+
+class Command(BaseCommand):
+    help = 'Simula o restante da temporada e grava as probabilidades de 1º, top 3 e top 10 por participante'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--simulacoes',
+            type=int,
+            default=20000,
+            help='Número de temporadas simuladas (padrão: 20000)'
+        )
+        parser.add_argument(
+            '--processos',
+            type=int,
+            help='Processos em paralelo (padrão: número de CPUs; 1 roda sem pool)'
+        )
+        parser.add_argument(
+            '--semente',
+            type=int,
+            help='Semente aleatória, para resultados reproduzíveis'
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        rodada = ProbabilidadeTitulo.calcular(
+            simulacoes=options['simulacoes'],
+            processos=options['processos'],
+            semente=options['semente'],
+        )
+
+        if rodada is None:
+            self.stdout.write(self.style.WARNING('Nenhuma rodada cadastrada'))
+            return
+
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(
+            self.style.SUCCESS(f'{options["simulacoes"]} temporadas simuladas em {duracao:.1f}s ({rodada})')
+        )
+        for item in ProbabilidadeTitulo.objects.filter(rodada=rodada).select_related('participante')[:10]:
+            self.stdout.write(
+                f'  {item.participante.nome_exibicao}: título {item.prob_titulo:.1%}, '
+                f'top 3 {item.prob_top3:.1%}, top 10 {item.prob_top10:.1%}'
+            )
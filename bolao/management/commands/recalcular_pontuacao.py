@@ -0,0 +1,65 @@
+"""
+Management command para regravar e conferir a pontuação armazenada nos palpites
+Execute: python manage.py recalcular_pontuacao [--verificar] [--rodada N]
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from bolao.models import Jogo, Palpite, Classificacao, ParticipanteStats, RegraPontuacao
+from bolao.pontuacao import recalcular_em_lote
+
+
+class Command(BaseCommand):
+    help = 'Regrava pontos/acertou/placar_exato dos palpites e confere com a regra de pontuação'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Apenas confere a pontuação gravada, sem alterar nada'
+        )
+        parser.add_argument(
+            '--rodada',
+            type=int,
+            help='Número da rodada a processar (padrão: todas)'
+        )
+        parser.add_argument(
+            '--classificacao',
+            action='store_true',
+            help='Reconstrói a classificação e as estatísticas dos participantes ao final'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Regra vigente: {RegraPontuacao.atual()}')
+        jogos = Jogo.objects.all()
+        if options['rodada']:
+            jogos = jogos.filter(rodada__numero=options['rodada'])
+
+        if not options['verificar']:
+            # Pontua tudo com o kernel vetorizado e regrava só o que mudou
+            with transaction.atomic():
+                total = recalcular_em_lote(jogos)
+            self.stdout.write(f'{total} palpite(s) regravado(s) em {jogos.count()} jogo(s)')
+            if total:
+                ParticipanteStats.recalcular()
+
+        # Confere a pontuação gravada contra a regra calculada em SQL
+        divergentes = Palpite.objects.filter(jogo__in=jogos).divergentes().select_related(
+            'participante', 'jogo__time_casa', 'jogo__time_visitante'
+        )
+        total_divergentes = divergentes.count()
+
+        if total_divergentes:
+            for palpite in divergentes[:10]:
+                self.stdout.write(
+                    f'  - {palpite}: gravado {palpite.pontos} pts, esperado {palpite.pontos_sql} pts'
+                )
+            self.stdout.write(
+                self.style.ERROR(f'{total_divergentes} palpite(s) com pontuação divergente')
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS('Pontuação gravada confere com a regra'))
+
+        if options['classificacao']:
+            Classificacao.atualizar_classificacao()
+            ParticipanteStats.recalcular()
+            self.stdout.write(self.style.SUCCESS('Classificação e estatísticas dos participantes reconstruídas'))
@@ -0,0 +1,27 @@
+"""
+Management command para gravar o histórico de classificação das rodadas encerradas
+Execute: python manage.py registrar_classificacao_rodadas [--refazer]
+"""
+from django.core.management.base import BaseCommand
+from bolao.models import ClassificacaoRodada
+
+
+class Command(BaseCommand):
+    help = 'Grava a fotografia da classificação de cada rodada encerrada que ainda não tem uma'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--refazer',
+            action='store_true',
+            help='Regrava as fotografias de todas as rodadas encerradas'
+        )
+
+    def handle(self, *args, **options):
+        gravadas = ClassificacaoRodada.sincronizar(a_partir_de=1 if options['refazer'] else None)
+
+        if gravadas:
+            self.stdout.write(
+                self.style.SUCCESS(f'{len(gravadas)} rodada(s) registrada(s): {", ".join(map(str, gravadas))}')
+            )
+        else:
+            self.stdout.write('Nenhuma rodada nova para registrar')
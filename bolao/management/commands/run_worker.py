@@ -0,0 +1,135 @@
+"""
+Management command para executar as tarefas da fila do banco (modelo Tarefa)
+Execute: python manage.py run_worker [--threads N] [--intervalo S] [--uma-vez]
+Para enfileirar via crontab: python manage.py run_worker --enfileirar lembrete_prazo
+"""
+import json
+import os
+import signal
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+
+from bolao import tarefas
+from bolao.models import Tarefa
+
+
+def _executar_na_thread(tarefa):
+    try:
+        return tarefas.executar(tarefa)
+    finally:
+        # Cada thread do pool tem a própria conexão com o SQLite
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Worker da fila de tarefas: reserva, executa com N threads e reagenda falhas com espera exponencial'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=getattr(settings, 'TAREFAS_THREADS', 2),
+            help='Tarefas executadas ao mesmo tempo (padrão: TAREFAS_THREADS ou 2)'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=2.0,
+            help='Segundos entre consultas à fila quando ela está vazia (padrão: 2)'
+        )
+        parser.add_argument(
+            '--reserva',
+            type=int,
+            default=getattr(settings, 'TAREFAS_RESERVA', 60),
+            help='Duração da reserva em segundos; renovada enquanto a tarefa roda (padrão: TAREFAS_RESERVA ou 60)'
+        )
+        parser.add_argument(
+            '--nome',
+            type=str,
+            default=f'{socket.gethostname()}:{os.getpid()}',
+            help='Identificação do worker gravada nas tarefas reservadas'
+        )
+        parser.add_argument(
+            '--uma-vez',
+            action='store_true',
+            help='Esvazia a fila (tarefas já disponíveis) e termina'
+        )
+        parser.add_argument(
+            '--enfileirar',
+            type=str,
+            choices=sorted(tarefas.TIPOS),
+            help='Só enfileira uma tarefa deste tipo (chave = tipo, sem duplicar) e termina'
+        )
+        parser.add_argument(
+            '--parametros',
+            type=str,
+            default='{}',
+            help='Parâmetros JSON da tarefa enfileirada com --enfileirar'
+        )
+
+    def handle(self, *args, **options):
+        if options['enfileirar']:
+            try:
+                parametros = json.loads(options['parametros'])
+            except ValueError as e:
+                raise CommandError(f'--parametros não é um JSON válido: {e}')
+            tarefa = Tarefa.enfileirar(options['enfileirar'], parametros, chave=options['enfileirar'])
+            self.stdout.write(self.style.SUCCESS(f'Tarefa {tarefa.pk} ({tarefa.tipo}) na fila'))
+            return
+
+        self.parar = False
+        signal.signal(signal.SIGTERM, self._pedir_parada)
+        signal.signal(signal.SIGINT, self._pedir_parada)
+
+        nome, reserva = options['nome'], options['reserva']
+        threads = max(1, options['threads'])
+        self.stdout.write(self.style.SUCCESS(f'Worker {nome} iniciado com {threads} thread(s)'))
+
+        concluidas = falhas = 0
+        em_andamento = {}
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            while True:
+                for futuro in [f for f in em_andamento if f.done()]:
+                    tarefa = em_andamento.pop(futuro)
+                    if futuro.result():
+                        concluidas += 1
+                    else:
+                        falhas += 1
+                        self.stdout.write(self.style.WARNING(f'Tarefa {tarefa.pk} ({tarefa.tipo}) falhou'))
+
+                if self.parar:
+                    break
+
+                close_old_connections()
+                if em_andamento:
+                    Tarefa.renovar_reservas([t.pk for t in em_andamento.values()], nome, reserva)
+
+                reservou = False
+                while len(em_andamento) < threads:
+                    tarefa = Tarefa.reservar(nome, reserva)
+                    if tarefa is None:
+                        break
+                    reservou = True
+                    em_andamento[executor.submit(_executar_na_thread, tarefa)] = tarefa
+
+                if options['uma_vez'] and not em_andamento and not reservou:
+                    break
+
+                if em_andamento:
+                    # Acorda quando alguma terminar, ou a tempo de renovar as reservas
+                    wait(list(em_andamento), timeout=min(options['intervalo'], reserva / 3), return_when=FIRST_COMPLETED)
+                else:
+                    time.sleep(options['intervalo'])
+
+            if em_andamento:
+                self.stdout.write(f'Aguardando {len(em_andamento)} tarefa(s) em andamento...')
+
+        self.stdout.write(self.style.SUCCESS(f'Worker {nome} encerrado: {concluidas} concluída(s), {falhas} falha(s)'))
+
+    def _pedir_parada(self, signum, frame):
+        self.parar = True
@@ -0,0 +1,290 @@
+"""
+Management command para conferir a classificação gravada contra todas as formas de calculá-la
+Execute: python manage.py verificar_classificacao [--estrategias python numpy ...] [--corrigir] [--sintetico]
+"""
+import random
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from bolao.models import (
+    Time, Participante, Rodada, Jogo, Palpite, Classificacao
+)
+from bolao import versoes
+from bolao.pontuacao import carregar_matriz, pontuar, ranquear
+
+
+def _participantes():
+    return Participante.objects.filter(ativo=True, invisivel=False)
+
+
+def estrategia_python():
+    """Loop em Python sobre as propriedades do Palpite (pontos_obtidos, resultado_palpite)"""
+    totais = {}
+    palpites = Palpite.objects.filter(participante__in=_participantes()).select_related('jogo__rodada')
+    for palpite in palpites.iterator(chunk_size=2000):
+        item = totais.setdefault(palpite.participante_id, [0, 0, 0])
+        if not palpite.jogo.resultado_finalizado:
+            continue
+        item[0] += palpite.pontos_obtidos
+        item[1] += palpite.resultado_palpite == palpite.jogo.resultado
+        item[2] += (palpite.gols_casa_palpite, palpite.gols_visitante_palpite) == (palpite.jogo.gols_casa, palpite.jogo.gols_visitante)
+    return totais
+
+
+def estrategia_sql_regra():
+    """Regra de pontuação calculada no banco (PalpiteQuerySet.with_pontos) e somada por participante"""
+    linhas = Palpite.objects.filter(participante__in=_participantes()).with_pontos().order_by().values(
+        'participante_id'
+    ).annotate(
+        total_pontos=Coalesce(Sum('pontos_sql'), 0),
+        total_acertos=Coalesce(Sum('acerto_sql'), 0),
+        total_placares_exatos=Coalesce(Sum('placar_exato_sql'), 0),
+    )
+    return {
+        linha['participante_id']: [linha['total_pontos'], linha['total_acertos'], linha['total_placares_exatos']]
+        for linha in linhas
+    }
+
+
+def estrategia_sql_gravada():
+    """Soma das colunas gravadas em cada palpite (PalpiteQuerySet.totais_por)"""
+    linhas = Palpite.objects.filter(participante__in=_participantes()).totais_por('participante_id')
+    return {
+        linha['participante_id']: [linha['total_pontos'], linha['total_acertos'], linha['total_placares_exatos']]
+        for linha in linhas
+    }
+
+
+def estrategia_numpy():
+    """Kernel vetorizado de bolao.pontuacao, o mesmo de Classificacao.atualizar_classificacao"""
+    matriz = carregar_matriz(_participantes())
+    totais = matriz.totais()
+    return {
+        participante_id: [int(totais['pontos'][i]), int(totais['acertos'][i]), int(totais['placares_exatos'][i])]
+        for i, participante_id in enumerate(matriz.participantes_ids.tolist())
+    }
+
+
+def estrategia_incremental():
+    """
+    Parte de uma classificação zerada e aplica os jogos finalizados um a um com
+    Classificacao.aplicar_resultado_jogo, dentro de uma transação desfeita no final.
+    """
+    with transaction.atomic():
+        Classificacao.objects.filter(participante__in=_participantes()).update(
+            pontos_totais=0, acertos_totais=0, placares_exatos=0, ultimo_saldo=0
+        )
+        for jogo in Jogo.objects.filter(resultado_finalizado=True).select_related('rodada').order_by(
+            'rodada__numero', 'data_hora', 'id'
+        ):
+            Classificacao.aplicar_resultado_jogo(jogo, (None, None, False))
+        totais = {
+            linha.participante_id: [linha.pontos_totais, linha.acertos_totais, linha.placares_exatos, linha.posicao]
+            for linha in Classificacao.objects.all()
+        }
+        transaction.set_rollback(True)
+    return totais
+
+
+ESTRATEGIAS = {
+    'python': estrategia_python,
+    'sql_regra': estrategia_sql_regra,
+    'sql_gravada': estrategia_sql_gravada,
+    'numpy': estrategia_numpy,
+    'incremental': estrategia_incremental,
+}
+
+
+def completar_posicoes(totais, participantes_ids):
+    """Preenche quem não tem palpites com zeros e calcula a posição (RANK) de cada um"""
+    linhas = {pid: list(totais.get(pid, [0, 0, 0]))[:3] for pid in participantes_ids}
+    if any(len(valores) > 3 for valores in totais.values()):
+        # A estratégia já trouxe a posição (lida da tabela)
+        return {pid: linhas[pid] + [totais[pid][3] if pid in totais else None] for pid in participantes_ids}
+    chaves = np.array([linhas[pid] for pid in participantes_ids], dtype=np.int64).reshape(-1, 3)
+    posicoes = ranquear(chaves[:, 0], chaves[:, 1], chaves[:, 2])
+    return {pid: linhas[pid] + [int(posicoes[i])] for i, pid in enumerate(participantes_ids)}
+
+
+class Command(BaseCommand):
+    help = 'Recalcula a classificação com todas as estratégias, compara com a gravada e mede tempo e consultas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--estrategias',
+            nargs='+',
+            choices=sorted(ESTRATEGIAS),
+            default=list(ESTRATEGIAS),
+            help='Estratégias a executar (padrão: todas)'
+        )
+        parser.add_argument(
+            '--repeticoes',
+            type=int,
+            default=1,
+            help='Execuções de cada estratégia; o tempo informado é o menor (padrão: 1)'
+        )
+        parser.add_argument(
+            '--corrigir',
+            action='store_true',
+            help='Se houver divergência, reconstrói a classificação gravada (Classificacao.atualizar_classificacao)'
+        )
+        parser.add_argument(
+            '--sintetico',
+            action='store_true',
+            help='Roda num banco em memória com dados gerados, sem tocar no banco real'
+        )
+        parser.add_argument(
+            '--participantes',
+            type=int,
+            default=300,
+            help='Participantes do banco sintético (padrão: 300). Cada um palpita ~90%% dos 10 jogos de cada rodada: '
+                 '1000 participantes e 30 rodadas dão ~280 mil palpites; nesse tamanho a estratégia python (um objeto '
+                 'por palpite) leva ~30 s, use --estrategias para deixá-la de fora'
+        )
+        parser.add_argument('--rodadas', type=int, default=20, help='Rodadas finalizadas do banco sintético (padrão: 20)')
+        parser.add_argument('--semente', type=int, default=42, help='Semente do banco sintético (padrão: 42)')
+
+    def handle(self, *args, **options):
+        if not options['sintetico']:
+            self.verificar(options)
+            return
+
+        nome_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.stdout.write('Gerando banco sintético em memória...')
+            inicio = time.perf_counter()
+            self.popular_sintetico(options['participantes'], options['rodadas'], options['semente'])
+            self.stdout.write(f'Banco sintético gerado em {time.perf_counter() - inicio:.1f} s')
+            Classificacao.atualizar_classificacao()
+            self.verificar(options)
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+
+    def verificar(self, options):
+        participantes_ids = sorted(_participantes().values_list('id', flat=True))
+        gravada = {
+            linha.participante_id: [linha.pontos_totais, linha.acertos_totais, linha.placares_exatos, linha.posicao]
+            for linha in Classificacao.objects.filter(participante_id__in=participantes_ids)
+        }
+        self.stdout.write(
+            f'{len(participantes_ids)} participante(s), '
+            f'{Palpite.objects.filter(jogo__resultado_finalizado=True).count()} palpite(s) em jogos finalizados, '
+            f'{len(gravada)} linha(s) na classificação gravada'
+        )
+        faltando = len(participantes_ids) - len(gravada)
+        if faltando:
+            self.stdout.write(self.style.WARNING(f'{faltando} participante(s) sem linha na classificação gravada'))
+
+        self.stdout.write(f'\n{"estratégia":<14}{"tempo (ms)":>12}{"consultas":>11}{"divergências":>14}')
+        estrategias_divergentes = []
+        for nome in options['estrategias']:
+            tempos = []
+            for _ in range(max(1, options['repeticoes'])):
+                with CaptureQueriesContext(connection) as consultas, versoes.lidas_uma_vez():
+                    inicio = time.perf_counter()
+                    totais = ESTRATEGIAS[nome]()
+                    tempos.append(time.perf_counter() - inicio)
+            calculada = completar_posicoes(totais, participantes_ids)
+
+            divergencias = [
+                (pid, gravada.get(pid), calculada[pid])
+                for pid in participantes_ids
+                if gravada.get(pid) != calculada[pid]
+            ]
+            estilo = self.style.ERROR if divergencias else self.style.SUCCESS
+            self.stdout.write(estilo(
+                f'{nome:<14}{min(tempos) * 1000:>12.1f}{len(consultas):>11}{len(divergencias):>14}'
+            ))
+            if divergencias:
+                estrategias_divergentes.append(nome)
+                nomes = dict(Participante.objects.filter(
+                    id__in=[d[0] for d in divergencias[:5]]
+                ).values_list('id', 'nome_exibicao'))
+                for pid, esperado, obtido in divergencias[:5]:
+                    self.stdout.write(
+                        f'    {nomes.get(pid, pid)}: gravado {esperado} x calculado {obtido} '
+                        f'(pontos, acertos, exatos, posição)'
+                    )
+
+        if estrategias_divergentes and options['corrigir']:
+            Classificacao.atualizar_classificacao()
+            self.stdout.write(self.style.WARNING(
+                f'\nDivergência em: {", ".join(estrategias_divergentes)}. Classificação gravada reconstruída'
+            ))
+            return
+        if estrategias_divergentes:
+            raise CommandError(
+                f'Classificação gravada diverge em: {", ".join(estrategias_divergentes)}'
+            )
+        self.stdout.write(self.style.SUCCESS('\nTodas as estratégias conferem com a classificação gravada'))
+
+    def popular_sintetico(self, total_participantes, total_rodadas, semente):
+        """Times, rodadas com 10 jogos, participantes e ~90% de palpites; resultados até total_rodadas"""
+        rnd = random.Random(semente)
+        times = Time.objects.bulk_create([Time(nome=f'Time {i}', sigla=f'T{i:02d}') for i in range(20)])
+        usuarios = User.objects.bulk_create([User(username=f'sintetico{i}') for i in range(total_participantes)])
+        participantes = Participante.objects.bulk_create([
+            Participante(user=usuario, nome_exibicao=f'Participante {i}', invisivel=(i % 50 == 49))
+            for i, usuario in enumerate(usuarios)
+        ])
+
+        agora = timezone.now()
+        rodadas = []
+        for n in range(1, min(total_rodadas + 1, 38) + 1):
+            inicio = agora - timedelta(days=7 * (39 - n))
+            rodadas.append(Rodada(numero=n, data_inicio=inicio, data_fim=inicio + timedelta(days=3)))
+        rodadas = Rodada.objects.bulk_create(rodadas)
+        jogos = []
+        for rodada in rodadas:
+            ordem = rnd.sample(times, len(times))
+            finalizado = rodada.numero <= total_rodadas
+            for k in range(10):
+                jogos.append(Jogo(
+                    rodada=rodada, time_casa=ordem[2 * k], time_visitante=ordem[2 * k + 1],
+                    data_hora=rodada.data_inicio + timedelta(hours=k),
+                    gols_casa=rnd.randint(0, 4) if finalizado else None,
+                    gols_visitante=rnd.randint(0, 3) if finalizado else None,
+                    resultado_finalizado=finalizado,
+                ))
+        jogos = Jogo.objects.bulk_create(jogos)
+
+        # Palpites sorteados e pontuados de uma vez com o kernel vetorizado (bolao.pontuacao.pontuar)
+        gerador = np.random.default_rng(semente)
+        idx_participante, idx_jogo = np.nonzero(gerador.random((len(participantes), len(jogos))) < 0.9)
+        palpite_casa = gerador.integers(0, 4, len(idx_jogo))
+        palpite_visitante = gerador.integers(0, 4, len(idx_jogo))
+        gols_casa = np.array([-1 if jogo.gols_casa is None else jogo.gols_casa for jogo in jogos])
+        gols_visitante = np.array([-1 if jogo.gols_visitante is None else jogo.gols_visitante for jogo in jogos])
+        finalizado = np.array([jogo.resultado_finalizado for jogo in jogos])
+        pontos, acertou, placar_exato = pontuar(
+            palpite_casa, palpite_visitante, gols_casa[idx_jogo], gols_visitante[idx_jogo], finalizado[idx_jogo]
+        )
+        participantes_ids = np.array([participante.id for participante in participantes])
+        jogos_ids = np.array([jogo.id for jogo in jogos])
+        palpites = list(zip(
+            participantes_ids[idx_participante].tolist(), jogos_ids[idx_jogo].tolist(),
+            palpite_casa.tolist(), palpite_visitante.tolist(),
+            pontos.tolist(), acertou.tolist(), placar_exato.tolist(),
+        ))
+        # INSERT direto em lote: bulk_create prepara valor a valor e levava a maior parte do tempo
+        campos = ['participante', 'jogo', 'gols_casa_palpite', 'gols_visitante_palpite', 'pontos', 'acertou', 'placar_exato']
+        colunas = [Palpite._meta.get_field(campo).column for campo in campos] + ['data_palpite']
+        data_palpite = connection.ops.adapt_datetimefield_value(agora)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {connection.ops.quote_name(Palpite._meta.db_table)} '
+                f'({", ".join(connection.ops.quote_name(coluna) for coluna in colunas)}) '
+                f'VALUES ({", ".join(["%s"] * len(colunas))})',
+                [palpite + (data_palpite,) for palpite in palpites],
+            )
+        self.stdout.write(f'{len(participantes)} participantes, {len(jogos)} jogos, {len(palpites)} palpites')
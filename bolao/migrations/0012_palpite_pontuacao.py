@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:41
+
+from django.db import migrations, models
+
+
+def preencher_pontuacao(apps, schema_editor):
+    """Grava a pontuação dos palpites de jogos já finalizados (regra 3/1/0)"""
+    Jogo = apps.get_model("bolao", "Jogo")
+    Palpite = apps.get_model("bolao", "Palpite")
+
+    jogos = Jogo.objects.filter(
+        resultado_finalizado=True, gols_casa__isnull=False, gols_visitante__isnull=False
+    )
+    for jogo in jogos.iterator():
+        sinal_jogo = (jogo.gols_casa > jogo.gols_visitante) - (
+            jogo.gols_casa < jogo.gols_visitante
+        )
+        palpites = list(Palpite.objects.filter(jogo=jogo))
+        for palpite in palpites:
+            casa, visitante = palpite.gols_casa_palpite, palpite.gols_visitante_palpite
+            sinal_palpite = (casa > visitante) - (casa < visitante)
+            palpite.placar_exato = (
+                casa == jogo.gols_casa and visitante == jogo.gols_visitante
+            )
+            palpite.acertou = sinal_palpite == sinal_jogo
+            palpite.pontos = (
+                3 if palpite.placar_exato else (1 if palpite.acertou else 0)
+            )
+        Palpite.objects.bulk_update(palpites, ["pontos", "acertou", "placar_exato"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bolao", "0011_notification_vista_em"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="palpite",
+            name="acertou",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name="palpite",
+            name="placar_exato",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name="palpite",
+            name="pontos",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(preencher_pontuacao, migrations.RunPython.noop),
+    ]
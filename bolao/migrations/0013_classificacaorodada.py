@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bolao", "0012_palpite_pontuacao"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ClassificacaoRodada",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("posicao", models.PositiveIntegerField()),
+                ("pontos_totais", models.PositiveIntegerField(default=0)),
+                ("acertos_totais", models.PositiveIntegerField(default=0)),
+                ("pontos_rodada", models.PositiveIntegerField(default=0)),
+                ("acertos_rodada", models.PositiveIntegerField(default=0)),
+                ("registrada_em", models.DateTimeField(auto_now=True)),
+                (
+                    "participante",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="historico_classificacao",
+                        to="bolao.participante",
+                    ),
+                ),
+                (
+                    "rodada",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="classificacoes",
+                        to="bolao.rodada",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Classificação da Rodada",
+                "verbose_name_plural": "Classificações das Rodadas",
+                "ordering": ["rodada__numero", "posicao"],
+                "indexes": [
+                    models.Index(
+                        fields=["participante", "rodada"],
+                        name="bolao_clrod_participante_idx",
+                    )
+                ],
+                "unique_together": {("rodada", "participante")},
+            },
+        ),
+    ]
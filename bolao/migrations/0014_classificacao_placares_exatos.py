@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:53
+
+from django.db import migrations, models
+
+
+def preencher_placares_exatos(apps, schema_editor):
+    """Preenche o novo critério de desempate a partir da pontuação gravada nos palpites"""
+    Classificacao = apps.get_model("bolao", "Classificacao")
+    Palpite = apps.get_model("bolao", "Palpite")
+
+    linhas = list(Classificacao.objects.all())
+    if not linhas:
+        return
+
+    exatos = dict(
+        Palpite.objects.filter(placar_exato=True)
+        .values("participante_id")
+        .annotate(total=models.Count("id"))
+        .values_list("participante_id", "total")
+    )
+    for linha in linhas:
+        linha.placares_exatos = exatos.get(linha.participante_id, 0)
+    Classificacao.objects.bulk_update(linhas, ["placares_exatos"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bolao", "0013_classificacaorodada"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="classificacao",
+            name="placares_exatos",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(preencher_placares_exatos, migrations.RunPython.noop),
+    ]
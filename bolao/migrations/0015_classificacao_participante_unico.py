@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:54
+
+from django.db import migrations, models
+
+
+def remover_duplicadas(apps, schema_editor):
+    """Mantém só a linha mais recente de cada participante antes de criar a restrição"""
+    Classificacao = apps.get_model("bolao", "Classificacao")
+
+    vistos = set()
+    duplicadas = []
+    for linha in Classificacao.objects.order_by("-ultima_atualizacao", "-id"):
+        if linha.participante_id in vistos:
+            duplicadas.append(linha.id)
+        vistos.add(linha.participante_id)
+    Classificacao.objects.filter(id__in=duplicadas).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bolao", "0014_classificacao_placares_exatos"),
+    ]
+
+    operations = [
+        migrations.RunPython(remover_duplicadas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="classificacao",
+            constraint=models.UniqueConstraint(
+                fields=("participante",), name="bolao_classificacao_participante_unico"
+            ),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bolao", "0015_classificacao_participante_unico"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProbabilidadeTitulo",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("prob_titulo", models.FloatField(default=0)),
+                ("prob_top3", models.FloatField(default=0)),
+                ("prob_top10", models.FloatField(default=0)),
+                ("simulacoes", models.PositiveIntegerField(default=0)),
+                ("calculada_em", models.DateTimeField(auto_now=True)),
+                (
+                    "participante",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="probabilidades",
+                        to="bolao.participante",
+                    ),
+                ),
+                (
+                    "rodada",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="probabilidades",
+                        to="bolao.rodada",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Probabilidade de Título",
+                "verbose_name_plural": "Probabilidades de Título",
+                "ordering": ["rodada__numero", "-prob_titulo", "-prob_top3"],
+                "unique_together": {("rodada", "participante")},
+            },
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bolao", "0016_probabilidadetitulo"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ParticipanteStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("total_palpites", models.PositiveIntegerField(default=0)),
+                ("acertos", models.PositiveIntegerField(default=0)),
+                ("placares_exatos", models.PositiveIntegerField(default=0)),
+                ("pontos", models.PositiveIntegerField(default=0)),
+                ("pontos_melhor_rodada", models.PositiveIntegerField(default=0)),
+                ("pontos_rodada_corrente", models.PositiveIntegerField(default=0)),
+                ("sequencia_acertos", models.PositiveIntegerField(default=0)),
+                ("maior_sequencia_acertos", models.PositiveIntegerField(default=0)),
+                ("atualizado_em", models.DateTimeField(auto_now=True)),
+                (
+                    "melhor_rodada",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="bolao.rodada",
+                    ),
+                ),
+                (
+                    "participante",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stats",
+                        to="bolao.participante",
+                    ),
+                ),
+                (
+                    "rodada_corrente",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="bolao.rodada",
+                    ),
+                ),
+                (
+                    "ultimo_jogo",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="bolao.jogo",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Estatísticas do Participante",
+                "verbose_name_plural": "Estatísticas dos Participantes",
+            },
+        ),
+    ]
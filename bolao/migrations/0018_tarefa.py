@@ -0,0 +1,88 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bolao", "0017_participantestats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Tarefa",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("tipo", models.CharField(max_length=50)),
+                ("parametros", models.JSONField(blank=True, default=dict)),
+                (
+                    "chave",
+                    models.CharField(
+                        blank=True,
+                        help_text="Tarefas pendentes com a mesma chave são enfileiradas uma vez só",
+                        max_length=100,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pendente", "Pendente"),
+                            ("executando", "Executando"),
+                            ("concluida", "Concluída"),
+                            ("falhou", "Falhou"),
+                        ],
+                        default="pendente",
+                        max_length=12,
+                    ),
+                ),
+                ("tentativas", models.PositiveIntegerField(default=0)),
+                ("max_tentativas", models.PositiveIntegerField(default=5)),
+                (
+                    "executar_apos",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "bloqueada_ate",
+                    models.DateTimeField(
+                        blank=True, help_text="Fim da reserva do worker", null=True
+                    ),
+                ),
+                ("trabalhador", models.CharField(blank=True, max_length=100)),
+                ("ultimo_erro", models.TextField(blank=True)),
+                ("criada_em", models.DateTimeField(auto_now_add=True)),
+                ("concluida_em", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name": "Tarefa",
+                "verbose_name_plural": "Tarefas",
+                "ordering": ["-criada_em"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "executar_apos"],
+                        name="bolao_taref_status_6ce52a_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(
+                            ("status", "pendente"),
+                            models.Q(("chave", ""), _negated=True),
+                        ),
+                        fields=("chave",),
+                        name="bolao_tarefa_chave_pendente_unica",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:16
+
+import bolao.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bolao", "0018_tarefa"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Liga",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("nome", models.CharField(max_length=100)),
+                ("slug", models.SlugField(max_length=100, unique=True)),
+                ("descricao", models.TextField(blank=True)),
+                (
+                    "codigo_convite",
+                    models.CharField(
+                        default=bolao.models.gerar_codigo_convite,
+                        max_length=8,
+                        unique=True,
+                    ),
+                ),
+                ("ativa", models.BooleanField(default=True)),
+                ("criada_em", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Liga",
+                "verbose_name_plural": "Ligas",
+                "ordering": ["nome"],
+            },
+        ),
+        migrations.CreateModel(
+            name="LigaParticipante",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("entrou_em", models.DateTimeField(auto_now_add=True)),
+                (
+                    "liga",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="membros",
+                        to="bolao.liga",
+                    ),
+                ),
+                (
+                    "participante",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="participacoes_liga",
+                        to="bolao.participante",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Participante da Liga",
+                "verbose_name_plural": "Participantes da Liga",
+                "unique_together": {("liga", "participante")},
+            },
+        ),
+        migrations.AddField(
+            model_name="liga",
+            name="participantes",
+            field=models.ManyToManyField(
+                blank=True,
+                related_name="ligas",
+                through="bolao.LigaParticipante",
+                to="bolao.participante",
+            ),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:32
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bolao", "0019_ligas"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="rodada",
+            name="multiplicador",
+            field=models.PositiveSmallIntegerField(
+                default=1,
+                help_text="Multiplica os pontos de todos os palpites da rodada (2 = rodada de pontos em dobro)",
+                validators=[
+                    django.core.validators.MinValueValidator(1),
+                    django.core.validators.MaxValueValidator(5),
+                ],
+            ),
+        ),
+        migrations.CreateModel(
+            name="RegraPontuacao",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("nome", models.CharField(max_length=100)),
+                ("pontos_placar_exato", models.PositiveSmallIntegerField(default=3)),
+                (
+                    "pontos_resultado",
+                    models.PositiveSmallIntegerField(
+                        default=1, help_text="Acertou o vencedor ou o empate"
+                    ),
+                ),
+                (
+                    "pontos_saldo_gols",
+                    models.PositiveSmallIntegerField(
+                        default=0,
+                        help_text="Bônus, somado ao resultado, por acertar a diferença de gols",
+                    ),
+                ),
+                (
+                    "pontos_gols_time",
+                    models.PositiveSmallIntegerField(
+                        default=0,
+                        help_text="Bônus por acertar os gols de um dos times (sem acertar o placar)",
+                    ),
+                ),
+                ("vigente", models.BooleanField(default=False)),
+                ("criada_em", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Regra de Pontuação",
+                "verbose_name_plural": "Regras de Pontuação",
+                "ordering": ["-vigente", "-criada_em"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("vigente", True)),
+                        fields=("vigente",),
+                        name="bolao_regrapontuacao_uma_vigente",
+                    )
+                ],
+            },
+        ),
+    ]
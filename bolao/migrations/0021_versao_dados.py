@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bolao", "0020_regra_pontuacao"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VersaoDados",
+            fields=[
+                (
+                    "nome",
+                    models.CharField(max_length=50, primary_key=True, serialize=False),
+                ),
+                ("valor", models.BigIntegerField()),
+            ],
+            options={
+                "verbose_name": "Versão de dados",
+                "verbose_name_plural": "Versões de dados",
+            },
+        ),
+    ]
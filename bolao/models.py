@@ -1,10 +1,13 @@
 from django.db import models
+from django.db.models import Case, When, Value, Q, F, Sum, Count, IntegerField, ExpressionWrapper
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from PIL import Image
 import os
 from django.utils import timezone
 import uuid
+from . import versoes
 
 
 def redimensionar_imagem_perfil(instance, filename):
@@ -61,6 +64,7 @@ class Participante(models.Model):
     def save(self, *args, **kwargs):
         """Redimensiona a imagem ao salvar"""
         super().save(*args, **kwargs)
+        versoes.incrementar(versoes.PARTICIPANTES)
         
         if self.foto_perfil:
             try:
@@ -83,8 +87,7 @@ class Participante(models.Model):
     @property
     def pontos_totais(self):
         """Calcula o total de pontos do participante"""
-        palpites = self.palpite_set.filter(jogo__resultado_finalizado=True)
-        return sum(palpite.pontos_obtidos for palpite in palpites)
+        return self.palpite_set.totais()['total_pontos']
 
 
 class Rodada(models.Model):
@@ -94,6 +97,10 @@ class Rodada(models.Model):
     data_inicio = models.DateTimeField()
     data_fim = models.DateTimeField()
     ativa = models.BooleanField(default=False)
+    multiplicador = models.PositiveSmallIntegerField(
+        default=1, validators=[MinValueValidator(1), MaxValueValidator(5)],
+        help_text='Multiplica os pontos de todos os palpites da rodada (2 = rodada de pontos em dobro)'
+    )
     
     class Meta:
         verbose_name = 'Rodada'
@@ -103,6 +110,10 @@ class Rodada(models.Model):
     def __str__(self):
         return f"Rodada {self.numero}" + (f" - {self.nome}" if self.nome else "")
     
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        versoes.incrementar(versoes.RODADAS)
+    
     @property
     def status(self):
         """Retorna o status da rodada: futura, atual, encerrada"""
@@ -157,17 +168,285 @@ class Jogo(models.Model):
             return 'D'  # Derrota do time da casa (vitória visitante)
         else:
             return 'E'  # Empate
+    
+    def estado_resultado(self):
+        """Retorna (gols_casa, gols_visitante, resultado_finalizado) para comparar antes/depois de uma edição"""
+        return (self.gols_casa, self.gols_visitante, self.resultado_finalizado)
+    
+    def save(self, *args, **kwargs):
+        """Salva o jogo e regrava a pontuação armazenada dos palpites dele"""
+        super().save(*args, **kwargs)
+        self.recalcular_palpites()
+        versoes.incrementar(versoes.RESULTADOS, versoes.RODADAS)
+    
+    def recalcular_palpites(self):
+        """Grava pontos, acertou e placar_exato de todos os palpites do jogo em um único UPDATE"""
+        palpites = Palpite.objects.filter(jogo=self)
+        if not self.resultado_finalizado or self.gols_casa is None or self.gols_visitante is None:
+            return palpites.update(pontos=0, acertou=False, placar_exato=False)
+        
+        condicoes = _condicoes_pontuacao(jogo=self)
+        return palpites.update(
+            pontos=RegraPontuacao.atual().expressao_pontos(condicoes, self.rodada.multiplicador),
+            acertou=Case(When(condicoes['resultado'], then=Value(True)), default=Value(False)),
+            placar_exato=Case(When(condicoes['exato'], then=Value(True)), default=Value(False)),
+        )
+
+
+class RegraPontuacao(models.Model):
+    """
+    Regra de pontuação dos palpites. Só uma fica vigente; sem nenhuma cadastrada vale a 3/1/0.
+    
+    Placar exato vale pontos_placar_exato. Fora isso, os pontos somam: resultado certo, bônus por
+    acertar o saldo de gols e bônus por acertar os gols de um dos times. O total é multiplicado
+    pelo multiplicador da rodada. A mesma regra é compilada para SQL (expressao_pontos) e para
+    arrays (pontuacao.pontuar); a forma em Python (pontuar) serve para um palpite isolado.
+    """
+    nome = models.CharField(max_length=100)
+    pontos_placar_exato = models.PositiveSmallIntegerField(default=3)
+    pontos_resultado = models.PositiveSmallIntegerField(
+        default=1, help_text='Acertou o vencedor ou o empate'
+    )
+    pontos_saldo_gols = models.PositiveSmallIntegerField(
+        default=0, help_text='Bônus, somado ao resultado, por acertar a diferença de gols'
+    )
+    pontos_gols_time = models.PositiveSmallIntegerField(
+        default=0, help_text='Bônus por acertar os gols de um dos times (sem acertar o placar)'
+    )
+    vigente = models.BooleanField(default=False)
+    criada_em = models.DateTimeField(auto_now_add=True)
+    
+    CACHE_KEY = 'regra_pontuacao:vigente'
+    
+    class Meta:
+        verbose_name = 'Regra de Pontuação'
+        verbose_name_plural = 'Regras de Pontuação'
+        ordering = ['-vigente', '-criada_em']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['vigente'], condition=Q(vigente=True), name='bolao_regrapontuacao_uma_vigente'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.nome} ({self.descricao})"
+    
+    @property
+    def descricao(self):
+        partes = [f"exato {self.pontos_placar_exato}", f"resultado {self.pontos_resultado}"]
+        if self.pontos_saldo_gols:
+            partes.append(f"saldo +{self.pontos_saldo_gols}")
+        if self.pontos_gols_time:
+            partes.append(f"gols de um time +{self.pontos_gols_time}")
+        return ', '.join(partes)
+    
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        parcial = self.pontos_resultado + self.pontos_saldo_gols + self.pontos_gols_time
+        if self.pontos_placar_exato < parcial:
+            raise ValidationError(
+                f'O placar exato precisa valer pelo menos o resultado com os bônus ({parcial} pontos)'
+            )
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        versoes.incrementar(versoes.REGRA)
+    
+    @classmethod
+    def atual(cls):
+        """
+        Regra vigente (em cache, pela versão da regra, que é a mesma em todos os processos);
+        sem nenhuma marcada, uma regra 3/1/0 não salva
+        """
+        from django.core.cache import cache
+        chave = versoes.chave_versionada(cls.CACHE_KEY, versoes.REGRA)
+        regra = cache.get(chave)
+        if regra is None:
+            regra = cls.objects.filter(vigente=True).first() or cls(nome='Padrão')
+            cache.set(chave, regra, None)
+        return regra
+    
+    def ativar(self):
+        """Torna esta a regra vigente e repontua todos os palpites já gravados. Retorna quantos mudaram."""
+        from django.db import transaction
+        from .pontuacao import recalcular_em_lote
+        
+        with transaction.atomic():
+            RegraPontuacao.objects.filter(vigente=True).exclude(pk=self.pk).update(vigente=False)
+            self.vigente = True
+            self.save()
+            return recalcular_em_lote()
+    
+    def pontuar(self, gols_casa_palpite, gols_visitante_palpite, gols_casa, gols_visitante, multiplicador=1):
+        """Retorna (pontos, acertou, placar_exato) de um palpite para um placar conhecido"""
+        if gols_casa_palpite == gols_casa and gols_visitante_palpite == gols_visitante:
+            return self.pontos_placar_exato * multiplicador, True, True
+        
+        # Compara o sinal do saldo: 1 vitória casa, 0 empate, -1 vitória visitante
+        sinal_palpite = (gols_casa_palpite > gols_visitante_palpite) - (gols_casa_palpite < gols_visitante_palpite)
+        sinal_jogo = (gols_casa > gols_visitante) - (gols_casa < gols_visitante)
+        acertou = sinal_palpite == sinal_jogo
+        pontos = self.pontos_resultado if acertou else 0
+        if gols_casa_palpite - gols_visitante_palpite == gols_casa - gols_visitante:
+            pontos += self.pontos_saldo_gols
+        if gols_casa_palpite == gols_casa or gols_visitante_palpite == gols_visitante:
+            pontos += self.pontos_gols_time
+        return pontos * multiplicador, acertou, False
+    
+    def expressao_pontos(self, condicoes, multiplicador=1):
+        """
+        Expressão SQL com os pontos a partir das condições de _condicoes_pontuacao.
+        Parcelas que valem zero ficam fora do SQL. multiplicador: inteiro ou expressão.
+        """
+        parcelas = [
+            Case(When(condicoes[nome], then=Value(valor)), default=Value(0))
+            for nome, valor in (
+                ('resultado', self.pontos_resultado),
+                ('saldo', self.pontos_saldo_gols),
+                ('gols_time', self.pontos_gols_time),
+            )
+            if valor
+        ]
+        soma = parcelas[0] if parcelas else Value(0)
+        for parcela in parcelas[1:]:
+            soma = soma + parcela
+        pontos = Case(
+            When(condicoes['exato'], then=Value(self.pontos_placar_exato)),
+            default=soma,
+            output_field=IntegerField(),
+        )
+        if multiplicador == 1:
+            return pontos
+        if isinstance(multiplicador, int):
+            multiplicador = Value(multiplicador)
+        return ExpressionWrapper(pontos * multiplicador, output_field=IntegerField())
+
+
+def calcular_pontuacao(gols_casa_palpite, gols_visitante_palpite, gols_casa, gols_visitante, finalizado=True,
+                       multiplicador=1, regra=None):
+    """Retorna (pontos, acertou, placar_exato) de um palpite para um placar, pela regra vigente"""
+    if not finalizado or gols_casa is None or gols_visitante is None:
+        return 0, False, False
+    regra = regra or RegraPontuacao.atual()
+    return regra.pontuar(gols_casa_palpite, gols_visitante_palpite, gols_casa, gols_visitante, multiplicador)
+
+
+def _condicoes_pontuacao(prefixo='', jogo=None):
+    """
+    Condições de placar exato, resultado certo, saldo certo e gols de um time para um caminho até Palpite.
+    Use prefixo='' a partir de Palpite ou prefixo='palpite__' a partir de Participante/Jogo.
+    Com jogo (já finalizado), o placar dele entra como constante: serve ao UPDATE dos palpites
+    de um jogo, que não pode fazer JOIN.
+    """
+    casa, visitante = F(f'{prefixo}gols_casa_palpite'), F(f'{prefixo}gols_visitante_palpite')
+    if jogo is None:
+        finalizado = Q(**{f'{prefixo}jogo__resultado_finalizado': True})
+        gols_casa, gols_visitante = F(f'{prefixo}jogo__gols_casa'), F(f'{prefixo}jogo__gols_visitante')
+        saldo_jogo = gols_casa - gols_visitante
+        resultado = finalizado & (
+            # Vitória casa
+            Q(**{f'{prefixo}gols_casa_palpite__gt': visitante, f'{prefixo}jogo__gols_casa__gt': gols_visitante}) |
+            # Empate
+            Q(**{f'{prefixo}gols_casa_palpite': visitante, f'{prefixo}jogo__gols_casa': gols_visitante}) |
+            # Vitória visitante
+            Q(**{f'{prefixo}gols_casa_palpite__lt': visitante, f'{prefixo}jogo__gols_casa__lt': gols_visitante})
+        )
+    else:
+        finalizado = Q()
+        gols_casa, gols_visitante = jogo.gols_casa, jogo.gols_visitante
+        saldo_jogo = Value(gols_casa - gols_visitante)
+        if gols_casa > gols_visitante:
+            resultado = Q(**{f'{prefixo}gols_casa_palpite__gt': visitante})
+        elif gols_casa < gols_visitante:
+            resultado = Q(**{f'{prefixo}gols_casa_palpite__lt': visitante})
+        else:
+            resultado = Q(**{f'{prefixo}gols_casa_palpite': visitante})
+    
+    return {
+        'exato': finalizado & Q(**{
+            f'{prefixo}gols_casa_palpite': gols_casa,
+            f'{prefixo}gols_visitante_palpite': gols_visitante,
+        }),
+        'resultado': resultado,
+        'saldo': finalizado & Q(**{f'{prefixo}gols_casa_palpite': saldo_jogo + visitante}),
+        'gols_time': finalizado & (
+            Q(**{f'{prefixo}gols_casa_palpite': gols_casa}) | Q(**{f'{prefixo}gols_visitante_palpite': gols_visitante})
+        ),
+    }
+
+
+def expressao_pontos(prefixo=''):
+    """Expressão SQL com os pontos do palpite pela regra vigente e o multiplicador da rodada (0 em jogo aberto)"""
+    return RegraPontuacao.atual().expressao_pontos(
+        _condicoes_pontuacao(prefixo), F(f'{prefixo}jogo__rodada__multiplicador')
+    )
+
+
+def expressao_acerto(prefixo=''):
+    """Expressão SQL valendo 1 se o palpite acertou o resultado (inclui placar exato)"""
+    resultado = _condicoes_pontuacao(prefixo)['resultado']
+    return Case(When(resultado, then=Value(1)), default=Value(0), output_field=IntegerField())
+
+
+def expressao_placar_exato(prefixo=''):
+    """Expressão SQL valendo 1 se o palpite acertou o placar exato"""
+    exato = _condicoes_pontuacao(prefixo)['exato']
+    return Case(When(exato, then=Value(1)), default=Value(0), output_field=IntegerField())
+
+
+class PalpiteQuerySet(models.QuerySet):
+    """QuerySet de palpites com a pontuação calculada no próprio banco"""
+    
+    def with_pontos(self):
+        """Anota pontos_sql, acerto_sql e placar_exato_sql (0/1) em cada palpite"""
+        return self.annotate(
+            pontos_sql=expressao_pontos(),
+            acerto_sql=expressao_acerto(),
+            placar_exato_sql=expressao_placar_exato(),
+        )
+    
+    def _agregados(self):
+        # Lê as colunas gravadas em Jogo.recalcular_palpites, sem recalcular a regra
+        return {
+            'total_pontos': Coalesce(Sum('pontos'), 0),
+            'total_acertos': Count('id', filter=Q(acertou=True)),
+            'total_placares_exatos': Count('id', filter=Q(placar_exato=True)),
+            'total_palpites': Count('id', filter=Q(jogo__resultado_finalizado=True)),
+        }
+    
+    def divergentes(self):
+        """Palpites cuja pontuação gravada difere da calculada pela regra em SQL"""
+        return self.with_pontos().exclude(
+            pontos=F('pontos_sql'),
+            acertou=F('acerto_sql'),
+            placar_exato=F('placar_exato_sql'),
+        )
+    
+    def totais(self):
+        """Soma pontos, acertos, placares exatos e palpites finalizados em uma única consulta"""
+        return self.aggregate(**self._agregados())
+    
+    def totais_por(self, *campos):
+        """Mesmos totais agrupados por campos, ex.: totais_por('participante') ou totais_por('jogo__rodada')"""
+        return self.order_by().values(*campos).annotate(**self._agregados())
 
 
 class Palpite(models.Model):
     """Modelo para os palpites dos participantes"""
     
+    objects = PalpiteQuerySet.as_manager()
+    
     participante = models.ForeignKey(Participante, on_delete=models.CASCADE)
     jogo = models.ForeignKey(Jogo, on_delete=models.CASCADE)
     gols_casa_palpite = models.PositiveIntegerField(validators=[MinValueValidator(0), MaxValueValidator(20)], default=0)
     gols_visitante_palpite = models.PositiveIntegerField(validators=[MinValueValidator(0), MaxValueValidator(20)], default=0)
     data_palpite = models.DateTimeField(auto_now_add=True)
     
+    # Pontuação gravada quando o resultado do jogo é lançado (ver Jogo.recalcular_palpites)
+    pontos = models.PositiveSmallIntegerField(default=0, editable=False)
+    acertou = models.BooleanField(default=False, editable=False)
+    placar_exato = models.BooleanField(default=False, editable=False)
+    
     class Meta:
         verbose_name = 'Palpite'
         verbose_name_plural = 'Palpites'
@@ -177,20 +456,76 @@ class Palpite(models.Model):
     def __str__(self):
         return f"{self.participante.nome_exibicao} - {self.jogo.time_casa} {self.gols_casa_palpite} x {self.gols_visitante_palpite} {self.jogo.time_visitante}"
     
+    def save(self, *args, **kwargs):
+        """Preenche a pontuação gravada com base no resultado atual do jogo"""
+        jogo = self.jogo
+        self.pontos, self.acertou, self.placar_exato = calcular_pontuacao(
+            self.gols_casa_palpite, self.gols_visitante_palpite,
+            jogo.gols_casa, jogo.gols_visitante, jogo.resultado_finalizado,
+            # A rodada só é lida quando o jogo já tem resultado
+            multiplicador=jogo.rodada.multiplicador if jogo.resultado_finalizado else 1,
+        )
+        # save(update_fields=[...]) também grava a pontuação recalculada acima
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'pontos', 'acertou', 'placar_exato'}
+        super().save(*args, **kwargs)
+        versoes.incrementar(versoes.PALPITES)
+        
+        # Palpite de jogo já finalizado (correção pelo admin) muda as estatísticas do participante
+        # e tudo que está em cache a partir dos resultados
+        if self.jogo.resultado_finalizado:
+            versoes.incrementar(versoes.RESULTADOS)
+            ParticipanteStats.recalcular([self.participante_id])
+
+    @classmethod
+    def registrar(cls, participante, placares):
+        """
+        Grava de uma vez os palpites do participante; placares é {jogo: (gols_casa, gols_visitante)}.
+
+        Um único INSERT ... ON CONFLICT (participante, jogo) DO UPDATE numa transação, no lugar de
+        um get_or_create + save por jogo. A pontuação é preenchida como em save().
+        """
+        from django.db import transaction
+
+        regra = RegraPontuacao.atual()
+        palpites = []
+        for jogo, (gols_casa, gols_visitante) in placares.items():
+            pontos, acertou, placar_exato = calcular_pontuacao(
+                gols_casa, gols_visitante, jogo.gols_casa, jogo.gols_visitante, jogo.resultado_finalizado,
+                multiplicador=jogo.rodada.multiplicador if jogo.resultado_finalizado else 1,
+                regra=regra,
+            )
+            palpites.append(cls(
+                participante=participante, jogo=jogo,
+                gols_casa_palpite=gols_casa, gols_visitante_palpite=gols_visitante,
+                pontos=pontos, acertou=acertou, placar_exato=placar_exato,
+            ))
+        if not palpites:
+            return []
+
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                palpites,
+                update_conflicts=True,
+                unique_fields=['participante', 'jogo'],
+                update_fields=['gols_casa_palpite', 'gols_visitante_palpite', 'pontos', 'acertou', 'placar_exato'],
+            )
+        versoes.incrementar(versoes.PALPITES)
+
+        if any(jogo.resultado_finalizado for jogo in placares):
+            versoes.incrementar(versoes.RESULTADOS)
+            ParticipanteStats.recalcular([participante.id])
+        return palpites
+
     @property
     def pontos_obtidos(self):
-        """Calcula os pontos obtidos com base no resultado real do jogo"""
+        """Calcula os pontos obtidos com base no resultado real do jogo, pela regra vigente"""
         if not self.jogo.resultado_finalizado:
             return 0
-        
-        # Pontuação baseada no acerto dos gols
-        if (self.gols_casa_palpite == self.jogo.gols_casa and 
-            self.gols_visitante_palpite == self.jogo.gols_visitante):
-            return 3  # Placar exato = 3 pontos
-        elif self.resultado_palpite == self.jogo.resultado:
-            return 1  # Acertou apenas o resultado (quem ganha) = 1 ponto
-        else:
-            return 0  # Errou = 0 pontos
+        return calcular_pontuacao(
+            self.gols_casa_palpite, self.gols_visitante_palpite,
+            self.jogo.gols_casa, self.jogo.gols_visitante, multiplicador=self.jogo.rodada.multiplicador
+        )[0]
     
     @property
     def resultado_palpite(self):
@@ -202,21 +537,10 @@ class Palpite(models.Model):
         else:
             return 'E'  # Empate
     
-    @property
-    def acertou(self):
-        """Verifica se o palpite está correto (resultado ou placar exato)"""
-        if not self.jogo.resultado_finalizado:
-            return False
-        return (self.gols_casa_palpite == self.jogo.gols_casa and 
-                self.gols_visitante_palpite == self.jogo.gols_visitante) or \
-               self.resultado_palpite == self.jogo.resultado
-    
     @property
     def acertou_placar_exato(self):
-        """Verifica se acertou o placar exato"""
-        return (self.jogo.resultado_finalizado and 
-                self.gols_casa_palpite == self.jogo.gols_casa and 
-                self.gols_visitante_palpite == self.jogo.gols_visitante)
+        """Verifica se acertou o placar exato (valor gravado)"""
+        return self.placar_exato
 
 
 class Classificacao(models.Model):
@@ -225,6 +549,7 @@ class Classificacao(models.Model):
     posicao = models.PositiveIntegerField()
     pontos_totais = models.PositiveIntegerField(default=0)
     acertos_totais = models.PositiveIntegerField(default=0)
+    placares_exatos = models.PositiveIntegerField(default=0)  # Critério de desempate
     ultimo_saldo = models.IntegerField(default=0)  # Saldo da última rodada
     ultima_atualizacao = models.DateTimeField(auto_now=True)
     
@@ -232,62 +557,567 @@ class Classificacao(models.Model):
         verbose_name = 'Classificação'
         verbose_name_plural = 'Classificações'
         ordering = ['posicao']
+        constraints = [
+            models.UniqueConstraint(fields=['participante'], name='bolao_classificacao_participante_unico'),
+        ]
     
     def __str__(self):
         return f"{self.posicao}º - {self.participante.nome_exibicao} ({self.pontos_totais} pts)"
     
     @classmethod
     def atualizar_classificacao(cls):
-        """Método para atualizar toda a classificação"""
-        from django.db.models import Count, Q, F
-        
-        # Limpa classificação atual
-        cls.objects.all().delete()
+        """
+        Reconstrói toda a classificação e publica de uma vez.
         
-        # Pega a última rodada com jogos finalizados
-        ultima_rodada = Rodada.objects.filter(
-            jogo__resultado_finalizado=True
-        ).order_by('-numero').first()
+        As linhas são gravadas com um upsert em lote, as de quem saiu da classificação são
+        removidas e as posições refeitas, tudo na mesma transação: quem lê a tabela vê a
+        classificação anterior inteira até o commit, nunca uma tabela vazia ou pela metade.
+        """
+        from django.db import transaction
+        from .pontuacao import carregar_matriz
         
         participantes = Participante.objects.filter(ativo=True, invisivel=False)
-        classificacao_data = []
         
-        for participante in participantes:
-            palpites_finalizados = Palpite.objects.filter(
-                participante=participante,
-                jogo__resultado_finalizado=True
+        # Pontua todos os palpites de uma vez com o kernel vetorizado
+        matriz = carregar_matriz(participantes)
+        totais = matriz.totais()
+        saldos = matriz.saldo_rodada(matriz.ultima_rodada_finalizada())
+        
+        linhas = [
+            cls(
+                participante_id=participante_id,
+                posicao=0,
+                pontos_totais=int(totais['pontos'][i]),
+                acertos_totais=int(totais['acertos'][i]),
+                placares_exatos=int(totais['placares_exatos'][i]),
+                ultimo_saldo=int(saldos[i]),
             )
-            
-            pontos_totais = sum(palpite.pontos_obtidos for palpite in palpites_finalizados)
-            acertos_totais = sum(1 for palpite in palpites_finalizados if palpite.acertou)
-            
-            # Calcula saldo da última rodada (pontos ganhos na última rodada)
-            ultimo_saldo = 0
-            if ultima_rodada:
-                # Pontos da última rodada
-                palpites_ultima_rodada = Palpite.objects.filter(
-                    participante=participante,
-                    jogo__rodada=ultima_rodada,
-                    jogo__resultado_finalizado=True
-                )
-                ultimo_saldo = sum(palpite.pontos_obtidos for palpite in palpites_ultima_rodada)
-            
-            classificacao_data.append({
-                'participante': participante,
-                'pontos_totais': pontos_totais,
-                'acertos_totais': acertos_totais,
-                'ultimo_saldo': ultimo_saldo,
-            })
+            for i, participante_id in enumerate(matriz.participantes_ids.tolist())
+        ]
+        
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                linhas,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['participante'],
+                update_fields=['pontos_totais', 'acertos_totais', 'placares_exatos', 'ultimo_saldo', 'ultima_atualizacao'],
+            )
+            cls.objects.exclude(participante__in=participantes).delete()
+            # As posições saem do RANK() no banco
+            cls.recalcular_posicoes()
+    
+    @classmethod
+    def recalcular_posicoes(cls):
+        """
+        Refaz as posições com RANK() no próprio banco, em um único UPDATE.
+        
+        Critério: pontos, depois acertos, depois placares exatos. Quem empata em tudo divide
+        a mesma posição e a seguinte é pulada (1, 2, 2, 4...).
+        """
+        from django.db import connection
+        from django.db.models import Window
+        from django.db.models.functions import Rank
         
-        # Ordena por pontos (decrescente), depois por acertos (decrescente)
-        classificacao_data.sort(key=lambda x: (x['pontos_totais'], x['acertos_totais']), reverse=True)
+        ranking = cls.objects.order_by().annotate(
+            nova_posicao=Window(
+                expression=Rank(),
+                order_by=[F('pontos_totais').desc(), F('acertos_totais').desc(), F('placares_exatos').desc()],
+            )
+        ).values('id', 'nova_posicao')
+        sql, params = ranking.query.sql_with_params()
+        tabela = connection.ops.quote_name(cls._meta.db_table)
+        
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {tabela} SET posicao = ('
+                f'SELECT ranking.nova_posicao FROM ({sql}) ranking WHERE ranking.id = {tabela}.id'
+                f')',
+                params,
+            )
+            atualizadas = cursor.rowcount
+        versoes.incrementar(versoes.CLASSIFICACAO)
+        return atualizadas
+    
+    @classmethod
+    def aplicar_resultado_jogo(cls, jogo, estado_anterior=None):
+        """
+        Atualiza a classificação aplicando só a diferença de pontos dos palpites de um jogo.
+        
+        estado_anterior é o Jogo.estado_resultado() de antes da edição (None se o jogo é novo).
+        Quando a tabela não está sincronizada com os participantes ou a "última rodada" muda,
+        cai para a reconstrução completa. Retorna True se aplicou incrementalmente.
+        """
+        from django.db import transaction
+        from django.db.models import Max
+        
+        gols_casa_ant, gols_visitante_ant, finalizado_ant = estado_anterior or (None, None, False)
+        if estado_anterior == jogo.estado_resultado():
+            return True
         
-        # Cria registros de classificação
-        for posicao, data in enumerate(classificacao_data, 1):
-            cls.objects.create(
-                posicao=posicao,
-                **data
+        # O ultimo_saldo depende da última rodada com jogos finalizados; se ela muda, refaz tudo
+        numero_rodada = jogo.rodada.numero
+        outras = Jogo.objects.filter(resultado_finalizado=True).exclude(pk=jogo.pk).aggregate(
+            ultima=Max('rodada__numero')
+        )['ultima'] or 0
+        ultima_antes = max(outras, numero_rodada if finalizado_ant else 0)
+        ultima_depois = max(outras, numero_rodada if jogo.resultado_finalizado else 0)
+        if ultima_antes != ultima_depois:
+            cls.atualizar_classificacao()
+            return False
+        
+        participantes_ids = set(
+            Participante.objects.filter(ativo=True, invisivel=False).values_list('id', flat=True)
+        )
+        if set(cls.objects.values_list('participante_id', flat=True)) != participantes_ids:
+            cls.atualizar_classificacao()
+            return False
+        
+        conta_saldo = ultima_depois == numero_rodada
+        palpites = Palpite.objects.filter(jogo=jogo, participante_id__in=participantes_ids).values_list(
+            'participante_id', 'gols_casa_palpite', 'gols_visitante_palpite'
+        )
+        # Agrupa os participantes pela diferença (pontos, acertos, placares exatos): a regra só
+        # produz poucas combinações, então bastam poucos UPDATEs com incremento no próprio banco
+        regra, multiplicador = RegraPontuacao.atual(), jogo.rodada.multiplicador
+        por_diferenca = {}
+        for participante_id, palpite_casa, palpite_visitante in palpites:
+            pontos_ant, acertou_ant, exato_ant = calcular_pontuacao(
+                palpite_casa, palpite_visitante, gols_casa_ant, gols_visitante_ant, finalizado_ant,
+                multiplicador, regra
             )
+            pontos, acertou, exato = calcular_pontuacao(
+                palpite_casa, palpite_visitante, jogo.gols_casa, jogo.gols_visitante, jogo.resultado_finalizado,
+                multiplicador, regra
+            )
+            diferenca = (pontos - pontos_ant, int(acertou) - int(acertou_ant), int(exato) - int(exato_ant))
+            if any(diferenca):
+                por_diferenca.setdefault(diferenca, []).append(participante_id)
+        
+        # Grava os totais e refaz as posições com o mesmo RANK() da reconstrução
+        with transaction.atomic():
+            for (pontos, acertos, exatos), ids in por_diferenca.items():
+                for inicio in range(0, len(ids), 900):
+                    cls.objects.filter(participante_id__in=ids[inicio:inicio + 900]).update(
+                        pontos_totais=F('pontos_totais') + pontos,
+                        acertos_totais=F('acertos_totais') + acertos,
+                        placares_exatos=F('placares_exatos') + exatos,
+                        ultimo_saldo=F('ultimo_saldo') + (pontos if conta_saldo else 0),
+                    )
+            cls.objects.update(ultima_atualizacao=timezone.now())
+            cls.recalcular_posicoes()
+        return True
+
+
+class ClassificacaoRodada(models.Model):
+    """Fotografia da classificação no fechamento de cada rodada (histórico de posições)"""
+    rodada = models.ForeignKey(Rodada, on_delete=models.CASCADE, related_name='classificacoes')
+    participante = models.ForeignKey(Participante, on_delete=models.CASCADE, related_name='historico_classificacao')
+    posicao = models.PositiveIntegerField()
+    pontos_totais = models.PositiveIntegerField(default=0)  # Acumulado até a rodada
+    acertos_totais = models.PositiveIntegerField(default=0)  # Acumulado até a rodada
+    pontos_rodada = models.PositiveIntegerField(default=0)
+    acertos_rodada = models.PositiveIntegerField(default=0)
+    registrada_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Classificação da Rodada'
+        verbose_name_plural = 'Classificações das Rodadas'
+        ordering = ['rodada__numero', 'posicao']
+        unique_together = ('rodada', 'participante')
+        indexes = [
+            models.Index(fields=['participante', 'rodada'], name='bolao_clrod_participante_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.rodada} - {self.posicao}º {self.participante.nome_exibicao} ({self.pontos_totais} pts)"
+
+    @staticmethod
+    def rodadas_encerradas():
+        """Rodadas com jogos cadastrados e todos eles finalizados"""
+        return Rodada.objects.annotate(
+            total_jogos=Count('jogo'),
+            jogos_finalizados=Count('jogo', filter=Q(jogo__resultado_finalizado=True)),
+        ).filter(total_jogos__gt=0, total_jogos=F('jogos_finalizados'))
+
+    @classmethod
+    def sincronizar(cls, a_partir_de=None):
+        """
+        Grava a fotografia das rodadas encerradas que ainda não têm uma.
+
+        a_partir_de (número da rodada) regrava também as rodadas encerradas a partir dela, para
+        quando um resultado já fotografado é corrigido: os acumulados das seguintes mudam junto.
+        Fotografias de rodadas que deixaram de estar encerradas são removidas. Retorna as rodadas gravadas.
+        """
+        import numpy as np
+        from django.db import transaction
+        from .pontuacao import carregar_matriz, ranquear
+
+        encerradas = {rodada.numero: rodada for rodada in cls.rodadas_encerradas()}
+        registradas = set(cls.objects.values_list('rodada__numero', flat=True).distinct())
+        pendentes = [
+            numero for numero in sorted(encerradas)
+            if numero not in registradas or (a_partir_de is not None and numero >= a_partir_de)
+        ]
+        obsoletas = registradas - set(encerradas)
+        if not pendentes and not obsoletas:
+            return []
+
+        linhas = []
+        if pendentes:
+            participantes = Participante.objects.filter(ativo=True, invisivel=False)
+            jogos = Jogo.objects.filter(rodada__numero__lte=pendentes[-1])
+            matriz = carregar_matriz(participantes, jogos)
+
+            # Pontos e acertos por participante x rodada, acumulados ao longo das colunas
+            pontos_rodada = matriz.pontos_por_rodada()
+            acertos_rodada = matriz.acertos_por_rodada()
+            pontos_acumulados = pontos_rodada.cumsum(axis=1)
+            acertos_acumulados = acertos_rodada.cumsum(axis=1)
+            placares_acumulados = matriz.placares_por_rodada().cumsum(axis=1)
+            participantes_ids = matriz.participantes_ids.tolist()
+
+            for numero in pendentes:
+                coluna = int(np.searchsorted(matriz.rodadas, numero))
+                # Mesmo critério da classificação geral: pontos, acertos e placares exatos, com empates
+                posicoes = ranquear(
+                    pontos_acumulados[:, coluna], acertos_acumulados[:, coluna], placares_acumulados[:, coluna]
+                )
+                for i, participante_id in enumerate(participantes_ids):
+                    linhas.append(cls(
+                        rodada=encerradas[numero],
+                        participante_id=participante_id,
+                        posicao=int(posicoes[i]),
+                        pontos_totais=int(pontos_acumulados[i, coluna]),
+                        acertos_totais=int(acertos_acumulados[i, coluna]),
+                        pontos_rodada=int(pontos_rodada[i, coluna]),
+                        acertos_rodada=int(acertos_rodada[i, coluna]),
+                    ))
+
+        with transaction.atomic():
+            cls.objects.filter(rodada__numero__in=set(pendentes) | obsoletas).delete()
+            cls.objects.bulk_create(linhas, batch_size=500)
+        versoes.incrementar(versoes.CLASSIFICACAO)
+        return pendentes
+
+    @classmethod
+    def posicoes_anteriores(cls):
+        """
+        Posições da última rodada fotografada antes da rodada em andamento, por participante_id.
+        Serve de referência para as setas de "subiu/desceu N posições" da classificação.
+        """
+        from django.db.models import Max
+
+        ultima = Jogo.objects.filter(resultado_finalizado=True).aggregate(
+            ultima=Max('rodada__numero')
+        )['ultima']
+        if ultima is None:
+            return {}
+        referencia = cls.objects.filter(rodada__numero__lt=ultima).aggregate(
+            numero=Max('rodada__numero')
+        )['numero']
+        if referencia is None:
+            return {}
+        return dict(
+            cls.objects.filter(rodada__numero=referencia).values_list('participante_id', 'posicao')
+        )
+
+
+class ParticipanteStats(models.Model):
+    """Estatísticas agregadas de um participante, mantidas a cada resultado lançado"""
+    participante = models.OneToOneField(Participante, on_delete=models.CASCADE, related_name='stats')
+    total_palpites = models.PositiveIntegerField(default=0)  # Palpites em jogos finalizados
+    acertos = models.PositiveIntegerField(default=0)
+    placares_exatos = models.PositiveIntegerField(default=0)
+    pontos = models.PositiveIntegerField(default=0)
+    melhor_rodada = models.ForeignKey(Rodada, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    pontos_melhor_rodada = models.PositiveIntegerField(default=0)
+    # Rodada de maior número com jogo contado e os pontos dela (base do "último saldo")
+    rodada_corrente = models.ForeignKey(Rodada, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    pontos_rodada_corrente = models.PositiveIntegerField(default=0)
+    # Sequências de acertos em ordem cronológica dos jogos
+    sequencia_acertos = models.PositiveIntegerField(default=0)
+    maior_sequencia_acertos = models.PositiveIntegerField(default=0)
+    ultimo_jogo = models.ForeignKey(Jogo, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Estatísticas do Participante'
+        verbose_name_plural = 'Estatísticas dos Participantes'
+
+    def __str__(self):
+        return f"{self.participante.nome_exibicao}: {self.pontos} pts em {self.total_palpites} palpites"
+
+    @property
+    def porcentagem_acerto(self):
+        return round(self.acertos / self.total_palpites * 100, 1) if self.total_palpites else 0
+
+    @classmethod
+    def obter(cls, participante):
+        """Busca as estatísticas do participante, calculando na hora se ainda não existirem"""
+        consulta = cls.objects.select_related('melhor_rodada', 'rodada_corrente')
+        try:
+            return consulta.get(participante=participante)
+        except cls.DoesNotExist:
+            cls.recalcular([participante.id])
+            return consulta.get(participante=participante)
+
+    @classmethod
+    def recalcular(cls, participantes_ids=None):
+        """
+        Recalcula do zero as estatísticas dos participantes informados (padrão: todos) a partir
+        da pontuação gravada nos palpites, em três consultas, e grava com um upsert em lote.
+        """
+        from django.db import transaction
+        from django.db.models import Sum
+
+        participantes = Participante.objects.all()
+        if participantes_ids is not None:
+            participantes = participantes.filter(id__in=participantes_ids)
+        ids = list(participantes.values_list('id', flat=True))
+        palpites = Palpite.objects.filter(participante_id__in=ids, jogo__resultado_finalizado=True)
+
+        stats = {participante_id: cls(participante_id=participante_id) for participante_id in ids}
+        for linha in palpites.totais_por('participante_id'):
+            item = stats[linha['participante_id']]
+            item.total_palpites = linha['total_palpites']
+            item.acertos = linha['total_acertos']
+            item.placares_exatos = linha['total_placares_exatos']
+            item.pontos = linha['total_pontos']
+
+        # Pontos por rodada: melhor rodada (a primeira em caso de empate) e a de maior número
+        por_rodada = palpites.order_by('participante_id', 'jogo__rodada__numero').values(
+            'participante_id', 'jogo__rodada_id', 'jogo__rodada__numero'
+        ).annotate(pontos_rodada=Sum('pontos'))
+        for linha in por_rodada:
+            item = stats[linha['participante_id']]
+            if item.melhor_rodada_id is None or linha['pontos_rodada'] > item.pontos_melhor_rodada:
+                item.melhor_rodada_id = linha['jogo__rodada_id']
+                item.pontos_melhor_rodada = linha['pontos_rodada']
+            item.rodada_corrente_id = linha['jogo__rodada_id']
+            item.pontos_rodada_corrente = linha['pontos_rodada']
+
+        # Sequências percorrendo os jogos em ordem cronológica
+        sequencia = palpites.order_by('participante_id', 'jogo__data_hora', 'jogo_id').values_list(
+            'participante_id', 'jogo_id', 'acertou'
+        )
+        for participante_id, jogo_id, acertou in sequencia.iterator(chunk_size=5000):
+            item = stats[participante_id]
+            item.sequencia_acertos = item.sequencia_acertos + 1 if acertou else 0
+            item.maior_sequencia_acertos = max(item.maior_sequencia_acertos, item.sequencia_acertos)
+            item.ultimo_jogo_id = jogo_id
+
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                stats.values(),
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['participante'],
+                update_fields=[
+                    'total_palpites', 'acertos', 'placares_exatos', 'pontos',
+                    'melhor_rodada', 'pontos_melhor_rodada', 'rodada_corrente', 'pontos_rodada_corrente',
+                    'sequencia_acertos', 'maior_sequencia_acertos', 'ultimo_jogo', 'atualizado_em',
+                ],
+            )
+        versoes.incrementar(versoes.CLASSIFICACAO)
+        return len(stats)
+
+    @classmethod
+    def aplicar_resultado_jogo(cls, jogo, estado_anterior=None):
+        """
+        Atualiza as estatísticas de quem palpitou no jogo.
+
+        O caso comum (jogo finalizado agora, posterior a tudo que já foi contado) soma só o
+        palpite deste jogo. Correções, jogos reabertos ou adiados fora de ordem recalculam do
+        zero apenas os participantes envolvidos.
+        """
+        from django.db import transaction
+
+        finalizado_ant = bool(estado_anterior and estado_anterior[2])
+        if estado_anterior == jogo.estado_resultado():
+            return
+
+        palpites = list(
+            Palpite.objects.filter(jogo=jogo).values_list('participante_id', 'pontos', 'acertou', 'placar_exato')
+        )
+        participantes_ids = [p[0] for p in palpites]
+        if finalizado_ant or not jogo.resultado_finalizado:
+            cls.recalcular(participantes_ids)
+            return
+
+        stats = {
+            item.participante_id: item
+            for item in cls.objects.filter(participante_id__in=participantes_ids).select_related(
+                'ultimo_jogo', 'rodada_corrente'
+            )
+        }
+        ordem_jogo = (jogo.data_hora, jogo.id)
+        numero_rodada = jogo.rodada.numero
+        agora = timezone.now()
+        atualizar, recalcular = [], []
+        for participante_id, pontos, acertou, placar_exato in palpites:
+            item = stats.get(participante_id)
+            if item is None or (
+                item.ultimo_jogo is not None and (item.ultimo_jogo.data_hora, item.ultimo_jogo.id) >= ordem_jogo
+            ) or (item.rodada_corrente is not None and item.rodada_corrente.numero > numero_rodada):
+                recalcular.append(participante_id)
+                continue
+
+            item.total_palpites += 1
+            item.acertos += int(acertou)
+            item.placares_exatos += int(placar_exato)
+            item.pontos += pontos
+            if item.rodada_corrente_id == jogo.rodada_id:
+                item.pontos_rodada_corrente += pontos
+            else:
+                item.rodada_corrente_id = jogo.rodada_id
+                item.pontos_rodada_corrente = pontos
+            if item.melhor_rodada_id is None or item.pontos_rodada_corrente > item.pontos_melhor_rodada:
+                item.melhor_rodada_id = jogo.rodada_id
+                item.pontos_melhor_rodada = item.pontos_rodada_corrente
+            item.sequencia_acertos = item.sequencia_acertos + 1 if acertou else 0
+            item.maior_sequencia_acertos = max(item.maior_sequencia_acertos, item.sequencia_acertos)
+            item.ultimo_jogo_id = jogo.id
+            item.atualizado_em = agora
+            atualizar.append(item)
+
+        with transaction.atomic():
+            cls.objects.bulk_update(atualizar, [
+                'total_palpites', 'acertos', 'placares_exatos', 'pontos',
+                'melhor_rodada', 'pontos_melhor_rodada', 'rodada_corrente', 'pontos_rodada_corrente',
+                'sequencia_acertos', 'maior_sequencia_acertos', 'ultimo_jogo', 'atualizado_em',
+            ], batch_size=500)
+        versoes.incrementar(versoes.CLASSIFICACAO)
+        if recalcular:
+            cls.recalcular(recalcular)
+
+
+class ProbabilidadeTitulo(models.Model):
+    """Chances de cada participante terminar em 1º, no top 3 e no top 10, estimadas a cada rodada"""
+    rodada = models.ForeignKey(Rodada, on_delete=models.CASCADE, related_name='probabilidades')
+    participante = models.ForeignKey(Participante, on_delete=models.CASCADE, related_name='probabilidades')
+    prob_titulo = models.FloatField(default=0)
+    prob_top3 = models.FloatField(default=0)
+    prob_top10 = models.FloatField(default=0)
+    simulacoes = models.PositiveIntegerField(default=0)
+    calculada_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Probabilidade de Título'
+        verbose_name_plural = 'Probabilidades de Título'
+        ordering = ['rodada__numero', '-prob_titulo', '-prob_top3']
+        unique_together = ('rodada', 'participante')
+
+    def __str__(self):
+        return f"{self.rodada} - {self.participante.nome_exibicao}: {self.prob_titulo:.1%}"
+
+    @classmethod
+    def calcular(cls, simulacoes=20000, processos=None, semente=None):
+        """
+        Roda o Monte Carlo de bolao.probabilidades e grava o resultado na rodada em andamento
+        (ou na última, se a temporada acabou). Retorna a rodada gravada.
+        """
+        from django.db import transaction
+        from .probabilidades import carregar_dados, simular_temporadas
+        from .simulacao import rodada_em_andamento
+
+        rodada = rodada_em_andamento() or Rodada.objects.order_by('-numero').first()
+        if rodada is None:
+            return None
+
+        participantes_ids, dados = carregar_dados()
+        probabilidades = simular_temporadas(dados, simulacoes, processos=processos, semente=semente)
+
+        linhas = [
+            cls(
+                rodada=rodada,
+                participante_id=participante_id,
+                prob_titulo=float(probabilidades[1][i]),
+                prob_top3=float(probabilidades[3][i]),
+                prob_top10=float(probabilidades[10][i]),
+                simulacoes=simulacoes,
+            )
+            for i, participante_id in enumerate(participantes_ids.tolist())
+        ]
+        with transaction.atomic():
+            cls.objects.filter(rodada=rodada).delete()
+            cls.objects.bulk_create(linhas, batch_size=500)
+        return rodada
+
+
+def gerar_codigo_convite():
+    """Código curto para entrar numa liga"""
+    return uuid.uuid4().hex[:8].upper()
+
+
+class Liga(models.Model):
+    """Grupo privado de participantes (bolão entre amigos) sobre os mesmos jogos e palpites"""
+    nome = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100, unique=True)
+    descricao = models.TextField(blank=True)
+    codigo_convite = models.CharField(max_length=8, unique=True, default=gerar_codigo_convite)
+    participantes = models.ManyToManyField(
+        Participante, through='LigaParticipante', related_name='ligas', blank=True
+    )
+    ativa = models.BooleanField(default=True)
+    criada_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Liga'
+        verbose_name_plural = 'Ligas'
+        ordering = ['nome']
+
+    def __str__(self):
+        return self.nome
+
+    @classmethod
+    def classificacoes(cls, ligas=None):
+        """
+        Classificação de várias ligas numa única consulta.
+
+        Os totais de cada participante já estão na Classificacao geral; cada liga só precisa
+        reordenar os seus membros. RANK() com PARTITION BY liga numera todas as ligas de uma vez,
+        com os mesmos critérios e empates da classificação geral.
+        Retorna LigaParticipante anotados com pontos_totais, acertos_totais, placares_exatos,
+        ultimo_saldo, posicao_geral e posicao, ordenados por liga e posição.
+        """
+        from django.db.models import Window
+        from django.db.models.functions import Rank
+
+        membros = LigaParticipante.objects.filter(participante__classificacao__isnull=False)
+        if ligas is not None:
+            membros = membros.filter(liga__in=ligas)
+        return membros.annotate(
+            pontos_totais=F('participante__classificacao__pontos_totais'),
+            acertos_totais=F('participante__classificacao__acertos_totais'),
+            placares_exatos=F('participante__classificacao__placares_exatos'),
+            ultimo_saldo=F('participante__classificacao__ultimo_saldo'),
+            posicao_geral=F('participante__classificacao__posicao'),
+            posicao=Window(
+                expression=Rank(),
+                partition_by=[F('liga_id')],
+                order_by=[
+                    F('participante__classificacao__pontos_totais').desc(),
+                    F('participante__classificacao__acertos_totais').desc(),
+                    F('participante__classificacao__placares_exatos').desc(),
+                ],
+            ),
+        ).select_related('participante', 'liga').order_by('liga__nome', 'liga_id', 'posicao', 'participante__nome_exibicao')
+
+
+class LigaParticipante(models.Model):
+    """Participação de um participante numa liga"""
+    liga = models.ForeignKey(Liga, on_delete=models.CASCADE, related_name='membros')
+    participante = models.ForeignKey(Participante, on_delete=models.CASCADE, related_name='participacoes_liga')
+    entrou_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Participante da Liga'
+        verbose_name_plural = 'Participantes da Liga'
+        unique_together = ('liga', 'participante')
+
+    def __str__(self):
+        return f"{self.liga} - {self.participante.nome_exibicao}"
 
 
 class AtualizacaoSite(models.Model):
@@ -307,6 +1137,10 @@ class AtualizacaoSite(models.Model):
     
     def __str__(self):
         return f"Versão {self.versao} - {self.titulo}"
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        versoes.incrementar(versoes.ATUALIZACOES)
 
 
 class AtualizacaoVista(models.Model):
@@ -520,3 +1354,166 @@ class Notification(models.Model):
     
     def __str__(self):
         return f"{self.participante.nome_exibicao} - {self.get_tipo_display()}"
+
+
+class Tarefa(models.Model):
+    """
+    Fila de tarefas pesadas no próprio banco, executadas pelo `manage.py run_worker`.
+    A reserva é um UPDATE condicional (funciona no SQLite, que não tem SELECT ... FOR UPDATE)
+    e vale por um prazo (lease): se o worker morrer, a tarefa volta a ficar disponível.
+    """
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('executando', 'Executando'),
+        ('concluida', 'Concluída'),
+        ('falhou', 'Falhou'),
+    ]
+
+    tipo = models.CharField(max_length=50)
+    parametros = models.JSONField(default=dict, blank=True)
+    chave = models.CharField(
+        max_length=100, blank=True, help_text='Tarefas pendentes com a mesma chave são enfileiradas uma vez só'
+    )
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default='pendente')
+    tentativas = models.PositiveIntegerField(default=0)
+    max_tentativas = models.PositiveIntegerField(default=5)
+    executar_apos = models.DateTimeField(default=timezone.now)
+    bloqueada_ate = models.DateTimeField(null=True, blank=True, help_text='Fim da reserva do worker')
+    trabalhador = models.CharField(max_length=100, blank=True)
+    ultimo_erro = models.TextField(blank=True)
+    criada_em = models.DateTimeField(auto_now_add=True)
+    concluida_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Tarefa'
+        verbose_name_plural = 'Tarefas'
+        ordering = ['-criada_em']
+        indexes = [
+            models.Index(fields=['status', 'executar_apos']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['chave'],
+                condition=Q(status='pendente') & ~Q(chave=''),
+                name='bolao_tarefa_chave_pendente_unica',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} ({self.get_status_display()})"
+
+    @classmethod
+    def enfileirar(cls, tipo, parametros=None, chave='', atraso=0, max_tentativas=5):
+        """
+        Coloca uma tarefa na fila. Se já existe uma pendente com a mesma chave, devolve essa
+        (a execução dela já vai pegar os dados mais recentes).
+        """
+        from datetime import timedelta
+        from django.db import IntegrityError, transaction
+
+        if chave:
+            existente = cls.objects.filter(chave=chave, status='pendente').first()
+            if existente:
+                return existente
+        try:
+            with transaction.atomic():
+                return cls.objects.create(
+                    tipo=tipo,
+                    parametros=parametros or {},
+                    chave=chave,
+                    max_tentativas=max_tentativas,
+                    executar_apos=timezone.now() + timedelta(seconds=atraso),
+                )
+        except IntegrityError:
+            # Outro processo enfileirou a mesma chave entre a consulta e o INSERT
+            return cls.objects.get(chave=chave, status='pendente')
+
+    @classmethod
+    def reservar(cls, trabalhador, duracao_reserva):
+        """
+        Reserva a próxima tarefa disponível para o trabalhador por duracao_reserva segundos.
+        Disponível: pendente com executar_apos vencido, ou em execução com a reserva expirada.
+        Retorna a tarefa reservada ou None.
+        """
+        from datetime import timedelta
+
+        agora = timezone.now()
+
+        # Reservas expiradas de tarefas que já gastaram todas as tentativas não voltam para a fila
+        cls.objects.filter(
+            status='executando', bloqueada_ate__lt=agora, tentativas__gte=F('max_tentativas')
+        ).update(status='falhou', bloqueada_ate=None, ultimo_erro='Reserva expirou na última tentativa')
+
+        disponiveis = cls.objects.filter(
+            Q(status='pendente', executar_apos__lte=agora) | Q(status='executando', bloqueada_ate__lt=agora)
+        ).order_by('executar_apos', 'id')
+
+        for candidata in disponiveis.values('id', 'status', 'tentativas')[:10]:
+            # UPDATE condicional: só um worker consegue mudar a linha a partir deste estado
+            reservadas = cls.objects.filter(
+                pk=candidata['id'], status=candidata['status'], tentativas=candidata['tentativas']
+            ).update(
+                status='executando',
+                trabalhador=trabalhador,
+                bloqueada_ate=agora + timedelta(seconds=duracao_reserva),
+                tentativas=F('tentativas') + 1,
+            )
+            if reservadas:
+                return cls.objects.get(pk=candidata['id'])
+        return None
+
+    @classmethod
+    def renovar_reservas(cls, ids, trabalhador, duracao_reserva):
+        """Estende a reserva das tarefas que o trabalhador ainda está executando"""
+        from datetime import timedelta
+
+        return cls.objects.filter(pk__in=ids, trabalhador=trabalhador, status='executando').update(
+            bloqueada_ate=timezone.now() + timedelta(seconds=duracao_reserva)
+        )
+
+    def concluir(self):
+        """Marca como concluída, se a reserva ainda é deste trabalhador"""
+        return Tarefa.objects.filter(
+            pk=self.pk, status='executando', trabalhador=self.trabalhador, tentativas=self.tentativas
+        ).update(status='concluida', bloqueada_ate=None, concluida_em=timezone.now(), ultimo_erro='')
+
+    def falhar(self, erro, backoff_base=30, backoff_maximo=3600):
+        """
+        Registra a falha. Se ainda há tentativas, volta para a fila com espera exponencial
+        (backoff_base, 2x, 4x... até backoff_maximo segundos); senão fica como falhou.
+        """
+        from datetime import timedelta
+
+        minha_reserva = Tarefa.objects.filter(
+            pk=self.pk, status='executando', trabalhador=self.trabalhador, tentativas=self.tentativas
+        )
+        if self.tentativas >= self.max_tentativas:
+            return minha_reserva.update(status='falhou', bloqueada_ate=None, ultimo_erro=erro)
+        if self.chave and Tarefa.objects.filter(chave=self.chave, status='pendente').exists():
+            # Já tem outra igual na fila; ela faz o trabalho desta
+            return minha_reserva.update(
+                status='falhou', bloqueada_ate=None, ultimo_erro=f'{erro}\n(substituída por tarefa pendente com a mesma chave)'
+            )
+        espera = min(backoff_base * 2 ** (self.tentativas - 1), backoff_maximo)
+        return minha_reserva.update(
+            status='pendente',
+            bloqueada_ate=None,
+            executar_apos=timezone.now() + timedelta(seconds=espera),
+            ultimo_erro=erro,
+        )
+
+
+class VersaoDados(models.Model):
+    """
+    Contador de versão de um conjunto de dados (ver bolao.versoes). Fica no banco para que
+    todos os processos (servidor web, run_worker, comandos) enxerguem o mesmo número.
+    """
+    nome = models.CharField(max_length=50, primary_key=True)
+    valor = models.BigIntegerField()
+
+    class Meta:
+        verbose_name = 'Versão de dados'
+        verbose_name_plural = 'Versões de dados'
+
+    def __str__(self):
+        return f"{self.nome}: {self.valor}"
@@ -0,0 +1,42 @@
+"""
+Planilha de palpites: jogos x participantes.
+
+Os palpites de todos os jogos pedidos vêm de uma única consulta (values_list, sem instanciar
+Palpite nem carregar o jogo de cada um) e são distribuídos numa grade com uma linha por jogo e
+uma célula por participante, na ordem das colunas. Os pontos são os gravados no palpite.
+"""
+from .models import Palpite
+
+
+def palpites_visiveis(rodada):
+    """Os palpites da rodada já podem ser vistos por todos (prazo encerrado: nem aberta nem futura)"""
+    return not rodada.pode_palpitar and rodada.status != 'futura'
+
+
+def montar_planilha(jogos, participantes):
+    """
+    Grade de palpites na ordem de jogos (linhas) e participantes (colunas).
+
+    Retorna lista de {'jogo', 'celulas'}; cada célula é None (sem palpite) ou dict com
+    gols_casa_palpite, gols_visitante_palpite, pontos, placar_exato e acertou.
+    """
+    colunas = {participante.id: i for i, participante in enumerate(participantes)}
+    linhas = {jogo.id: {'jogo': jogo, 'celulas': [None] * len(colunas)} for jogo in jogos}
+    if not linhas or not colunas:
+        return list(linhas.values())
+
+    palpites = Palpite.objects.order_by().filter(jogo_id__in=linhas).values_list(
+        'jogo_id', 'participante_id', 'gols_casa_palpite', 'gols_visitante_palpite', 'pontos', 'placar_exato', 'acertou'
+    )
+    for jogo_id, participante_id, gols_casa, gols_visitante, pontos, placar_exato, acertou in palpites:
+        coluna = colunas.get(participante_id)
+        if coluna is None:
+            continue
+        linhas[jogo_id]['celulas'][coluna] = {
+            'gols_casa_palpite': gols_casa,
+            'gols_visitante_palpite': gols_visitante,
+            'pontos': pontos,
+            'placar_exato': placar_exato,
+            'acertou': acertou,
+        }
+    return list(linhas.values())
@@ -0,0 +1,220 @@
+"""
+Motor de pontuação vetorizado do bolão.
+
+Carrega palpites e resultados como arrays inteiros e pontua todos de uma vez com NumPy,
+em vez de chamar Palpite.pontos_obtidos palpite por palpite.
+"""
+from itertools import chain
+
+import numpy as np
+from django.db import connection
+
+from . import versoes
+from .models import Jogo, Palpite, Participante, RegraPontuacao
+
+
+def ler_inteiros(queryset, colunas):
+    """
+    Executa um values_list direto no cursor e devolve um array int64 (linhas x colunas).
+    Pula a conversão linha a linha do ORM, que domina o tempo em temporadas inteiras.
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        linhas = chain.from_iterable(iter(lambda: cursor.fetchmany(5000), []))
+        valores = np.fromiter(chain.from_iterable(linhas), dtype=np.int64)
+    return valores.reshape(-1, colunas)
+
+
+def pontuar(palpite_casa, palpite_visitante, gols_casa, gols_visitante, finalizado, multiplicador=1, regra=None):
+    """
+    Versão vetorizada de calcular_pontuacao pela regra vigente (ou a informada).
+    Gols de jogos sem placar devem vir como -1; multiplicador pode ser um array por palpite.
+    Retorna (pontos, acerto, placar_exato).
+    """
+    regra = regra or RegraPontuacao.atual()
+    valido = finalizado & (gols_casa >= 0) & (gols_visitante >= 0)
+    placar_exato = valido & (palpite_casa == gols_casa) & (palpite_visitante == gols_visitante)
+    acerto = valido & (np.sign(palpite_casa - palpite_visitante) == np.sign(gols_casa - gols_visitante))
+
+    pontos = np.where(acerto, regra.pontos_resultado, 0)
+    if regra.pontos_saldo_gols:
+        pontos = pontos + np.where(valido & (palpite_casa - palpite_visitante == gols_casa - gols_visitante),
+                                   regra.pontos_saldo_gols, 0)
+    if regra.pontos_gols_time:
+        pontos = pontos + np.where(valido & ((palpite_casa == gols_casa) | (palpite_visitante == gols_visitante)),
+                                   regra.pontos_gols_time, 0)
+    pontos = np.where(placar_exato, regra.pontos_placar_exato, pontos) * multiplicador
+    return pontos.astype(np.int32), acerto, placar_exato
+
+
+def ranquear(*chaves):
+    """
+    Posições no estilo RANK() do SQL: ordena pelas chaves em ordem decrescente (a primeira manda)
+    e quem empata em todas divide a mesma posição, pulando as seguintes (1, 2, 2, 4...).
+    """
+    chaves = [np.asarray(chave) for chave in chaves]
+    ordem = np.lexsort([-chave for chave in reversed(chaves)])
+    novo_grupo = np.zeros(len(ordem), dtype=bool)
+    novo_grupo[:1] = True
+    for chave in chaves:
+        ordenada = chave[ordem]
+        novo_grupo[1:] |= ordenada[1:] != ordenada[:-1]
+    inicio_grupo = np.maximum.accumulate(np.where(novo_grupo, np.arange(len(ordem)), 0))
+    posicoes = np.empty(len(ordem), dtype=np.int64)
+    posicoes[ordem] = inicio_grupo + 1
+    return posicoes
+
+
+class MatrizPalpites:
+    """
+    Palpites de um conjunto de jogos e participantes em arrays compactos.
+
+    Cada palpite é uma linha (idx_participante, idx_jogo, palpite_casa, palpite_visitante);
+    os resultados ficam em arrays por jogo, na ordem de jogos_ids.
+    """
+
+    def __init__(self, participantes_ids, jogos, palpites):
+        self.participantes_ids = np.asarray(participantes_ids, dtype=np.int64)
+
+        # Jogos ordenados por id para localizar cada palpite com searchsorted
+        jogos = sorted(jogos)
+        self.jogos_ids = np.array([j[0] for j in jogos], dtype=np.int64)
+        self.rodada_jogo = np.array([j[1] for j in jogos], dtype=np.int32)
+        self.gols_casa = np.array([-1 if j[2] is None else j[2] for j in jogos], dtype=np.int32)
+        self.gols_visitante = np.array([-1 if j[3] is None else j[3] for j in jogos], dtype=np.int32)
+        self.finalizado = np.array([bool(j[4]) for j in jogos], dtype=bool)
+        self.multiplicador = np.array([j[5] for j in jogos], dtype=np.int32)
+
+        palpites = np.asarray(palpites, dtype=np.int64).reshape(-1, 4)
+        self.idx_participante = np.searchsorted(self.participantes_ids, palpites[:, 0])
+        self.idx_jogo = np.searchsorted(self.jogos_ids, palpites[:, 1])
+        self.palpite_casa = palpites[:, 2].astype(np.int32)
+        self.palpite_visitante = palpites[:, 3].astype(np.int32)
+
+        self.rodadas = np.unique(self.rodada_jogo)
+        self._pontuacao = None
+
+    @property
+    def total_participantes(self):
+        return len(self.participantes_ids)
+
+    def pontuacao(self):
+        """Pontua todos os palpites em uma passada: (pontos, acerto, placar_exato) por palpite"""
+        if self._pontuacao is None:
+            j = self.idx_jogo
+            self._pontuacao = pontuar(
+                self.palpite_casa, self.palpite_visitante,
+                self.gols_casa[j], self.gols_visitante[j], self.finalizado[j], self.multiplicador[j],
+            )
+        return self._pontuacao
+
+    def totais(self):
+        """Totais por participante, alinhados com participantes_ids"""
+        pontos, acerto, placar_exato = self.pontuacao()
+        n = self.total_participantes
+        p = self.idx_participante
+        return {
+            'pontos': np.bincount(p, weights=pontos, minlength=n).astype(np.int64),
+            'acertos': np.bincount(p, weights=acerto, minlength=n).astype(np.int64),
+            'placares_exatos': np.bincount(p, weights=placar_exato, minlength=n).astype(np.int64),
+            'palpites': np.bincount(p, weights=self.finalizado[self.idx_jogo], minlength=n).astype(np.int64),
+        }
+
+    def _por_rodada(self, valores):
+        """Soma valores por palpite em uma matriz participantes x rodadas (colunas na ordem de self.rodadas)"""
+        n, r = self.total_participantes, len(self.rodadas)
+        idx_rodada = np.searchsorted(self.rodadas, self.rodada_jogo[self.idx_jogo])
+        celulas = self.idx_participante * r + idx_rodada
+        return np.bincount(celulas, weights=valores, minlength=n * r).astype(np.int64).reshape(n, r)
+
+    def pontos_por_rodada(self):
+        """Matriz participantes x rodadas com os pontos de cada rodada (colunas na ordem de self.rodadas)"""
+        return self._por_rodada(self.pontuacao()[0])
+
+    def acertos_por_rodada(self):
+        """Matriz participantes x rodadas com os acertos de cada rodada"""
+        return self._por_rodada(self.pontuacao()[1])
+
+    def placares_por_rodada(self):
+        """Matriz participantes x rodadas com os placares exatos de cada rodada"""
+        return self._por_rodada(self.pontuacao()[2])
+
+    def ultima_rodada_finalizada(self):
+        """Número da última rodada com algum jogo finalizado (None se não houver)"""
+        finalizadas = self.rodada_jogo[self.finalizado]
+        return int(finalizadas.max()) if len(finalizadas) else None
+
+    def saldo_rodada(self, numero):
+        """Pontos de cada participante na rodada informada"""
+        if numero is None or numero not in self.rodadas:
+            return np.zeros(self.total_participantes, dtype=np.int64)
+        return self.pontos_por_rodada()[:, int(np.searchsorted(self.rodadas, numero))]
+
+
+def carregar_matriz(participantes=None, jogos=None):
+    """
+    Monta a MatrizPalpites a partir do banco com duas consultas.
+    participantes e jogos são querysets opcionais (padrão: ativos e visíveis / todos os jogos).
+    """
+    if participantes is None:
+        participantes = Participante.objects.filter(ativo=True, invisivel=False)
+    palpites = Palpite.objects.order_by().filter(participante__in=participantes.order_by().values('id'))
+    if jogos is None:
+        jogos = Jogo.objects.all()
+    else:
+        palpites = palpites.filter(jogo__in=jogos.order_by().values('id'))
+
+    participantes_ids = sorted(participantes.values_list('id', flat=True))
+    dados_jogos = list(jogos.order_by().values_list(
+        'id', 'rodada__numero', 'gols_casa', 'gols_visitante', 'resultado_finalizado', 'rodada__multiplicador'
+    ))
+    palpites = palpites.values_list('participante_id', 'jogo_id', 'gols_casa_palpite', 'gols_visitante_palpite')
+
+    return MatrizPalpites(participantes_ids, dados_jogos, ler_inteiros(palpites, 4))
+
+
+def recalcular_em_lote(jogos=None, gravar=True, tamanho_lote=900):
+    """
+    Pontua com o kernel vetorizado todos os palpites dos jogos e compara com a pontuação gravada.
+    Com gravar=True regrava só os palpites divergentes (repontuação em lote depois de trocar a regra
+    ou o multiplicador de uma rodada). Retorna quantos divergiam.
+    """
+    if jogos is None:
+        jogos = Jogo.objects.all()
+
+    dados_jogos = sorted(jogos.order_by().values_list(
+        'id', 'gols_casa', 'gols_visitante', 'resultado_finalizado', 'rodada__multiplicador'
+    ))
+    jogos_ids = np.array([j[0] for j in dados_jogos], dtype=np.int64)
+    gols_casa = np.array([-1 if j[1] is None else j[1] for j in dados_jogos], dtype=np.int32)
+    gols_visitante = np.array([-1 if j[2] is None else j[2] for j in dados_jogos], dtype=np.int32)
+    finalizado = np.array([bool(j[3]) for j in dados_jogos], dtype=bool)
+    multiplicador = np.array([j[4] for j in dados_jogos], dtype=np.int32)
+
+    linhas = Palpite.objects.order_by().filter(jogo__in=jogos.order_by().values('id')).values_list(
+        'id', 'jogo_id', 'gols_casa_palpite', 'gols_visitante_palpite', 'pontos', 'acertou', 'placar_exato'
+    )
+    dados = ler_inteiros(linhas, 7)
+
+    j = np.searchsorted(jogos_ids, dados[:, 1])
+    pontos, acerto, placar_exato = pontuar(
+        dados[:, 2], dados[:, 3], gols_casa[j], gols_visitante[j], finalizado[j], multiplicador[j]
+    )
+    divergentes = (dados[:, 4] != pontos) | (dados[:, 5] != acerto) | (dados[:, 6] != placar_exato)
+
+    if gravar:
+        # A regra só produz poucas combinações de (pontos, acerto, placar exato): um UPDATE por combinação
+        combinacoes = np.column_stack([pontos, acerto, placar_exato])[divergentes]
+        valores, grupo = np.unique(combinacoes, axis=0, return_inverse=True)
+        ids_divergentes = dados[divergentes, 0]
+        for k, (valor_pontos, valor_acerto, valor_exato) in enumerate(valores.tolist()):
+            ids = ids_divergentes[grupo.reshape(-1) == k].tolist()
+            for inicio in range(0, len(ids), tamanho_lote):
+                Palpite.objects.filter(id__in=ids[inicio:inicio + tamanho_lote]).update(
+                    pontos=valor_pontos, acertou=bool(valor_acerto), placar_exato=bool(valor_exato)
+                )
+        if divergentes.any():
+            versoes.incrementar(versoes.RESULTADOS)
+
+    return int(divergentes.sum())
@@ -0,0 +1,287 @@
+"""
+Probabilidades de título (1º, top 3, top 10) por simulação de Monte Carlo.
+
+Os placares dos jogos que faltam são sorteados de um modelo de Poisson ajustado nos jogos
+finalizados (força de ataque e defesa de cada time) e os palpites já feitos são pontuados
+contra cada temporada simulada. As simulações são divididas em fatias que rodam em paralelo
+num ProcessPoolExecutor.
+
+Este módulo só importa NumPy no topo: os processos filhos executam simular_fatia sem
+precisar carregar o Django.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Cada palpite vale uma chave única que ordena como a classificação: pontos, acertos, placares exatos.
+# Acertar o resultado soma os pontos do resultado e 1 acerto; saldo e gols de um time somam os bônus;
+# o placar exato soma o que falta para os pontos do exato e 1 placar exato.
+PESO_PONTOS = 1_000_000
+PESO_ACERTOS = 1_000
+# (placar exato, resultado, saldo de gols, gols de um time), como RegraPontuacao
+PONTOS_PADRAO = (3, 1, 0, 0)
+
+# Jogos "fictícios" somados a cada time para puxar médias de poucos jogos para a média da liga
+JOGOS_PRIORI = 3
+LIMITES_TOP = (1, 3, 10)
+TAMANHO_BLOCO = 500
+
+
+def ajustar_poisson(jogos_finalizados, times):
+    """
+    Ajusta médias de gols por time a partir de (time_casa, time_visitante, gols_casa, gols_visitante).
+    Retorna (media_casa, media_visitante, ataque, defesa), com ataque/defesa indexados como times.
+    """
+    indice = {time_id: i for i, time_id in enumerate(times)}
+    marcados = np.zeros(len(times))
+    sofridos = np.zeros(len(times))
+    partidas = np.zeros(len(times))
+    total_casa = total_visitante = 0
+    for casa, visitante, gols_casa, gols_visitante in jogos_finalizados:
+        c, v = indice[casa], indice[visitante]
+        marcados[c] += gols_casa
+        sofridos[c] += gols_visitante
+        marcados[v] += gols_visitante
+        sofridos[v] += gols_casa
+        partidas[c] += 1
+        partidas[v] += 1
+        total_casa += gols_casa
+        total_visitante += gols_visitante
+
+    n = len(jogos_finalizados)
+    # Sem histórico (ou só 0 a 0, que zeraria as médias e dividiria por zero), usa médias típicas do Brasileirão
+    if total_casa + total_visitante:
+        media_casa, media_visitante = total_casa / n, total_visitante / n
+    else:
+        media_casa, media_visitante = 1.4, 1.0
+    media_gols = (media_casa + media_visitante) / 2
+
+    ataque = (marcados + JOGOS_PRIORI * media_gols) / (partidas + JOGOS_PRIORI) / media_gols
+    defesa = (sofridos + JOGOS_PRIORI * media_gols) / (partidas + JOGOS_PRIORI) / media_gols
+    return media_casa, media_visitante, ataque, defesa
+
+
+def _matriz_por_valor(jogo, valor, participante, pesos, total_participantes):
+    """Uma linha por (jogo, valor) distinto entre os palpites; cada palpite põe seu peso na coluna do participante"""
+    distintos, linha = np.unique(np.column_stack([jogo, valor]), axis=0, return_inverse=True)
+    matriz = np.zeros((len(distintos), total_participantes))
+    matriz[linha.reshape(-1), participante] = pesos
+    return distintos, matriz
+
+
+def _matrizes(dados):
+    """
+    Expande os palpites compactos de montar_dados nas matrizes que levam o resultado simulado de
+    cada jogo à chave de cada participante. Roda uma vez por fatia, no processo que simula, e só
+    cobre os jogos que têm palpite.
+    """
+    pontos_exato, pontos_resultado, pontos_saldo, pontos_gols_time = dados['pontos']
+    total_participantes = len(dados['chave_base'])
+    participante = np.repeat(dados['donos'], np.diff(np.append(dados['inicios'], len(dados['jogo']))))
+    jogos_palpitados, jogo = np.unique(dados['jogo'], return_inverse=True)
+    jogo = jogo.reshape(-1)
+    palpite_casa = dados['casa'].astype(np.int64)
+    palpite_visitante = dados['visitante'].astype(np.int64)
+    peso = dados['multiplicador'].astype(np.int64) * PESO_PONTOS
+
+    matriz_sinais = np.zeros((3 * len(jogos_palpitados), total_participantes))
+    matriz_sinais[3 * jogo + dados['sinal'], participante] = pontos_resultado * peso + PESO_ACERTOS
+
+    # Placar exato: já ganhou resultado, saldo e gols dos dois times; soma a diferença até o exato
+    pontos_exato_extra = pontos_exato - pontos_resultado - pontos_saldo - 2 * pontos_gols_time
+    distintos, linha_exato = np.unique(
+        np.column_stack([jogo, palpite_casa, palpite_visitante]), axis=0, return_inverse=True
+    )
+    matriz_exatos = np.zeros((len(distintos), total_participantes))
+    matriz_exatos[linha_exato.reshape(-1), participante] = pontos_exato_extra * peso + 1
+
+    extras = []
+    if pontos_saldo:
+        extras.append(('saldo', palpite_casa - palpite_visitante, pontos_saldo))
+    if pontos_gols_time:
+        extras.extend([('casa', palpite_casa, pontos_gols_time), ('visitante', palpite_visitante, pontos_gols_time)])
+    matrizes_extras = []
+    for tipo, valor, valor_pontos in extras:
+        chaves_extra, matriz = _matriz_por_valor(jogo, valor, participante, valor_pontos * peso, total_participantes)
+        matrizes_extras.append((tipo, chaves_extra[:, 0], chaves_extra[:, 1], matriz))
+
+    return jogos_palpitados, matriz_sinais, matriz_exatos, distintos, matrizes_extras
+
+
+def simular_fatia(semente, simulacoes, dados):
+    """
+    Roda uma fatia das simulações e conta quantas vezes cada participante terminou em cada LIMITES_TOP.
+
+    dados vem de montar_dados: chave_base por participante, médias de gols por jogo e os palpites
+    em arrays compactos, expandidos aqui nas matrizes de pontuação (_matrizes).
+    """
+    rng = np.random.default_rng(semente)
+    lambda_casa, lambda_visitante = dados['lambda_casa'], dados['lambda_visitante']
+    total_jogos = len(lambda_casa)
+    base = dados['chave_base'].astype(np.float64)
+    jogos_palpitados, sinais, exatos, distintos, extras = _matrizes(dados)
+    palpite_jogo, palpite_casa, palpite_visitante = distintos[:, 0], distintos[:, 1], distintos[:, 2]
+
+    contagens = np.zeros((len(LIMITES_TOP), len(base)), dtype=np.int64)
+    colunas_sinal = 3 * np.arange(len(jogos_palpitados))
+    feitas = 0
+    while feitas < simulacoes:
+        bloco = min(TAMANHO_BLOCO, simulacoes - feitas)
+        # Sorteia todos os jogos restantes (a sequência aleatória não depende dos palpites),
+        # mas só os jogos com palpite pontuam
+        gols_casa = rng.poisson(lambda_casa, (bloco, total_jogos))[:, jogos_palpitados]
+        gols_visitante = rng.poisson(lambda_visitante, (bloco, total_jogos))[:, jogos_palpitados]
+
+        # Indicadoras do resultado (casa/empate/fora) e dos placares exatos palpitados por alguém
+        indicador_sinal = np.zeros((bloco, 3 * len(jogos_palpitados)))
+        sinal = np.sign(gols_casa - gols_visitante) + 1
+        np.put_along_axis(indicador_sinal, colunas_sinal + sinal, 1.0, axis=1)
+        indicador_exato = (
+            (gols_casa[:, palpite_jogo] == palpite_casa) & (gols_visitante[:, palpite_jogo] == palpite_visitante)
+        ).astype(np.float64)
+
+        # Duas multiplicações de matriz pontuam todos os palpites de todas as simulações do bloco
+        chaves = base + indicador_sinal @ sinais + indicador_exato @ exatos
+
+        # Bônus de saldo e de gols de um time (só quando a regra os usa): uma multiplicação cada
+        quantidades = {'saldo': gols_casa - gols_visitante, 'casa': gols_casa, 'visitante': gols_visitante}
+        for tipo, extra_jogo, extra_valor, matriz in extras:
+            chaves += (quantidades[tipo][:, extra_jogo] == extra_valor).astype(np.float64) @ matriz
+
+        # Posição estilo RANK(): fica no top k quem tem chave >= a k-ésima maior
+        decrescente = -chaves
+        for i, limite in enumerate(LIMITES_TOP):
+            if limite > chaves.shape[1]:
+                contagens[i] += bloco
+                continue
+            corte = -np.partition(decrescente, limite - 1, axis=1)[:, limite - 1]
+            contagens[i] += (chaves >= corte[:, None]).sum(axis=0)
+        feitas += bloco
+    return contagens
+
+
+def montar_dados(participantes_ids, chave_base, jogos, palpites, modelo, pontos=PONTOS_PADRAO):
+    """
+    Prepara os arrays usados por simular_fatia.
+
+    jogos: lista de (jogo_id, time_casa_idx, time_visitante_idx[, multiplicador]) dos jogos restantes.
+    palpites: array (participante_idx, jogo_idx, casa, visitante) desses jogos.
+    modelo: saída de ajustar_poisson.
+    pontos: (placar exato, resultado, saldo de gols, gols de um time) da regra vigente.
+
+    Os palpites ficam em arrays de inteiros pequenos, ordenados por participante (donos e inicios
+    marcam o trecho de cada um), em vez de matrizes jogos x participantes quase todas vazias: é o
+    que vai para cada processo filho. As matrizes saem deles na hora de simular (_matrizes).
+    """
+    media_casa, media_visitante, ataque, defesa = modelo
+    casa = np.array([j[1] for j in jogos], dtype=np.int64)
+    visitante = np.array([j[2] for j in jogos], dtype=np.int64)
+    multiplicador = np.array([j[3] if len(j) > 3 else 1 for j in jogos], dtype=np.int8)
+
+    palpites = np.asarray(palpites, dtype=np.int64).reshape(-1, 4)
+    palpites = palpites[np.argsort(palpites[:, 0], kind='stable')]
+    participante, jogo = palpites[:, 0], palpites[:, 1]
+    donos, inicios = np.unique(participante, return_index=True)
+
+    return {
+        'chave_base': np.asarray(chave_base, dtype=np.int64),
+        'lambda_casa': media_casa * ataque[casa] * defesa[visitante],
+        'lambda_visitante': media_visitante * ataque[visitante] * defesa[casa],
+        'pontos': tuple(int(valor) for valor in pontos),
+        'donos': donos.astype(np.int32),
+        'inicios': inicios.astype(np.int32),
+        'jogo': jogo.astype(np.int32),
+        'multiplicador': multiplicador[jogo],
+        'sinal': (np.sign(palpites[:, 2] - palpites[:, 3]) + 1).astype(np.int8),
+        'casa': palpites[:, 2].astype(np.int8),
+        'visitante': palpites[:, 3].astype(np.int8),
+    }
+
+
+# Dados da simulação em cada processo filho, recebidos uma vez só pelo initializer do pool
+_dados_processo = None
+
+
+def _receber_dados(dados):
+    global _dados_processo
+    _dados_processo = dados
+
+
+def _simular_fatia_processo(semente, simulacoes):
+    return simular_fatia(semente, simulacoes, _dados_processo)
+
+
+def simular_temporadas(dados, simulacoes, processos=None, semente=None):
+    """
+    Divide as simulações em fatias (uma por processo) e soma as contagens.
+    processos=1 roda tudo no processo atual. Retorna {limite: array de probabilidades}.
+    """
+    processos = processos or os.cpu_count() or 1
+    fatias = [simulacoes // processos + (1 if i < simulacoes % processos else 0) for i in range(processos)]
+    fatias = [fatia for fatia in fatias if fatia]
+    sementes = np.random.SeedSequence(semente).spawn(len(fatias))
+
+    if len(fatias) == 1:
+        contagens = simular_fatia(sementes[0], fatias[0], dados)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=len(fatias), initializer=_receber_dados, initargs=(dados,)
+        ) as executor:
+            contagens = sum(executor.map(_simular_fatia_processo, sementes, fatias))
+
+    return {limite: contagens[i] / simulacoes for i, limite in enumerate(LIMITES_TOP)}
+
+
+def carregar_dados():
+    """
+    Lê do banco os participantes da classificação, o modelo de gols e os palpites dos jogos restantes.
+    Retorna (participantes_ids, dados para simular_fatia).
+    """
+    from .models import Jogo, Palpite, RegraPontuacao, Time
+    from .pontuacao import ler_inteiros
+    from .simulacao import dados_base
+
+    base = dados_base()
+    participantes_ids = base['ids']
+    chave_base = (
+        base['pontos'] * PESO_PONTOS + base['acertos'] * PESO_ACERTOS + base['placares_exatos']
+    )
+
+    times = list(Time.objects.order_by('id').values_list('id', flat=True))
+    finalizados = list(
+        Jogo.objects.filter(
+            resultado_finalizado=True, gols_casa__isnull=False, gols_visitante__isnull=False
+        ).values_list('time_casa_id', 'time_visitante_id', 'gols_casa', 'gols_visitante')
+    )
+    modelo = ajustar_poisson(finalizados, times)
+
+    indice_time = {time_id: i for i, time_id in enumerate(times)}
+    restantes = sorted(
+        Jogo.objects.filter(resultado_finalizado=False).values_list(
+            'id', 'time_casa_id', 'time_visitante_id', 'rodada__multiplicador'
+        )
+    )
+    jogos_ids = np.array([j[0] for j in restantes], dtype=np.int64)
+    jogos = [(j[0], indice_time[j[1]], indice_time[j[2]], j[3]) for j in restantes]
+
+    linhas = ler_inteiros(
+        Palpite.objects.order_by().filter(
+            jogo__resultado_finalizado=False, participante__ativo=True, participante__invisivel=False
+        ).values_list('participante_id', 'jogo_id', 'gols_casa_palpite', 'gols_visitante_palpite'),
+        4,
+    )
+    # Só palpites de quem está na base (mesma lista de participantes da simulação "e se?")
+    idx_participante = np.searchsorted(participantes_ids, linhas[:, 0])
+    conhecidos = idx_participante < len(participantes_ids)
+    conhecidos[conhecidos] = participantes_ids[idx_participante[conhecidos]] == linhas[conhecidos, 0]
+    palpites = np.column_stack([
+        idx_participante[conhecidos],
+        np.searchsorted(jogos_ids, linhas[conhecidos, 1]),
+        linhas[conhecidos, 2],
+        linhas[conhecidos, 3],
+    ]).astype(np.int64).reshape(-1, 4)
+
+    regra = RegraPontuacao.atual()
+    pontos = (regra.pontos_placar_exato, regra.pontos_resultado, regra.pontos_saldo_gols, regra.pontos_gols_time)
+    return participantes_ids, montar_dados(participantes_ids, chave_base, jogos, palpites, modelo, pontos)
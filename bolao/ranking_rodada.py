@@ -0,0 +1,61 @@
+"""
+Ranking da rodada: pontos feitos dentro de uma rodada, com posição e empates.
+
+Calculado com uma única consulta agrupada (RANK() sobre as somas por participante) e guardado
+em cache por rodada e versão dos resultados: cada resultado lançado ou corrigido invalida
+tudo e a próxima leitura recalcula só a rodada pedida.
+"""
+from django.core.cache import cache
+from django.db.models import F, Window
+from django.db.models.functions import Rank
+
+from . import versoes
+from .models import Palpite
+
+CACHE_TIMEOUT = 60 * 60
+
+
+def ranking_rodada(rodada_id):
+    """
+    Ranking dos jogos já finalizados da rodada, entre os participantes da classificação.
+
+    Retorna dict com 'linhas' (participante_id, nome, posicao, pontos, acertos, placares_exatos,
+    palpites), 'por_participante' (participante_id -> linha), 'total_pontos' e 'total_palpites'.
+    """
+    chave = versoes.chave_versionada(f'ranking_rodada:{rodada_id}', versoes.RESULTADOS, versoes.PARTICIPANTES)
+    dados = cache.get(chave)
+    if dados is not None:
+        return dados
+
+    consulta = Palpite.objects.filter(
+        jogo__rodada_id=rodada_id,
+        jogo__resultado_finalizado=True,
+        participante__ativo=True,
+        participante__invisivel=False,
+    ).totais_por('participante_id', 'participante__nome_exibicao').annotate(
+        posicao=Window(
+            expression=Rank(),
+            order_by=[F('total_pontos').desc(), F('total_acertos').desc(), F('total_placares_exatos').desc()],
+        )
+    ).order_by('posicao', 'participante__nome_exibicao')
+
+    linhas = [
+        {
+            'participante_id': linha['participante_id'],
+            'nome': linha['participante__nome_exibicao'],
+            'posicao': linha['posicao'],
+            'pontos': linha['total_pontos'],
+            'acertos': linha['total_acertos'],
+            'placares_exatos': linha['total_placares_exatos'],
+            'palpites': linha['total_palpites'],
+        }
+        for linha in consulta
+    ]
+    dados = {
+        'linhas': linhas,
+        'por_participante': {linha['participante_id']: linha for linha in linhas},
+        'total_pontos': sum(linha['pontos'] for linha in linhas),
+        'total_palpites': sum(linha['palpites'] for linha in linhas),
+    }
+    cache.set(chave, dados, CACHE_TIMEOUT)
+    return dados
@@ -0,0 +1,163 @@
+"""
+Recálculo da classificação em segundo plano, com agrupamento (debounce).
+
+Cada edição de resultado só registra o jogo como pendente e reinicia um timer. Quando o admin
+para de editar por RECALCULO_ATRASO segundos, uma thread aplica tudo de uma vez: um jogo
+pendente vira atualização incremental, vários viram uma única reconstrução. O estado fica na
+memória do processo (o servidor roda em um processo só).
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from . import versoes
+
+logger = logging.getLogger(__name__)
+
+_trava = threading.Lock()
+_trava_execucao = threading.Lock()
+_timer = None
+
+# Jogos pendentes: jogo_id -> estado_resultado() de antes da primeira edição ainda não aplicada
+_jogos_pendentes = {}
+_reconstruir_tudo = False
+_agendado_para = None
+_em_execucao = False
+_ultima_conclusao = None
+_ultimo_erro = None
+
+
+def _em_segundo_plano():
+    return getattr(settings, 'RECALCULO_EM_SEGUNDO_PLANO', True)
+
+
+def _reiniciar_timer(atraso=None):
+    """Agenda (ou adia) a execução para daqui a atraso (padrão RECALCULO_ATRASO) segundos. Chamar com _trava."""
+    global _timer, _agendado_para
+    if atraso is None:
+        atraso = getattr(settings, 'RECALCULO_ATRASO', 3)
+    if _timer is not None:
+        _timer.cancel()
+    _timer = threading.Timer(atraso, _executar_em_thread)
+    _agendado_para = timezone.now() + timedelta(seconds=atraso)
+    _timer.start()
+
+
+def agendar_jogo(jogo, estado_anterior):
+    """Registra que o resultado do jogo mudou; estado_anterior é o Jogo.estado_resultado() de antes da edição"""
+    with _trava:
+        # Se o jogo já estava pendente, vale o estado de antes da primeira edição
+        _jogos_pendentes.setdefault(jogo.id, estado_anterior)
+        if _em_segundo_plano():
+            _reiniciar_timer()
+    # Páginas que mostram "recálculo pendente" mudam
+    versoes.incrementar(versoes.CLASSIFICACAO)
+    if not _em_segundo_plano():
+        executar_pendentes()
+
+
+def reconstruir_agora():
+    """Reconstrói classificação e estatísticas na hora, absorvendo o que estava pendente"""
+    global _reconstruir_tudo
+    with _trava:
+        _reconstruir_tudo = True
+        if _timer is not None:
+            _timer.cancel()
+    executar_pendentes()
+    return status()['ultimo_erro'] is None
+
+
+def _executar_em_thread():
+    try:
+        executar_pendentes()
+    finally:
+        # A thread abre a própria conexão; fecha para não deixar o SQLite preso
+        connection.close()
+
+
+def executar_pendentes():
+    """Aplica tudo que está pendente. Retorna False se não havia nada a fazer."""
+    global _reconstruir_tudo, _agendado_para, _em_execucao, _ultima_conclusao, _ultimo_erro, _timer
+    from .models import Jogo, Classificacao, ClassificacaoRodada, ParticipanteStats
+
+    with _trava_execucao:
+        with _trava:
+            pendentes = dict(_jogos_pendentes)
+            _jogos_pendentes.clear()
+            reconstruir = _reconstruir_tudo
+            _reconstruir_tudo = False
+            _agendado_para = None
+            if _timer is not None:
+                _timer.cancel()  # Execução direta (não pelo timer): o timer não precisa mais disparar
+                _timer = None
+            if not pendentes and not reconstruir:
+                return False
+            _em_execucao = True
+
+        close_old_connections()
+        try:
+            jogos = sorted(
+                Jogo.objects.filter(id__in=pendentes).select_related('rodada'),
+                key=lambda jogo: (jogo.data_hora, jogo.id),
+            )
+            if len(jogos) != len(pendentes):
+                reconstruir = True  # Algum jogo foi apagado nesse meio tempo
+
+            if reconstruir:
+                Classificacao.atualizar_classificacao()
+                ParticipanteStats.recalcular()
+            else:
+                for jogo in jogos:
+                    ParticipanteStats.aplicar_resultado_jogo(jogo, pendentes[jogo.id])
+                if len(jogos) == 1:
+                    Classificacao.aplicar_resultado_jogo(jogos[0], pendentes[jogos[0].id])
+                else:
+                    Classificacao.atualizar_classificacao()
+
+            # Fotografias de rodada: regrava a partir da menor rodada tocada
+            ClassificacaoRodada.sincronizar(
+                a_partir_de=1 if reconstruir else min(jogo.rodada.numero for jogo in jogos)
+            )
+            _ultimo_erro = None
+            logger.info(
+                f"Classificação recalculada ({'completa' if reconstruir else f'{len(jogos)} jogo(s)'})"
+            )
+        except Exception as e:
+            _ultimo_erro = str(e)
+            logger.exception("Erro ao recalcular a classificação")
+            with _trava:
+                # Devolve os jogos para a fila (o estado de antes da primeira edição continua valendo).
+                # Parte da atualização incremental pode ter sido gravada: a nova tentativa reconstrói tudo.
+                _jogos_pendentes.update(pendentes)
+                _reconstruir_tudo = True
+                if _em_segundo_plano():
+                    _reiniciar_timer(getattr(settings, 'RECALCULO_ATRASO_ERRO', 30))
+        finally:
+            with _trava:
+                _em_execucao = False
+                _ultima_conclusao = timezone.now()
+            versoes.incrementar(versoes.CLASSIFICACAO)
+    return True
+
+
+def status():
+    """Situação do recálculo para indicadores de "classificação atualizada" """
+    with _trava:
+        return {
+            'pendente': bool(_jogos_pendentes) or _reconstruir_tudo,
+            'em_execucao': _em_execucao,
+            'jogos_pendentes': len(_jogos_pendentes),
+            'agendado_para': _agendado_para,
+            'ultima_conclusao': _ultima_conclusao,
+            'ultimo_erro': _ultimo_erro,
+        }
+
+
+def atualizada():
+    """True quando não há recálculo pendente nem rodando"""
+    situacao = status()
+    return not situacao['pendente'] and not situacao['em_execucao']
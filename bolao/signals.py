@@ -0,0 +1,28 @@
+"""
+Marca os dados como alterados (bolao.versoes) quando linhas são apagadas.
+
+Fica num post_delete, e não em Model.delete(), porque QuerySet.delete() (a ação "excluir
+selecionados" do admin, os apagamentos em cascata) não chama o delete() de cada instância,
+mas envia post_delete para cada linha apagada.
+"""
+from django.db.models.signals import post_delete
+
+from . import versoes
+from .models import AtualizacaoSite, Jogo, Participante, RegraPontuacao, Rodada
+
+# Modelo -> conjuntos de dados que mudam quando uma linha dele é apagada
+VERSOES_AO_APAGAR = {
+    Rodada: (versoes.RODADAS, versoes.RESULTADOS),
+    Jogo: (versoes.RESULTADOS, versoes.RODADAS),
+    Participante: (versoes.PARTICIPANTES,),
+    RegraPontuacao: (versoes.REGRA,),
+    AtualizacaoSite: (versoes.ATUALIZACOES,),
+}
+
+
+def _apagado(sender, **kwargs):
+    versoes.incrementar(*VERSOES_AO_APAGAR[sender])
+
+
+for modelo in VERSOES_AO_APAGAR:
+    post_delete.connect(_apagado, sender=modelo, dispatch_uid=f'bolao_versoes_apagar_{modelo.__name__}')
@@ -0,0 +1,131 @@
+"""
+Simulação de classificação ("e se?") para a rodada em andamento.
+
+A classificação projetada é montada em memória: pontuação já gravada de cada participante
+(em cache) mais os palpites da rodada pontuados contra placares hipotéticos. Nada é gravado.
+"""
+import numpy as np
+from django.core.cache import cache
+
+from . import versoes
+from .models import Jogo, Palpite, Participante, Rodada
+from .pontuacao import pontuar, ranquear, ler_inteiros
+
+CACHE_TIMEOUT = 300
+
+
+def rodada_em_andamento():
+    """Rodada com jogos ainda não finalizados; a ativa tem preferência, depois a de menor número"""
+    return Rodada.objects.filter(jogo__resultado_finalizado=False).distinct().order_by('-ativa', 'numero').first()
+
+
+def dados_base():
+    """
+    Totais já gravados (jogos finalizados) de cada participante da classificação, em cache.
+    Retorna dict com ids, nomes e os arrays pontos/acertos/placares_exatos alinhados com ids.
+    """
+    chave = versoes.chave_versionada('simulacao:base', versoes.RESULTADOS, versoes.PARTICIPANTES)
+    dados = cache.get(chave)
+    if dados is not None:
+        return dados
+
+    participantes = list(
+        Participante.objects.filter(ativo=True, invisivel=False).order_by('id').values_list('id', 'nome_exibicao')
+    )
+    ids = np.array([p[0] for p in participantes], dtype=np.int64)
+    totais = {
+        linha['participante_id']: linha
+        for linha in Palpite.objects.filter(
+            participante__ativo=True, participante__invisivel=False
+        ).totais_por('participante_id')
+    }
+    vazio = {'total_pontos': 0, 'total_acertos': 0, 'total_placares_exatos': 0}
+    dados = {
+        'ids': ids,
+        'nomes': [p[1] for p in participantes],
+        'pontos': np.array([totais.get(i, vazio)['total_pontos'] for i in ids.tolist()], dtype=np.int64),
+        'acertos': np.array([totais.get(i, vazio)['total_acertos'] for i in ids.tolist()], dtype=np.int64),
+        'placares_exatos': np.array(
+            [totais.get(i, vazio)['total_placares_exatos'] for i in ids.tolist()], dtype=np.int64
+        ),
+    }
+    dados['posicoes'] = ranquear(dados['pontos'], dados['acertos'], dados['placares_exatos'])
+    cache.set(chave, dados, CACHE_TIMEOUT)
+    return dados
+
+
+def dados_rodada(rodada):
+    """Jogos em aberto da rodada e os palpites deles como arrays (idx_participante, idx_jogo, casa, visitante), em cache"""
+    chave = versoes.chave_versionada(
+        f'simulacao:rodada{rodada.id}', versoes.RESULTADOS, versoes.PALPITES, versoes.PARTICIPANTES
+    )
+    dados = cache.get(chave)
+    if dados is not None:
+        return dados
+
+    base = dados_base()
+    jogos_ids = np.array(
+        sorted(Jogo.objects.filter(rodada=rodada, resultado_finalizado=False).values_list('id', flat=True)),
+        dtype=np.int64,
+    )
+    palpites = Palpite.objects.order_by().filter(
+        jogo__rodada=rodada, jogo__resultado_finalizado=False,
+        participante__ativo=True, participante__invisivel=False,
+    ).values_list('participante_id', 'jogo_id', 'gols_casa_palpite', 'gols_visitante_palpite')
+    linhas = ler_inteiros(palpites, 4)
+
+    # Descarta palpites de quem não está na base em cache (participante cadastrado entre as duas leituras)
+    idx_participante = np.searchsorted(base['ids'], linhas[:, 0])
+    conhecidos = idx_participante < len(base['ids'])
+    conhecidos[conhecidos] = base['ids'][idx_participante[conhecidos]] == linhas[conhecidos, 0]
+    linhas = linhas[conhecidos]
+
+    dados = {
+        'jogos_ids': jogos_ids,
+        'idx_participante': idx_participante[conhecidos],
+        'idx_jogo': np.searchsorted(jogos_ids, linhas[:, 1]),
+        'palpite_casa': linhas[:, 2],
+        'palpite_visitante': linhas[:, 3],
+    }
+    cache.set(chave, dados, CACHE_TIMEOUT)
+    return dados
+
+
+def simular(rodada, placares):
+    """
+    Classificação projetada se os jogos em aberto da rodada terminarem com os placares informados.
+
+    placares: {jogo_id: (gols_casa, gols_visitante)}; jogos sem placar contam como não finalizados.
+    Retorna dict com ids, nomes, pontos, pontos_rodada, posicoes e posicoes_atuais (arrays alinhados).
+    """
+    base = dados_base()
+    rodada_dados = dados_rodada(rodada)
+
+    jogos_ids = rodada_dados['jogos_ids']
+    gols_casa = np.full(len(jogos_ids), -1, dtype=np.int64)
+    gols_visitante = np.full(len(jogos_ids), -1, dtype=np.int64)
+    for jogo_id, (casa, visitante) in placares.items():
+        i = int(np.searchsorted(jogos_ids, jogo_id))
+        if i < len(jogos_ids) and jogos_ids[i] == jogo_id:
+            gols_casa[i], gols_visitante[i] = casa, visitante
+
+    j = rodada_dados['idx_jogo']
+    pontos, acerto, placar_exato = pontuar(
+        rodada_dados['palpite_casa'], rodada_dados['palpite_visitante'],
+        gols_casa[j], gols_visitante[j], gols_casa[j] >= 0, rodada.multiplicador,
+    )
+    n = len(base['ids'])
+    p = rodada_dados['idx_participante']
+    pontos_rodada = np.bincount(p, weights=pontos, minlength=n).astype(np.int64)
+    pontos_totais = base['pontos'] + pontos_rodada
+    acertos = base['acertos'] + np.bincount(p, weights=acerto, minlength=n).astype(np.int64)
+    placares_exatos = base['placares_exatos'] + np.bincount(p, weights=placar_exato, minlength=n).astype(np.int64)
+
+    return {
+        'ids': base['ids'],
+        'nomes': base['nomes'],
+        'pontos': pontos_totais,
+        'pontos_rodada': pontos_rodada,
+        'posicoes': ranquear(pontos_totais, acertos, placares_exatos),
+        'posicoes_atuais': base['posicoes'],
+    }
@@ -0,0 +1,115 @@
+"""
+Tarefas pesadas que podem rodar fora da requisição, pela fila do banco (modelo Tarefa).
+
+Cada tipo de tarefa é uma função registrada com @tarefa('tipo') que recebe o dict de
+parâmetros (JSON). O `manage.py run_worker` reserva as tarefas e chama executar().
+Com TAREFAS_EM_FILA = False (padrão) as funções auxiliares rodam na hora, como antes.
+"""
+import logging
+import traceback
+
+from django.conf import settings
+
+from . import versoes
+
+logger = logging.getLogger(__name__)
+
+TIPOS = {}
+
+
+def tarefa(tipo):
+    """Registra a função como executora do tipo de tarefa"""
+    def registrar(funcao):
+        TIPOS[tipo] = funcao
+        return funcao
+    return registrar
+
+
+def em_fila():
+    return getattr(settings, 'TAREFAS_EM_FILA', False)
+
+
+def executar(tarefa_reservada):
+    """Executa uma tarefa já reservada e registra o resultado (concluída ou nova tentativa)"""
+    try:
+        funcao = TIPOS.get(tarefa_reservada.tipo)
+        if funcao is None:
+            raise ValueError(f'Tipo de tarefa desconhecido: {tarefa_reservada.tipo}')
+        with versoes.lidas_uma_vez():
+            funcao(tarefa_reservada.parametros)
+    except Exception:
+        logger.exception(f"Tarefa {tarefa_reservada.pk} ({tarefa_reservada.tipo}) falhou")
+        tarefa_reservada.falhar(
+            traceback.format_exc(),
+            backoff_base=getattr(settings, 'TAREFAS_BACKOFF_BASE', 30),
+            backoff_maximo=getattr(settings, 'TAREFAS_BACKOFF_MAXIMO', 3600),
+        )
+        return False
+    tarefa_reservada.concluir()
+    return True
+
+
+def notificar(tipo, titulo, mensagem, rodada=None, url_acao='', chave=''):
+    """
+    Envia a notificação para os usuários (send_notification_to_users) ou, com a fila ligada,
+    enfileira o envio. Retorna quantas foram enviadas, ou None se foi para a fila.
+    """
+    if not em_fila():
+        from .views import send_notification_to_users
+        return send_notification_to_users(tipo, titulo, mensagem, rodada, url_acao)
+
+    from .models import Tarefa
+    Tarefa.enfileirar('notificar', {
+        'tipo': tipo,
+        'titulo': titulo,
+        'mensagem': mensagem,
+        'rodada_id': rodada.id if rodada else None,
+        'url_acao': url_acao,
+    }, chave=chave)
+    return None
+
+
+@tarefa('notificar')
+def _notificar(parametros):
+    from .models import Rodada
+    from .views import send_notification_to_users
+
+    rodada = Rodada.objects.filter(pk=parametros.get('rodada_id')).first() if parametros.get('rodada_id') else None
+    total = send_notification_to_users(
+        parametros['tipo'], parametros['titulo'], parametros['mensagem'], rodada, parametros.get('url_acao', '')
+    )
+    logger.info(f"{total} notificação(ões) '{parametros['tipo']}' enviada(s)")
+
+
+@tarefa('atualizar_classificacao')
+def _atualizar_classificacao(parametros):
+    from .models import Classificacao, ClassificacaoRodada, ParticipanteStats
+
+    Classificacao.atualizar_classificacao()
+    ParticipanteStats.recalcular()
+    ClassificacaoRodada.sincronizar(a_partir_de=parametros.get('a_partir_de'))
+
+
+@tarefa('calcular_probabilidades')
+def _calcular_probabilidades(parametros):
+    from .models import ProbabilidadeTitulo
+
+    ProbabilidadeTitulo.calcular(
+        simulacoes=parametros.get('simulacoes', 20000),
+        processos=parametros.get('processos'),
+        semente=parametros.get('semente'),
+    )
+
+
+@tarefa('calcular_metricas')
+def _calcular_metricas(parametros):
+    from django.core.management import call_command
+
+    call_command('calcular_metricas', **parametros)
+
+
+@tarefa('lembrete_prazo')
+def _lembrete_prazo(parametros):
+    from django.core.management import call_command
+
+    call_command('lembrete_prazo', **parametros)
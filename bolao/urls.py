@@ -7,14 +7,27 @@ urlpatterns = [
     path('logout/', views.logout_participante, name='logout'),
     path('rodada/<int:rodada_id>/palpites/', views.rodada_palpites, name='rodada_palpites'),
     path('rodada/<int:rodada_id>/resultados/', views.resultados_rodada, name='resultados_rodada'),
+    path('planilha/', views.planilha_temporada, name='planilha_temporada'),
+    path('exportar/rodada/<int:rodada_id>/planilha.csv', views.exportar_planilha_rodada, name='exportar_planilha_rodada'),
+    path('exportar/palpites.csv', views.exportar_palpites, name='exportar_palpites'),
+    path('exportar/classificacao.csv', views.exportar_classificacao, name='exportar_classificacao'),
     path('classificacao/', views.classificacao, name='classificacao'),
     path('participante/<int:participante_id>/', views.perfil_participante, name='perfil_participante'),
+    path('participante/<int:participante_a_id>/vs/<int:participante_b_id>/', views.confronto_participantes, name='confronto_participantes'),
     path('perfil/editar/', views.editar_perfil, name='editar_perfil'),
+    path('ligas/', views.minhas_ligas, name='minhas_ligas'),
+    # Fora do espaço dos slugs: uma liga pode se chamar "entrar"
+    path('ligas/-/entrar/', views.entrar_liga, name='entrar_liga'),
+    path('ligas/<slug:slug>/', views.liga_classificacao, name='liga_classificacao'),
     path('termos/', views.termos_uso, name='termos_uso'),
     path('atualizacoes/', views.atualizacoes, name='atualizacoes'),
     path('marcar-atualizacao-vista/<str:versao>/', views.marcar_atualizacao_vista, name='marcar_atualizacao_vista'),
     path('ao-vivo/', views.jogos_ao_vivo, name='jogos_ao_vivo'),
     path('api/atualizar-placares/', views.atualizar_placares_api, name='atualizar_placares_api'),
+    path('api/simular-classificacao/', views.simular_classificacao, name='simular_classificacao'),
+    path('api/classificacao-ao-vivo/', views.classificacao_ao_vivo_api, name='classificacao_ao_vivo_api'),
+    path('api/probabilidades/', views.probabilidades_api, name='probabilidades_api'),
+    path('api/confronto/<int:participante_a_id>/<int:participante_b_id>/', views.confronto_api, name='confronto_api'),
     # PWA URLs
     path('manifest.json', views.manifest, name='manifest'),
     path('sw.js', views.service_worker, name='service_worker'),
@@ -0,0 +1,113 @@
+"""
+Contadores de versão guardados no banco (modelo VersaoDados).
+
+Cada conjunto de dados (resultados, palpites, participantes, rodadas, classificação...) tem um
+número que sobe quando ele muda. Chaves de cache montadas com esses números deixam de ser lidas sozinhas, sem
+precisar apagar nada: basta incrementar a versão ao gravar.
+
+Os contadores ficam no banco, e não no cache, porque o cache padrão (LocMemCache) é de cada processo:
+um incremento feito pelo run_worker ou por um comando precisa invalidar o cache do servidor web.
+Dentro de uma requisição os contadores são lidos uma vez só (uma consulta) e guardados até o fim dela;
+fora de requisição (comandos, tarefas do worker) o bloco lidas_uma_vez() faz o mesmo.
+"""
+import time
+from contextlib import contextmanager
+
+from asgiref.local import Local
+from django.core.signals import request_finished, request_started
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+RESULTADOS = 'resultados'
+PALPITES = 'palpites'
+PARTICIPANTES = 'participantes'
+RODADAS = 'rodadas'
+# Dados derivados dos resultados: classificação, fotografias das rodadas e estatísticas
+CLASSIFICACAO = 'classificacao'
+# Novidades do site (AtualizacaoSite)
+ATUALIZACOES = 'atualizacoes'
+# Regra de pontuação vigente (RegraPontuacao)
+REGRA = 'regra_pontuacao'
+
+# Versões lidas na requisição em andamento (None fora de requisição: sempre lê do banco)
+_requisicao = Local()
+
+
+def _iniciar_requisicao(**kwargs):
+    _requisicao.versoes = {}
+
+
+def _encerrar_requisicao(**kwargs):
+    _requisicao.versoes = None
+
+
+request_started.connect(_iniciar_requisicao, dispatch_uid='bolao_versoes_inicio')
+request_finished.connect(_encerrar_requisicao, dispatch_uid='bolao_versoes_fim')
+
+
+@contextmanager
+def lidas_uma_vez():
+    """
+    Dentro do bloco, cada versão é lida do banco uma vez só, como numa requisição (os incrementos do
+    próprio processo continuam valendo na hora). Para comandos e tarefas que pontuam em laço.
+    """
+    if getattr(_requisicao, 'versoes', None) is not None:
+        yield
+        return
+    _iniciar_requisicao()
+    try:
+        yield
+    finally:
+        _encerrar_requisicao()
+
+
+def _marco_inicial():
+    """
+    Valor mínimo de um contador: microssegundos do relógio.
+    Cada incremento leva o contador a pelo menos este marco, então mesmo depois de um rollback
+    (ou de a linha ser apagada) ele segue acima de qualquer valor já usado e nenhuma chave antiga
+    volta a valer.
+    """
+    return time.time_ns() // 1000
+
+
+def versao(nome):
+    """Versão atual do conjunto de dados nome"""
+    from .models import VersaoDados
+
+    lidas = getattr(_requisicao, 'versoes', None)
+    if lidas and nome in lidas:
+        return lidas[nome]
+
+    valores = dict(VersaoDados.objects.values_list('nome', 'valor'))
+    if nome not in valores:
+        valores[nome] = VersaoDados.objects.get_or_create(nome=nome, defaults={'valor': _marco_inicial()})[0].valor
+    if lidas is not None:
+        lidas.update(valores)
+    return valores[nome]
+
+
+def incrementar(*nomes):
+    """Marca os conjuntos de dados como alterados"""
+    from .models import VersaoDados
+
+    nomes = set(nomes)
+    marco = _marco_inicial()
+    incremento = {'valor': Greatest(F('valor') + 1, Value(marco))}
+    if VersaoDados.objects.filter(nome__in=nomes).update(**incremento) < len(nomes):
+        # Algum contador ainda não existe
+        existentes = set(VersaoDados.objects.filter(nome__in=nomes).values_list('nome', flat=True))
+        for nome in nomes - existentes:
+            _, criado = VersaoDados.objects.get_or_create(nome=nome, defaults={'valor': marco})
+            if not criado:
+                VersaoDados.objects.filter(nome=nome).update(**incremento)
+
+    lidas = getattr(_requisicao, 'versoes', None)
+    if lidas:
+        for nome in nomes:
+            lidas.pop(nome, None)
+
+
+def chave_versionada(prefixo, *nomes):
+    """Monta uma chave de cache que muda sempre que qualquer um dos conjuntos muda"""
+    return ':'.join([prefixo] + [f'{nome}{versao(nome)}' for nome in nomes])
@@ -5,13 +5,24 @@ from django.contrib import messages
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.http import require_POST
 from django.utils import timezone
-from django.db.models import Q, F, Avg
+from django.utils.functional import SimpleLazyObject
+from django.db.models import Q, F, Avg, Count, Window
+from django.db.models.functions import RowNumber
 from django.db import models
 from django.conf import settings
+import logging
 import os
 import json
-from .models import Rodada, Jogo, Palpite, Participante, Classificacao, Time, NotificationSettings, Notification
+import time
+from .models import Rodada, Jogo, Palpite, Participante, Classificacao, ClassificacaoRodada, ParticipanteStats, ProbabilidadeTitulo, RegraPontuacao, Time, NotificationSettings, Notification
 from .forms import PerfilParticipanteForm
+from . import recalculo, versoes
+from .condicional import etag_versionado
+from .exportacao import resposta_csv, linhas_palpites, linhas_planilha_rodada, linhas_historico_classificacao
+from .planilha import montar_planilha, palpites_visiveis
+from .ranking_rodada import ranking_rodada
+
+logger = logging.getLogger(__name__)
 
 
 @login_required
@@ -48,17 +59,60 @@ def test_notifications_simple(request):
     return render(request, 'bolao/test_notifications.html')
 
 
+# Trecho da página inicial com as próximas rodadas e os resultados recentes
+HOME_CACHE_TIMEOUT = 60 * 60
+
+
+def _resultados_recentes(rodadas_passadas):
+    """Resumo das rodadas encerradas exibido na página inicial (só é montado quando o trecho não está em cache)"""
+    # Principais resultados: os dois primeiros jogos finalizados de cada rodada recente, em uma consulta
+    principais_jogos = {}
+    if rodadas_passadas:
+        consulta = Jogo.objects.filter(rodada__in=rodadas_passadas, resultado_finalizado=True).annotate(
+            ordem_na_rodada=Window(
+                expression=RowNumber(), partition_by=F('rodada_id'), order_by=[F('data_hora').asc(), F('id').asc()]
+            )
+        ).filter(ordem_na_rodada__lte=2).select_related('time_casa', 'time_visitante').order_by('data_hora', 'id')
+        for jogo in consulta:
+            principais_jogos.setdefault(jogo.rodada_id, []).append(jogo)
+    
+    # Adicionar informações detalhadas para resultados recentes
+    rodadas_recentes_info = []
+    for rodada in rodadas_passadas:
+        jogos_finalizados = rodada.jogos_finalizados
+        total_jogos = rodada.total_jogos
+        
+        # Pontuação média e destaques vêm do ranking da rodada (em cache até o próximo resultado)
+        ranking = ranking_rodada(rodada.id)
+        total_palpites = ranking['total_palpites']
+        pontuacao_media = ranking['total_pontos'] / total_palpites if total_palpites > 0 else 0
+        
+        rodadas_recentes_info.append({
+            'rodada': rodada,
+            'jogos_finalizados': jogos_finalizados,
+            'total_jogos': total_jogos,
+            'principais_jogos': principais_jogos.get(rodada.id, []),
+            'pontuacao_media': round(pontuacao_media, 1),
+            'percentual_finalizado': round((jogos_finalizados / total_jogos * 100) if total_jogos > 0 else 0),
+            'destaques': [linha for linha in ranking['linhas'] if linha['posicao'] == 1 and linha['pontos'] > 0][:3],
+        })
+    
+    return rodadas_recentes_info
+
+
 def home(request):
     """Página inicial mostrando rodadas e status"""
     
-    # Busca todas as rodadas para análise completa
+    # Todas as rodadas com a contagem de jogos (total e finalizados) em uma única consulta
     agora = timezone.now()
-    rodadas_ativas = Rodada.objects.filter(ativa=True).select_related().order_by('numero')
-    todas_rodadas = Rodada.objects.all().select_related().order_by('numero')
+    todas_rodadas_list = list(Rodada.objects.annotate(
+        total_jogos=Count('jogo'),
+        jogos_finalizados=Count('jogo', filter=Q(jogo__resultado_finalizado=True)),
+    ).order_by('numero'))
+    rodadas_ativas_list = [r for r in todas_rodadas_list if r.ativa]
     
     # Rodada atual: primeira ativa no período correto
     rodada_atual = None
-    rodadas_ativas_list = list(rodadas_ativas)
     
     # Busca rodada ativa no período correto
     for rodada in rodadas_ativas_list:
@@ -71,50 +125,30 @@ def home(request):
         futuras_ativas = [r for r in rodadas_ativas_list if r.data_inicio > agora]
         rodada_atual = futuras_ativas[0] if futuras_ativas else (rodadas_ativas_list[-1] if rodadas_ativas_list else None)
     
-    # Buscar todas as rodadas para futuras e passadas (não só ativas)
-    todas_rodadas_list = list(todas_rodadas)
+    # Futuras e passadas saem da mesma lista (não só ativas)
     rodadas_futuras = [r for r in todas_rodadas_list if r.data_inicio > agora and r != rodada_atual][:3]
     rodadas_passadas = sorted([r for r in todas_rodadas_list if r.data_fim < agora], key=lambda x: x.numero, reverse=True)[:3]
     
     # Adicionar informações detalhadas para rodadas futuras
     rodadas_futuras_info = []
     for rodada in rodadas_futuras:
-        jogos_count = rodada.jogo_set.count()
         dias_restantes = (rodada.data_inicio - agora).days
         rodadas_futuras_info.append({
             'rodada': rodada,
-            'jogos_count': jogos_count,
+            'jogos_count': rodada.total_jogos,
             'dias_restantes': dias_restantes,
-            'status_texto': f"{jogos_count} jogos" + (f" em {dias_restantes} dias" if dias_restantes > 0 else " hoje")
+            'status_texto': f"{rodada.total_jogos} jogos" + (f" em {dias_restantes} dias" if dias_restantes > 0 else " hoje")
         })
     
-    # Adicionar informações detalhadas para resultados recentes
-    rodadas_recentes_info = []
-    for rodada in rodadas_passadas:
-        jogos_finalizados = rodada.jogo_set.filter(resultado_finalizado=True).count()
-        total_jogos = rodada.jogo_set.count()
-        
-        # Buscar principais resultados
-        principais_jogos = rodada.jogo_set.filter(resultado_finalizado=True).select_related('time_casa', 'time_visitante')[:2]
-        
-        # Calcular pontuação média se houver palpites
-        palpites_rodada = Palpite.objects.filter(jogo__rodada=rodada, jogo__resultado_finalizado=True)
-        # Como pontos_obtidos é uma property, calculamos manualmente
-        total_pontos = 0
-        total_palpites = 0
-        for palpite in palpites_rodada:
-            total_pontos += palpite.pontos_obtidos
-            total_palpites += 1
-        pontuacao_media = total_pontos / total_palpites if total_palpites > 0 else 0
-        
-        rodadas_recentes_info.append({
-            'rodada': rodada,
-            'jogos_finalizados': jogos_finalizados,
-            'total_jogos': total_jogos,
-            'principais_jogos': list(principais_jogos),
-            'pontuacao_media': round(pontuacao_media, 1),
-            'percentual_finalizado': round((jogos_finalizados / total_jogos * 100) if total_jogos > 0 else 0),
-        })
+    # Próximas rodadas e resultados recentes são iguais para todos: o trecho do template fica em
+    # cache com uma chave que muda com as versões dos dados e com o que depende da hora atual.
+    # Os resultados recentes só são consultados se o template precisar renderizar o trecho.
+    versao_rodadas = ':'.join([
+        versoes.chave_versionada('home', versoes.RODADAS, versoes.RESULTADOS, versoes.PARTICIPANTES),
+        ','.join(f"{info['rodada'].id}-{info['dias_restantes']}" for info in rodadas_futuras_info),
+        ','.join(str(rodada.id) for rodada in rodadas_passadas),
+    ])
+    rodadas_recentes_info = SimpleLazyObject(lambda: _resultados_recentes(rodadas_passadas))
     
     # Participante e atualizações
     participante = None
@@ -148,7 +182,10 @@ def home(request):
         'rodadas_futuras_info': rodadas_futuras_info,
         'rodadas_recentes_info': rodadas_recentes_info,
         'participante': participante,
-        'atualizacao_nao_vista': atualizacao_nao_vista
+        'atualizacao_nao_vista': atualizacao_nao_vista,
+        'regra_pontuacao': RegraPontuacao.atual(),
+        'versao_rodadas': versao_rodadas,
+        'home_cache_timeout': HOME_CACHE_TIMEOUT,
     }
     
     # Renderiza o template
@@ -160,7 +197,6 @@ def home(request):
     response['Expires'] = '0'
     response['X-Accel-Expires'] = '0'
     response['Vary'] = 'Cookie'
-    response['Last-Modified'] = timezone.now().strftime('%a, %d %b %Y %H:%M:%S GMT')
     
     return response
 
@@ -185,57 +221,56 @@ def rodada_palpites(request, rodada_id):
     pode_palpitar = rodada.pode_palpitar
     
     # Consulta otimizada de jogos com times relacionados
-    jogos = rodada.jogo_set.select_related('time_casa', 'time_visitante').all().order_by('data_hora')
+    jogos = list(rodada.jogo_set.select_related('time_casa', 'time_visitante').all().order_by('data_hora'))
     
     # Palpites existentes do usuário
     palpites_existentes = {}
-    for palpite in Palpite.objects.select_related('jogo').filter(participante=participante, jogo__rodada=rodada):
-        palpites_existentes[palpite.jogo.id] = palpite
+    for palpite in Palpite.objects.filter(participante=participante, jogo__rodada=rodada):
+        palpites_existentes[palpite.jogo_id] = palpite
     
-    # Se não pode palpitar, buscar todos os palpites para a planilha
-    todos_palpites = {}
+    # Se não pode palpitar, planilha com os palpites de todos (uma consulta para a rodada inteira)
+    planilha = []
     participantes_ativos = []
     if not pode_palpitar:
         participantes_ativos = list(Participante.objects.filter(ativo=True).order_by('nome_exibicao'))
-        for jogo in jogos:
-            todos_palpites[jogo.id] = {}
-            for palpite in Palpite.objects.select_related('participante').filter(jogo=jogo):
-                todos_palpites[jogo.id][palpite.participante.id] = palpite
+        planilha = montar_planilha(jogos, participantes_ativos)
     
     if request.method == 'POST' and pode_palpitar:
-        todos_palpites_validos = True
-        palpites_salvos = []
+        inicio = time.perf_counter()
         
+        # Valida o formulário inteiro antes de gravar qualquer coisa; jogo deixado em branco é ignorado
+        placares = {}
+        jogos_invalidos = []
         for jogo in jogos:
-            gols_casa_key = f'gols_casa_{jogo.id}'
-            gols_visitante_key = f'gols_visitante_{jogo.id}'
-            
-            if gols_casa_key in request.POST and gols_visitante_key in request.POST:
-                try:
-                    gols_casa = int(request.POST[gols_casa_key])
-                    gols_visitante = int(request.POST[gols_visitante_key])
-                    
-                    if gols_casa >= 0 and gols_visitante >= 0 and gols_casa <= 20 and gols_visitante <= 20:
-                        palpite, created = Palpite.objects.get_or_create(
-                            participante=participante,
-                            jogo=jogo,
-                            defaults={
-                                'gols_casa_palpite': gols_casa,
-                                'gols_visitante_palpite': gols_visitante
-                            }
-                        )
-                        
-                        if not created:
-                            palpite.gols_casa_palpite = gols_casa
-                            palpite.gols_visitante_palpite = gols_visitante
-                            palpite.save()
-                        
-                        palpites_salvos.append(palpite)
-                except (ValueError, TypeError):
-                    continue
-        
-        if palpites_salvos:
-            messages.success(request, f"Palpites salvos com sucesso! {len(palpites_salvos)} jogos.")
+            gols_casa = request.POST.get(f'gols_casa_{jogo.id}', '').strip()
+            gols_visitante = request.POST.get(f'gols_visitante_{jogo.id}', '').strip()
+            if not gols_casa and not gols_visitante:
+                continue
+            try:
+                gols_casa, gols_visitante = int(gols_casa), int(gols_visitante)
+            except ValueError:
+                jogos_invalidos.append(jogo)
+                continue
+            if 0 <= gols_casa <= 20 and 0 <= gols_visitante <= 20:
+                placares[jogo] = (gols_casa, gols_visitante)
+            else:
+                jogos_invalidos.append(jogo)
+        
+        if jogos_invalidos:
+            messages.error(
+                request,
+                "Nenhum palpite foi salvo. Placar inválido em: "
+                + ", ".join(f"{jogo.time_casa.sigla} x {jogo.time_visitante.sigla}" for jogo in jogos_invalidos)
+                + " (use números de 0 a 20)."
+            )
+        elif placares:
+            # Todos os palpites da rodada em uma única transação (um INSERT ... ON CONFLICT)
+            Palpite.registrar(participante, placares)
+            logger.info(
+                f"Palpites de {participante.nome_exibicao} na {rodada}: {len(placares)} jogo(s) "
+                f"gravados em {(time.perf_counter() - inicio) * 1000:.1f} ms"
+            )
+            messages.success(request, f"Palpites salvos com sucesso! {len(placares)} jogos.")
             return redirect('home')
         else:
             messages.error(request, "Nenhum palpite foi salvo. Verifique os dados.")
@@ -243,29 +278,116 @@ def rodada_palpites(request, rodada_id):
     
     context = {
         'rodada': rodada,
-        'jogos': list(jogos),
+        'jogos': jogos,
         'participante': participante,
         'palpites_existentes': palpites_existentes,
         'pode_palpitar': pode_palpitar,
-        'todos_palpites': todos_palpites,
+        'planilha': planilha,
         'participantes_ativos': participantes_ativos
     }
     
     return render(request, 'bolao/palpites.html', context)
 
 
+# Rodadas por página na planilha da temporada (?pagina=todas mostra a temporada inteira)
+PLANILHA_RODADAS_POR_PAGINA = 5
+
+
+@login_required
+def planilha_temporada(request):
+    """Planilha de palpites da temporada (jogos x participantes), paginada por rodadas"""
+    rodadas = list(Rodada.objects.order_by('numero'))
+    paginas = [
+        rodadas[inicio:inicio + PLANILHA_RODADAS_POR_PAGINA]
+        for inicio in range(0, len(rodadas), PLANILHA_RODADAS_POR_PAGINA)
+    ]
+    
+    # Palpites de rodada ainda aberta (ou futura) ficam ocultos
+    visiveis = {rodada.id for rodada in rodadas if palpites_visiveis(rodada)}
+    
+    pagina = request.GET.get('pagina')
+    if pagina == 'todas':
+        numero_pagina, rodadas_pagina = None, rodadas
+    else:
+        try:
+            numero_pagina = min(max(int(pagina), 1), len(paginas))
+        except (TypeError, ValueError):
+            # Sem página pedida: a que tem a última rodada com palpites visíveis
+            ultima = max((i for i, rodada in enumerate(rodadas) if rodada.id in visiveis), default=0)
+            numero_pagina = ultima // PLANILHA_RODADAS_POR_PAGINA + 1
+        rodadas_pagina = paginas[numero_pagina - 1] if paginas else []
+    
+    jogos = list(
+        Jogo.objects.filter(rodada__in=rodadas_pagina).select_related('time_casa', 'time_visitante').order_by('data_hora', 'id')
+    )
+    participantes = list(Participante.objects.filter(ativo=True).order_by('nome_exibicao'))
+    
+    # Uma consulta para todos os palpites da página, já na grade jogos x participantes
+    linhas = montar_planilha([jogo for jogo in jogos if jogo.rodada_id in visiveis], participantes)
+    linhas_por_jogo = {linha['jogo'].id: linha for linha in linhas}
+    
+    blocos = {rodada.id: {'rodada': rodada, 'visivel': rodada.id in visiveis, 'linhas': []} for rodada in rodadas_pagina}
+    for jogo in jogos:
+        blocos[jogo.rodada_id]['linhas'].append(linhas_por_jogo.get(jogo.id, {'jogo': jogo, 'celulas': None}))
+    
+    context = {
+        'blocos': [bloco for bloco in blocos.values() if bloco['linhas']],
+        'participantes': participantes,
+        'total_jogos': len(jogos),
+        'paginas': [
+            {'numero': i, 'primeira': pagina[0].numero, 'ultima': pagina[-1].numero}
+            for i, pagina in enumerate(paginas, start=1)
+        ],
+        'pagina_atual': numero_pagina,
+    }
+    
+    return render(request, 'bolao/planilha_palpites.html', context)
+
+
+@login_required
+def exportar_planilha_rodada(request, rodada_id):
+    """CSV da planilha da rodada (participantes x jogos), gerado em streaming"""
+    rodada = get_object_or_404(Rodada, id=rodada_id)
+    if not (request.user.is_staff or palpites_visiveis(rodada)):
+        messages.error(request, "Os palpites da rodada só podem ser exportados depois do fechamento.")
+        return redirect('rodada_palpites', rodada_id=rodada.id)
+    return resposta_csv(f'planilha_rodada_{rodada.numero}.csv', linhas_planilha_rodada(rodada))
+
+
+@login_required
+def exportar_palpites(request):
+    """CSV com todos os palpites da temporada (um por linha), gerado em streaming"""
+    rodadas_ids = [
+        rodada.id for rodada in Rodada.objects.order_by('numero')
+        if request.user.is_staff or palpites_visiveis(rodada)
+    ]
+    return resposta_csv('palpites_temporada.csv', linhas_palpites(rodadas_ids))
+
+
+@login_required
+def exportar_classificacao(request):
+    """CSV do histórico da classificação rodada a rodada, gerado em streaming"""
+    return resposta_csv('classificacao_rodadas.csv', linhas_historico_classificacao())
+
+
+@etag_versionado(versoes.RESULTADOS, versoes.RODADAS, versoes.PALPITES, versoes.PARTICIPANTES)
 def resultados_rodada(request, rodada_id):
     """Página para ver resultados de uma rodada específica"""
     rodada = get_object_or_404(Rodada, id=rodada_id)
     jogos = rodada.jogo_set.all().order_by('data_hora')
     
+    # Ranking da rodada (em cache até o próximo resultado)
+    ranking = ranking_rodada(rodada.id)
+    
     # Se o usuário estiver logado, mostrar seus palpites
     palpites_usuario = {}
+    meu_ranking = None
     if request.user.is_authenticated:
         try:
             participante = request.user.participante
             for palpite in Palpite.objects.filter(participante=participante, jogo__rodada=rodada):
                 palpites_usuario[palpite.jogo.id] = palpite
+            meu_ranking = ranking['por_participante'].get(participante.id)
         except:
             pass
     
@@ -273,16 +395,28 @@ def resultados_rodada(request, rodada_id):
         'rodada': rodada,
         'jogos': jogos,
         'palpites_usuario': palpites_usuario,
+        'ranking_rodada': ranking['linhas'],
+        'meu_ranking': meu_ranking,
     }
     
     return render(request, 'bolao/resultados.html', context)
 
 
+@etag_versionado(versoes.CLASSIFICACAO, versoes.RESULTADOS, versoes.PALPITES, versoes.PARTICIPANTES)
 def classificacao(request):
     """Página da classificação geral"""
     
     # Consultas otimizadas com select_related
-    classificacoes = Classificacao.objects.select_related('participante').all().order_by('posicao')
+    # Empatados dividem a posição; dentro do empate, ordem alfabética
+    classificacoes = list(
+        Classificacao.objects.select_related('participante').all().order_by('posicao', 'participante__nome_exibicao')
+    )
+    
+    # Variação de posição em relação à última rodada fechada (histórico gravado)
+    posicoes_anteriores = ClassificacaoRodada.posicoes_anteriores()
+    for item in classificacoes:
+        anterior = posicoes_anteriores.get(item.participante_id)
+        item.variacao = anterior - item.posicao if anterior is not None else None
     
     # Estatísticas gerais
     total_participantes = Participante.objects.filter(ativo=True).count()
@@ -290,10 +424,12 @@ def classificacao(request):
     total_palpites = Palpite.objects.count()
     
     context = {
-        'classificacoes': list(classificacoes),
+        'classificacoes': classificacoes,
         'total_participantes': total_participantes,
         'total_jogos_finalizados': total_jogos_finalizados,
-        'total_palpites': total_palpites
+        'total_palpites': total_palpites,
+        # Resultado editado há pouco e recálculo ainda na fila (ou rodando)
+        'recalculo_pendente': not recalculo.atualizada(),
     }
     
     return render(request, 'bolao/classificacao.html', context)
@@ -370,41 +506,34 @@ def logout_participante(request):
     return response
 
 
+@etag_versionado(versoes.CLASSIFICACAO, versoes.RESULTADOS, versoes.RODADAS, versoes.PALPITES, versoes.PARTICIPANTES)
 def perfil_participante(request, participante_id):
     """Página do perfil detalhado de um participante"""
     participante = get_object_or_404(Participante, id=participante_id, ativo=True)
     
-    # Buscar estatísticas do participante
-    palpites = Palpite.objects.filter(participante=participante, jogo__resultado_finalizado=True)
-    
-    total_palpites = palpites.count()
-    acertos = palpites.filter(
-        # Placar exato
-        Q(gols_casa_palpite=F('jogo__gols_casa'), gols_visitante_palpite=F('jogo__gols_visitante')) |
-        # Acertou o resultado (vitória casa)
-        Q(gols_casa_palpite__gt=F('gols_visitante_palpite'), jogo__gols_casa__gt=F('jogo__gols_visitante')) |
-        # Acertou o resultado (empate)
-        Q(gols_casa_palpite=F('gols_visitante_palpite'), jogo__gols_casa=F('jogo__gols_visitante')) |
-        # Acertou o resultado (vitória visitante)
-        Q(gols_casa_palpite__lt=F('gols_visitante_palpite'), jogo__gols_casa__lt=F('jogo__gols_visitante'))
-    ).count()
-    
-    # Calcular pontos totais
-    pontos_totais = sum(palpite.pontos_obtidos for palpite in palpites)
-    
-    # Calcular último saldo (pontos da última rodada)
-    from .models import Rodada
+    # Estatísticas agregadas mantidas a cada resultado (uma linha por participante)
+    stats = ParticipanteStats.obter(participante)
+    
+    # Último saldo e posição na última rodada com jogos finalizados (ranking da rodada em cache)
     ultima_rodada = Rodada.objects.filter(
         jogo__resultado_finalizado=True
     ).order_by('-numero').first()
     
     ultimo_saldo = 0
+    posicao_ultima_rodada = None
     if ultima_rodada:
-        palpites_ultima_rodada = palpites.filter(jogo__rodada=ultima_rodada)
-        ultimo_saldo = sum(palpite.pontos_obtidos for palpite in palpites_ultima_rodada)
+        linha = ranking_rodada(ultima_rodada.id)['por_participante'].get(participante.id)
+        if linha:
+            ultimo_saldo = linha['pontos']
+            posicao_ultima_rodada = linha['posicao']
+        elif stats.rodada_corrente_id == ultima_rodada.id:
+            # Participante fora do ranking (invisível): saldo das estatísticas
+            ultimo_saldo = stats.pontos_rodada_corrente
     
     # Palpites recentes
-    palpites_recentes = palpites.order_by('-data_palpite')[:10]
+    palpites_recentes = Palpite.objects.filter(
+        participante=participante, jogo__resultado_finalizado=True
+    ).select_related('jogo__time_casa', 'jogo__time_visitante', 'jogo__rodada').order_by('-data_palpite')[:10]
     
     # Classificação atual
     try:
@@ -412,20 +541,68 @@ def perfil_participante(request, participante_id):
     except:
         classificacao_atual = None
     
+    # Evolução de posição rodada a rodada (histórico gravado no fechamento de cada rodada)
+    historico = list(
+        participante.historico_classificacao.select_related('rodada').order_by('rodada__numero')
+    )
+    anterior = None
+    for item in historico:
+        item.variacao = anterior - item.posicao if anterior is not None else None
+        anterior = item.posicao
+    
     context = {
         'participante': participante,
-        'total_palpites': total_palpites,
-        'acertos': acertos,
-        'pontos_totais': pontos_totais,
+        'stats': stats,
+        'total_palpites': stats.total_palpites,
+        'acertos': stats.acertos,
+        'pontos_totais': stats.pontos,
         'ultimo_saldo': ultimo_saldo,
+        'ultima_rodada': ultima_rodada,
+        'posicao_ultima_rodada': posicao_ultima_rodada,
         'palpites_recentes': palpites_recentes,
         'classificacao_atual': classificacao_atual,
-        'porcentagem_acerto': round((acertos / total_palpites * 100), 1) if total_palpites > 0 else 0,
+        'historico': historico,
+        'porcentagem_acerto': stats.porcentagem_acerto,
     }
     
     return render(request, 'bolao/perfil.html', context)
 
 
+def confronto_participantes(request, participante_a_id, participante_b_id):
+    """Confronto direto entre dois participantes, rodada a rodada"""
+    from .confronto import confronto
+    
+    participante_a = get_object_or_404(Participante, id=participante_a_id, ativo=True)
+    participante_b = get_object_or_404(Participante, id=participante_b_id, ativo=True)
+    
+    context = {
+        'participante_a': participante_a,
+        'participante_b': participante_b,
+        'confronto': confronto(participante_a.id, participante_b.id),
+    }
+    
+    return render(request, 'bolao/confronto.html', context)
+
+
+def confronto_api(request, participante_a_id, participante_b_id):
+    """API JSON do confronto direto entre dois participantes"""
+    from .confronto import confronto
+    
+    participantes = {
+        p.id: p.nome_exibicao
+        for p in Participante.objects.filter(id__in=[participante_a_id, participante_b_id], ativo=True)
+    }
+    if participante_a_id not in participantes or participante_b_id not in participantes:
+        return JsonResponse({'success': False, 'error': 'Participante não encontrado'}, status=404)
+    
+    return JsonResponse({
+        'success': True,
+        'participante_a': {'id': participante_a_id, 'nome': participantes[participante_a_id]},
+        'participante_b': {'id': participante_b_id, 'nome': participantes[participante_b_id]},
+        **confronto(participante_a_id, participante_b_id),
+    })
+
+
 @login_required
 def editar_perfil(request):
     """Página para editar o próprio perfil"""
@@ -454,6 +631,83 @@ def editar_perfil(request):
     return render(request, 'bolao/editar_perfil.html', context)
 
 
+@login_required
+def minhas_ligas(request):
+    """Ligas do participante, com a posição dele em cada uma"""
+    from .models import Liga
+    
+    try:
+        participante = request.user.participante
+    except Participante.DoesNotExist:
+        messages.error(request, "Você não está cadastrado como participante do bolão.")
+        return redirect('home')
+    
+    ligas = list(participante.ligas.filter(ativa=True))
+    
+    # Uma consulta para todas as ligas: membros, líder e a posição do participante
+    resumo = {liga.id: {'liga': liga, 'membros': 0, 'lider': None, 'minha_posicao': None} for liga in ligas}
+    for membro in Liga.classificacoes(ligas):
+        item = resumo[membro.liga_id]
+        item['membros'] += 1
+        if item['lider'] is None:
+            item['lider'] = membro
+        if membro.participante_id == participante.id:
+            item['minha_posicao'] = membro.posicao
+    
+    context = {
+        'ligas': [resumo[liga.id] for liga in ligas],
+    }
+    
+    return render(request, 'bolao/ligas.html', context)
+
+
+@login_required
+@require_POST
+def entrar_liga(request):
+    """Entra numa liga pelo código de convite"""
+    from .models import Liga, LigaParticipante
+    
+    try:
+        participante = request.user.participante
+    except Participante.DoesNotExist:
+        messages.error(request, "Você não está cadastrado como participante do bolão.")
+        return redirect('home')
+    
+    codigo = request.POST.get('codigo', '').strip().upper()
+    liga = Liga.objects.filter(codigo_convite=codigo, ativa=True).first()
+    if not liga:
+        messages.error(request, "Código de convite inválido.")
+        return redirect('minhas_ligas')
+    
+    _, criada = LigaParticipante.objects.get_or_create(liga=liga, participante=participante)
+    if criada:
+        messages.success(request, f"Você entrou na liga {liga.nome}!")
+    else:
+        messages.info(request, f"Você já participa da liga {liga.nome}.")
+    return redirect('liga_classificacao', slug=liga.slug)
+
+
+@login_required
+def liga_classificacao(request, slug):
+    """Classificação de uma liga (só para membros e administradores)"""
+    from .models import Liga
+    
+    liga = get_object_or_404(Liga, slug=slug, ativa=True)
+    if not request.user.is_staff and not liga.membros.filter(participante__user=request.user).exists():
+        messages.error(request, "Essa liga é privada. Peça o código de convite para entrar.")
+        return redirect('minhas_ligas')
+    
+    classificacoes = list(Liga.classificacoes([liga]))
+    
+    context = {
+        'liga': liga,
+        'classificacoes': classificacoes,
+        'total_membros': len(classificacoes),
+    }
+    
+    return render(request, 'bolao/liga_classificacao.html', context)
+
+
 def csrf_failure(request, reason=""):
     """
     View personalizada para falhas de CSRF
@@ -496,6 +750,7 @@ def termos_uso(request):
     return render(request, 'bolao/termos_uso.html')
 
 
+@etag_versionado(versoes.ATUALIZACOES, versoes.PARTICIPANTES)
 def atualizacoes(request):
     """Página com todas as atualizações do site"""
     from .models import AtualizacaoSite
@@ -539,7 +794,137 @@ from django.http import JsonResponse
 
 def jogos_ao_vivo(request):
     """Página de jogos ao vivo com placares em tempo real"""
-    return render(request, 'bolao/jogos_ao_vivo.html')
+    context = {}
+    
+    # Simulador "e se?" para participantes logados: jogos em aberto da rodada em andamento
+    if request.user.is_authenticated:
+        from .simulacao import rodada_em_andamento
+        rodada = rodada_em_andamento()
+        if rodada:
+            context['simulador_rodada'] = rodada
+            context['simulador_jogos'] = rodada.jogo_set.filter(resultado_finalizado=False).select_related(
+                'time_casa', 'time_visitante'
+            ).order_by('data_hora', 'id')
+    
+    return render(request, 'bolao/jogos_ao_vivo.html', context)
+
+
+@login_required
+@require_POST
+def simular_classificacao(request):
+    """API do simulador "e se?": classificação projetada com placares hipotéticos da rodada em andamento"""
+    from .simulacao import rodada_em_andamento, simular
+    
+    LIMITE_CLASSIFICACAO = 10
+    
+    try:
+        dados = json.loads(request.body or '{}')
+        placares = {
+            int(jogo_id): (int(placar[0]), int(placar[1]))
+            for jogo_id, placar in dados.get('placares', {}).items()
+        }
+        if any(gols < 0 or gols > 30 for placar in placares.values() for gols in placar):
+            raise ValueError('Placar fora do intervalo')
+    except (ValueError, TypeError, IndexError, KeyError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'Placares inválidos'}, status=400)
+    
+    rodada = rodada_em_andamento()
+    if not rodada:
+        return JsonResponse({'success': False, 'error': 'Nenhuma rodada em andamento'}, status=404)
+    
+    resultado = simular(rodada, placares)
+    
+    def linha(i):
+        return {
+            'participante_id': int(resultado['ids'][i]),
+            'nome': resultado['nomes'][i],
+            'posicao': int(resultado['posicoes'][i]),
+            'posicao_atual': int(resultado['posicoes_atuais'][i]),
+            'pontos': int(resultado['pontos'][i]),
+            'pontos_rodada': int(resultado['pontos_rodada'][i]),
+        }
+    
+    ordem = sorted(range(len(resultado['ids'])), key=lambda i: (resultado['posicoes'][i], resultado['nomes'][i]))
+    
+    participante = None
+    try:
+        participante_id = request.user.participante.id
+        indices = resultado['ids'].tolist()
+        if participante_id in indices:
+            participante = linha(indices.index(participante_id))
+    except Participante.DoesNotExist:
+        pass
+    
+    return JsonResponse({
+        'success': True,
+        'rodada': rodada.numero,
+        'total_participantes': len(ordem),
+        'classificacao': [linha(i) for i in ordem[:LIMITE_CLASSIFICACAO]],
+        'participante': participante,
+    })
+
+
+def classificacao_ao_vivo_api(request):
+    """API da classificação provisória com os placares dos jogos em andamento (servida do cache)"""
+    from .ao_vivo import classificacao_ao_vivo
+    
+    LIMITE_CLASSIFICACAO = 10
+    
+    estado = classificacao_ao_vivo()
+    if estado is None:
+        return JsonResponse({'success': False, 'error': 'Nenhum jogo ao vivo'}, status=404)
+    
+    participante = None
+    if request.user.is_authenticated:
+        try:
+            participante = estado['por_participante'].get(request.user.participante.id)
+        except Participante.DoesNotExist:
+            pass
+    
+    return JsonResponse({
+        'success': True,
+        'jogos_ao_vivo': len(estado['placares']),
+        'atualizada_em': timezone.localtime(estado['atualizada_em']).strftime('%H:%M:%S'),
+        'total_participantes': len(estado['linhas']),
+        'classificacao': estado['linhas'][:LIMITE_CLASSIFICACAO],
+        'participante': participante,
+    })
+
+
+def probabilidades_api(request):
+    """API com as chances de título gravadas pelo comando calcular_probabilidades (última rodada calculada)"""
+    from django.db.models import Max
+    
+    # A data do último cálculo entra na chave: o comando roda em outro processo, fora deste cache
+    ultima = ProbabilidadeTitulo.objects.aggregate(ultima=Max('calculada_em'))['ultima']
+    if ultima is None:
+        return JsonResponse({'success': False, 'error': 'Probabilidades ainda não calculadas'}, status=404)
+    
+    cache_key = f'probabilidades_api:{ultima.timestamp()}'
+    dados = cache.get(cache_key)
+    if dados is None:
+        rodada = ProbabilidadeTitulo.objects.filter(calculada_em=ultima).values_list('rodada', flat=True).first()
+        itens = ProbabilidadeTitulo.objects.filter(rodada=rodada).select_related('rodada', 'participante')
+        itens = list(itens)
+        dados = {
+            'success': True,
+            'rodada': itens[0].rodada.numero,
+            'simulacoes': itens[0].simulacoes,
+            'calculada_em': ultima.isoformat(),
+            'participantes': [
+                {
+                    'participante_id': item.participante_id,
+                    'nome': item.participante.nome_exibicao,
+                    'titulo': round(item.prob_titulo, 4),
+                    'top3': round(item.prob_top3, 4),
+                    'top10': round(item.prob_top10, 4),
+                }
+                for item in itens
+            ],
+        }
+        cache.set(cache_key, dados, 300)
+    
+    return JsonResponse(dados)
 
 
 def atualizar_placares_api(request):
@@ -784,6 +1169,15 @@ def atualizar_placares_api(request):
             'finalizados': len([j for j in jogos_processados if j['finalizado']])
         }
         
+        # Placares reais alimentam a classificação ao vivo (dados simulados ficam de fora)
+        if fonte != 'simulados_brasileirao':
+            try:
+                from .ao_vivo import atualizar
+                atualizar(jogos_processados)
+            except Exception:
+                # A classificação ao vivo não pode derrubar os placares, mas a falha fica no log
+                logger.exception("Erro ao atualizar a classificação ao vivo")
+        
         # Salva no cache
         cache.set(CACHE_KEY, cache_data, CACHE_TIMEOUT)
         cache.set(CACHE_BACKUP_KEY, cache_data, CACHE_BACKUP_TIMEOUT)
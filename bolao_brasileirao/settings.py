@@ -213,6 +213,9 @@ DATABASES = {
         'OPTIONS': {
             'timeout': 20,  # Timeout de conexão
             'isolation_level': None,  # Autocommit mode
+            # Transações pegam a trava de escrita já no BEGIN: com o worker de tarefas gravando ao
+            # mesmo tempo que o site, a espera do timeout vale (BEGIN DEFERRED falharia na hora)
+            'transaction_mode': 'IMMEDIATE',
         },
         'CONN_MAX_AGE': 600,  # Reutilizar conexões por 10 minutos
     }
@@ -317,3 +320,24 @@ WEBPUSH_SETTINGS = {
 
 # TTL para notificações push (em segundos)
 WEBPUSH_TTL = 60 * 60 * 24  # 24 horas
+
+# ===============================================
+# RECÁLCULO DA CLASSIFICAÇÃO
+# ===============================================
+
+# Edições de resultado no admin agendam o recálculo numa thread de fundo, que roda uma única
+# vez depois de RECALCULO_ATRASO segundos sem novas edições. False recalcula na própria requisição.
+RECALCULO_EM_SEGUNDO_PLANO = True
+RECALCULO_ATRASO = 3  # segundos
+RECALCULO_ATRASO_ERRO = 30  # segundos até tentar de novo quando o recálculo falha
+
+# ===============================================
+# FILA DE TAREFAS (python manage.py run_worker)
+# ===============================================
+
+# True manda notificações em massa para a fila do banco; exige um run_worker rodando
+TAREFAS_EM_FILA = False
+TAREFAS_THREADS = 2
+TAREFAS_RESERVA = 60  # segundos; o worker renova enquanto a tarefa roda
+TAREFAS_BACKOFF_BASE = 30  # segundos até a 2ª tentativa, dobrando a cada falha
+TAREFAS_BACKOFF_MAXIMO = 3600